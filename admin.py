@@ -0,0 +1,162 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://docs.python.org/3/library/profile.html
+(2) https://docs.python.org/3/library/asyncio-eventloop.html#unix-signals
+(3) https://docs.python.org/3/library/asyncio-stream.html#asyncio.start_unix_server
+
+On-demand profiling of a running server. A Profile runs cProfile over the event loop for a number of seconds and
+times every received message by type, then writes three files: the raw cProfile stats (for pstats or snakeviz), the
+top functions as text and a JSON report with the per-message timings and a snapshot of the live sessions. Nothing is
+hooked in while no profile is running, the message timing replaces the session class's handle_message() only for the
+length of the capture.
+
+A profile is started by SIGUSR1, and stopped by the server after --profile-seconds, or by the "profile" command of
+the admin socket, a local Unix socket that takes one command per line:
+
+    profile [SECONDS]     start a profile, answers with the path its files will be written to
+    sessions              answers with a JSON snapshot of the live sessions
+    stats                 answers with the server's counters as JSON
+    help                  lists the commands
+"""
+
+import asyncio
+import cProfile
+import io
+import json
+import math
+import os
+import pstats
+import stat
+import time
+
+import metrics
+import protocol
+
+TOP_FUNCTIONS = 60      # functions listed in the text report
+
+
+class Profile:
+    """
+    Creates a Profile Object. This class is responsible for one capture: profiling the event loop, timing the
+    messages handled by every session and writing the reports once it stops.
+    """
+
+    def __init__(self, server, session_class, directory):
+        """
+        Initializes the capture, nothing is hooked in until start() is called.
+        :param server: Represents the GameServer, its snapshot_sessions() is written to the report
+        :param session_class: Represents the class whose handle_message(opcode, message) is timed
+        :param directory: Represents the directory the reports are written to
+        """
+
+        self.server = server
+        self.session_class = session_class
+        self.path = os.path.join(directory, "profile-" + time.strftime("%Y%m%d-%H%M%S") + "-" + str(os.getpid()))
+        self.profiler = cProfile.Profile()
+        self.timings = {opcode: metrics.Histogram(name, "") for opcode, name in protocol.OPCODE_NAMES.items()}
+        self.handle_message = None          # the session class's own handle_message() while it is replaced
+        self.started = 0.0
+
+    def start(self):
+        """
+        Starts profiling and timing messages.
+        :return: NONE
+        """
+
+        original = self.handle_message = self.session_class.handle_message
+        timings = self.timings
+
+        def handle_message(session, opcode, message):
+            start = time.perf_counter_ns()
+            try:
+                original(session, opcode, message)
+            finally:
+                timings[opcode].record(time.perf_counter_ns() - start)
+
+        self.session_class.handle_message = handle_message
+        self.started = time.monotonic()
+        self.profiler.enable()
+
+    def stop(self):
+        """
+        Stops profiling, puts the session class's handle_message() back and writes the reports.
+        :return: List of the paths written
+        """
+
+        self.profiler.disable()
+        self.session_class.handle_message = self.handle_message
+        elapsed = time.monotonic() - self.started
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self.profiler.dump_stats(self.path + ".prof")
+        text = io.StringIO()
+        pstats.Stats(self.profiler, stream=text).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        with open(self.path + ".txt", "w") as file:
+            file.write(text.getvalue())
+
+        messages = {}
+        for histogram in self.timings.values():
+            count = sum(histogram.counts)
+            if count:
+                messages[histogram.name] = {
+                    "count": count,
+                    "p50_us": histogram.percentile(0.50) * 1e6,
+                    "p99_us": histogram.percentile(0.99) * 1e6,
+                    "total_ms": histogram.total / 1e6,
+                }
+        report = {"seconds": elapsed, "messages": messages, "stats": self.server.stats(),
+                  "sessions": self.server.snapshot_sessions()}
+        with open(self.path + ".json", "w") as file:
+            json.dump(report, file, indent=1)
+        return [self.path + ".prof", self.path + ".txt", self.path + ".json"]
+
+
+async def serve(server, path):
+    """
+    Starts answering admin commands on a local Unix socket.
+    :param server: Represents the GameServer
+    :param path: Represents the path of the socket, an old socket left at the path is replaced, any other file is not
+    :return: The asyncio Server
+    """
+
+    async def respond(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command, _, argument = line.decode(errors="replace").strip().partition(" ")
+                if command == "profile":
+                    try:
+                        seconds = float(argument) if argument else None
+                    except ValueError:
+                        seconds = math.nan
+                    if seconds is not None and not (math.isfinite(seconds) and seconds > 0):
+                        answer = "SECONDS must be a number greater than 0\n"
+                    else:
+                        started = server.start_profile(seconds)
+                        answer = started + "\n" if started else "a profile is already running\n"
+                elif command == "sessions":
+                    answer = json.dumps(server.snapshot_sessions()) + "\n"
+                elif command == "stats":
+                    answer = json.dumps(server.stats()) + "\n"
+                else:
+                    answer = "commands: profile [SECONDS], sessions, stats, help\n"
+                writer.write(answer.encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    try:
+        if not stat.S_ISSOCK(os.lstat(path).st_mode):
+            raise FileExistsError(path + " exists and is not a socket")
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    return await asyncio.start_unix_server(respond, path)
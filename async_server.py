@@ -0,0 +1,1760 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://docs.python.org/3/library/asyncio-protocol.html
+(2) https://docs.python.org/3/library/asyncio-eventloop.html
+(3) Computer Networking: A Top Down Approach 8th edition, (Jim Kurose, Keith Ross)
+
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import signal
+import socket
+import time
+
+import bitboard
+import engine
+import history
+import lobby
+import metrics
+import movelog
+import outbox
+import protocol
+import tablebase
+import timerwheel
+from game import Game
+
+LOBBY_SWEEP = 0.25      # seconds between checks for players that waited too long in the lobby
+TIMER_TICK = 0.1        # resolution of the server's timer wheel in seconds
+CHAT_LENGTH = 200       # longest chat message in bytes
+CHAT_QUEUE = 4096       # bytes of chat held back per connection, the oldest chat is dropped beyond that
+SEND_BUFFER = 16384     # socket send buffer in bytes, kept small so chat waits in the session rather than the kernel
+FAN_OUT_CHUNK = 1024    # spectators written to per event loop iteration
+RECEIVE_BUFFER = 256    # initial receive buffer of a session in bytes, game frames are a few bytes long
+RECEIVE_LIMIT = 16384   # largest receive buffer of a session in bytes, unless a single frame needs more
+FLOOD_READ = 8192       # a read this large can only be chat, the client is not read again until the next tick
+
+# frames superseded by a newer frame of the same type while queued
+COALESCED = {protocol.PING, protocol.PONG, protocol.HINT, protocol.WATCH, protocol.SYNC}
+
+# session states, small ints rather than strings
+INVITING = 0            # waiting for the client's INVITE, JOIN, RESUME or WATCH
+QUEUED = 1              # waiting in the lobby for an opponent
+PLAYING = 2             # game in progress
+PENDING = 3             # the client's move waits to be evaluated in the next batch
+FINISHED = 4            # game over, waiting for a rematch
+WATCHING = 5            # spectator of another game
+CLOSED = 6              # game ended, the connection is closing
+STATE_NAMES = ("inviting", "queued", "playing", "pending", "finished", "watching", "closed")
+
+
+class GameSession(asyncio.BufferedProtocol):
+    """
+    Creates a GameSession Object. One GameSession is created by the event loop for every accepted connection and owns
+    a separate Game for the life of that connection. The server side of the game is played automatically so
+    that a single event loop can serve every connected client without waiting on an operator.
+    """
+
+    __slots__ = ("server", "transport", "game", "decoder", "state", "slot", "session_id", "ticket", "match", "role",
+                 "deadline", "heartbeat", "last_seen", "outbox", "chat_tokens", "chat_refilled", "audience",
+                 "sent_state", "binary")
+
+    def __init__(self, server):
+        """
+        Initializes the session with a reference to the GameServer that accepted the connection.
+        :param server: Represents the GameServer tracking all live sessions
+        """
+
+        self.server = server
+        self.transport = None
+        self.game = Game()
+        if server.recorder is not None:
+            self.game.history = history.GameHistory(server.recorder)
+        self.decoder = protocol.FrameDecoder(RECEIVE_BUFFER, RECEIVE_LIMIT)
+        self.state = INVITING       # one of the session states, INVITING to CLOSED
+        self.slot = None            # slot held in the server's BatchEvaluator, if batching is enabled
+        self.session_id = None
+        self.ticket = None          # lobby.Ticket while waiting in the lobby
+        self.match = None           # Match played against another client, None when playing the engine
+        self.role = "X"             # player character of the client
+        self.deadline = None        # timerwheel.Timer armed while the server waits for the client to act
+        self.heartbeat = None       # timerwheel.Timer of the next heartbeat check
+        self.last_seen = 0          # timer wheel tick of the last data received from the client
+        self.outbox = None          # outbox.Outbox queueing the frames the client has not taken yet
+        self.chat_tokens = server.chat_burst                # token bucket limiting the chat sent by the client
+        self.chat_refilled = 0.0
+        self.audience = None        # Audience of the game watched by a spectator
+        self.sent_state = None      # last state frame sent to a spectator
+        self.binary = False         # True once the client sends its moves as PLACE frames, it is sent PLACE frames too
+
+    def connection_made(self, transport):
+        """
+        Called by the event loop once the connection has been accepted. Registers the session with the server and
+        arms its heartbeat and the deadline for its game invitation.
+        :param transport: Represents the transport used to send data to the client
+        :return: NONE
+        """
+
+        self.transport = transport
+        server = self.server
+        self.outbox = outbox.Outbox(transport, server, server.send_high, server.send_low, server.slow_policy,
+                                    server.stall_timeout, CHAT_QUEUE)
+        transport.set_write_buffer_limits(high=0)      # pause_writing() as soon as a write is not sent in full
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        self.session_id = self.server.new_session_id()
+        self.server.sessions.add(self)
+        self.server.connections += 1
+        if self.server.batch is not None:
+            self.slot = self.server.batch.evaluator.allocate()
+        self.last_seen = self.server.timers.current
+        self.heartbeat = self.server.timers.schedule(self.server.heartbeat_interval, self.check_heartbeat)
+        self.arm_deadline()
+
+    def connection_lost(self, exc):
+        """
+        Called by the event loop once the connection has been closed by either side. Removes the session from the
+        server. A game still in progress is kept by the server so the client can resume it, unless the client quit.
+        :param exc: Represents the exception that closed the connection, or None on a clean close
+        :return: NONE
+        """
+
+        self.server.sessions.discard(self)
+        self.release_slot()
+        self.cancel_deadline()
+        if self.heartbeat is not None:
+            self.heartbeat.cancel()
+            self.heartbeat = None
+        if self.ticket is not None:
+            self.server.lobby.remove(self.ticket)
+        if self.audience is not None:
+            self.audience.remove(self)
+        if self.server.attached.get(self.session_id) is self:
+            del self.server.attached[self.session_id]
+            if self.state != CLOSED:
+                self.server.detach(self)
+            elif self.match is not None:
+                self.server.end_match(self.match)
+            else:
+                self.server.close_audience(self.game_id())
+                self.game.save_history()
+                if self.server.move_log is not None:
+                    self.server.move_log.close_game(self.session_id)
+
+    def release_slot(self):
+        """
+        Hands the session's slot back to the server's BatchEvaluator. Moves still waiting to be batched are dropped.
+        :return: NONE
+        """
+
+        if self.slot is not None:
+            self.server.batch.evaluator.release(self.slot)
+            self.slot = None
+
+    def arm_deadline(self):
+        """
+        Gives the client the move timeout to act, e.g. to move or to ask for a rematch. Arming replaces any earlier
+        deadline, both are O(1) on the server's timer wheel, and pushing back an armed deadline only updates its tick.
+        :return: NONE
+        """
+
+        if not self.server.move_timeout:
+            return
+        if self.deadline is None:
+            self.deadline = self.server.timers.schedule(self.server.move_timeout, self.deadline_expired)
+        else:
+            self.server.timers.reschedule(self.deadline, self.server.move_timeout)
+
+    def cancel_deadline(self):
+        """
+        Cancels the deadline, the server is waiting on itself or another client.
+        :return: NONE
+        """
+
+        if self.deadline is not None:
+            self.deadline.cancel()
+            self.deadline = None
+
+    def deadline_expired(self):
+        """
+        Ends the game of a client that did not act in time. The client is told with a QUIT frame.
+        :return: NONE
+        """
+
+        self.deadline = None
+        self.state = CLOSED
+        self.send_message(protocol.QUIT)
+        self.close()
+
+    def check_heartbeat(self):
+        """
+        Runs every heartbeat interval. A client that has been quiet for a heartbeat interval is sent a PING, and one
+        that has been quiet for the heartbeat timeout is disconnected so the game can be resumed on a new connection.
+        While the server waits for the client to act, the deadline applies instead, a player may take its time.
+        :return: NONE
+        """
+
+        timers = self.server.timers
+        timers.reschedule(self.heartbeat, self.server.heartbeat_interval)
+        if self.outbox.stalled(asyncio.get_running_loop().time()):
+            return
+        if self.deadline is not None:
+            return
+        quiet = (timers.current - self.last_seen) * timers.tick
+        if quiet >= self.server.heartbeat_timeout:
+            self.transport.abort()      # the peer is gone, don't wait for the send buffer to drain
+        elif quiet >= self.server.heartbeat_interval:
+            self.send_message(protocol.PING)
+
+    def get_buffer(self, sizehint):
+        """
+        Called by the event loop to get a buffer to receive data into. The session's FrameDecoder buffer is reused for
+        every read.
+        :param sizehint: Represents the suggested minimum size of the returned buffer
+        :return: A writable buffer
+        """
+
+        return self.decoder.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes):
+        """
+        Called by the event loop whenever data has been received into the buffer. Every complete frame is decoded and
+        handed to handle_message().
+        :param nbytes: Represents the number of bytes received
+        :return: NONE
+        """
+
+        start = time.perf_counter_ns()
+        self.decoder.buffer_updated(nbytes)
+        self.last_seen = self.server.timers.current
+        self.server.bytes_received += nbytes
+        self.process_frames()
+        if nbytes >= FLOOD_READ and not self.transport.is_closing():
+            # the client floods, leave its data in the kernel so TCP flow control slows it down rather than the
+            # event loop spending its time on chat that is dropped anyway
+            self.transport.pause_reading()
+            self.server.timers.schedule(TIMER_TICK, self.resume_reading)
+        self.server.receive_time.record(time.perf_counter_ns() - start)
+
+    def resume_reading(self):
+        """
+        Reads from a client paused for flooding again, unless its outbox is throttling it.
+        :return: NONE
+        """
+
+        if not self.outbox.over:
+            self.transport.resume_reading()
+
+    def process_frames(self):
+        """
+        Hands every complete frame held by the decoder to handle_message(). Frames received while a move is waiting
+        to be batched are left in the decoder until the move has been evaluated.
+        :return: NONE
+        """
+
+        try:
+            while self.state != PENDING and not self.transport.is_closing():
+                if self.chat_tokens < 1 and self.refill_chat() < 1:     # over the chat limit, chat is dropped unread
+                    self.server.chat_dropped += self.decoder.skip_frames(protocol.CHAT)
+                frame = self.decoder.next_frame()
+                if frame is None:
+                    break
+                opcode, payload = frame
+                self.handle_message(opcode, payload if opcode in protocol.BINARY else payload.decode())
+        except (protocol.ProtocolError, UnicodeDecodeError):
+            self.close()
+
+    def send_message(self, opcode, message=""):
+        """
+        Receives a server created message. The message is encoded into a frame and handed to the client's outbox,
+        which queues it while the client is not reading. A queued PING, PONG or HINT is superseded by a newer one.
+        :param opcode: Represents the type of message, one of the opcodes from protocol.py
+        :param message: Represents the message created by the server
+        :return: NONE
+        """
+
+        start = time.perf_counter_ns()
+        self.outbox.send(protocol.encode_frame(opcode, message.encode()), opcode if opcode in COALESCED else None)
+        self.server.send_time.record(time.perf_counter_ns() - start)
+
+    def send_move(self, index):
+        """
+        Sends a move that has been placed on the board to the client, as a PLACE frame to a client that sends its own
+        moves that way, else as a MOVE frame.
+        :param index: Represents the bit index of the move
+        :return: NONE
+        """
+
+        if not self.binary:
+            self.send_message(protocol.MOVE, self.game.board.coordinates(index))
+            return
+        start = time.perf_counter_ns()
+        self.outbox.send(protocol.encode_place(self.game.moves(), index, self.game.board.width))
+        self.server.send_time.record(time.perf_counter_ns() - start)
+
+    def send_sync(self):
+        """
+        Sends the server's board to a client whose own board is out of step, in a SYNC frame.
+        :return: NONE
+        """
+
+        self.outbox.send(self.game.sync_frame(), protocol.SYNC)
+
+    def reject_move(self):
+        """
+        Rejects an illegal or out of turn move. A client sending PLACE frames is sent the server's board to continue
+        from, the connection of a client sending MOVE frames is closed.
+        :return: NONE
+        """
+
+        self.server.moves_rejected += 1
+        if self.binary:
+            self.send_sync()
+        else:
+            self.close()
+
+    def send_chat(self, frame):
+        """
+        Sends an encoded chat frame. Chat has the lowest priority on the connection: it is held back and written at
+        the end of the event loop iteration, after the game frames written meanwhile, or once the game frames queued
+        for a slow client have been sent. When too much chat is held back the oldest is dropped.
+        :param frame: Represents the encoded CHAT frame
+        :return: NONE
+        """
+
+        if self.outbox.send_chat(frame):
+            self.server.queue_chat(self.outbox)
+
+    def pause_writing(self):
+        """
+        Called by the transport when a write could not be sent in full. Frames are queued in the outbox until it has
+        drained.
+        :return: NONE
+        """
+
+        self.outbox.pause(asyncio.get_running_loop().time())
+
+    def resume_writing(self):
+        """
+        Called by the transport once everything written has been sent. Writes the frames queued meanwhile.
+        :return: NONE
+        """
+
+        self.outbox.resume()
+
+    def send_state(self, frame):
+        """
+        Sends a game state frame to a spectator. The frame is shared by every spectator of the game and written as
+        is. A spectator that has fallen behind only keeps the newest state, the ones in between are skipped, and one
+        that stays behind for the stall timeout is disconnected.
+        :param frame: Represents the encoded WATCH frame
+        :return: NONE
+        """
+
+        if frame is self.sent_state or self.outbox.stalled(asyncio.get_running_loop().time()):
+            return
+        self.sent_state = frame
+        self.outbox.send(frame, protocol.WATCH)
+
+    def receive_chat(self, message):
+        """
+        Relays a chat message to the other player of a match. Each client may send chat_rate messages per second
+        with bursts of up to chat_burst, anything over the limit or longer than CHAT_LENGTH is dropped. There is no
+        one to chat with in a game against the engine.
+        :param message: Represents the chat text sent by the client
+        :return: NONE
+        """
+
+        self.refill_chat()
+        text = message.encode()
+        if self.chat_tokens < 1 or len(text) > CHAT_LENGTH or self.match is None:
+            self.server.chat_dropped += 1
+            return
+        self.chat_tokens -= 1
+        other = self.match.players["O" if self.role == "X" else "X"]
+        if self.server.attached.get(other.session_id) is other:
+            other.send_chat(protocol.encode_frame(protocol.CHAT, self.role.encode() + b";" + text))
+            self.server.chat_relayed += 1
+
+    def refill_chat(self):
+        """
+        Adds the chat tokens earned since the last refill to the client's token bucket.
+        :return: Number of chat messages the client may send now
+        """
+
+        now = asyncio.get_running_loop().time()
+        rate, burst = self.server.chat_rate, self.server.chat_burst
+        self.chat_tokens = min(burst, self.chat_tokens + (now - self.chat_refilled) * rate)
+        self.chat_refilled = now
+        return self.chat_tokens
+
+    def close(self):
+        """
+        Closes the connection to the client.
+        :return: NONE
+        """
+
+        self.transport.close()
+
+    def choose_move(self):
+        """
+        Picks the server's next move with the server's engine.
+        :return: Bit index of the server's move
+        """
+
+        return self.server.engine.choose_move(self.game.board, "O")
+
+    def handle_message(self, opcode, message):
+        """
+        Advances the session according to the received frame and the current state of the session. Mirrors
+        TicTacToe.initiate_game(), TicTacToe.play_game() and TicTacToe.declare_winner() from server.py.
+        :param opcode: Represents the type of the received message
+        :param message: Represents the decoded payload received from the client, or the payload bytes of a PLACE or SYNC
+        :return: NONE
+        """
+
+        # client has closed its socket, its game ends
+        if opcode == protocol.QUIT:
+            self.state = CLOSED
+            self.close()
+            return
+
+        # heartbeats, receiving any frame has already marked the client as alive
+        if opcode == protocol.PING:
+            self.send_message(protocol.PONG)
+            return
+        if opcode == protocol.PONG:
+            return
+        if opcode == protocol.CHAT:
+            self.receive_chat(message)
+            return
+
+        # client sent game invitation, the server accepts any supported board size, or resumes an earlier game
+        if self.state == INVITING:
+            if opcode == protocol.RESUME:
+                self.resume(message)
+            elif opcode == protocol.JOIN:
+                self.join(message)
+            elif opcode == protocol.WATCH:
+                self.watch(message)
+            elif opcode == protocol.INVITE:
+                size = bitboard.parse_size(message)
+                if size is None:
+                    self.send_message(protocol.DECLINE)
+                    self.close()
+                    return
+                self.start_game(size)
+            return
+
+        # client is waiting in the lobby for an opponent, or watching a game
+        if self.state == QUEUED or self.state == WATCHING:
+            return
+
+        # client's board is out of step with the server's
+        if opcode == protocol.SYNC:
+            self.send_sync()
+            return
+
+        # game is over, the server always accepts a rematch against the engine, a match waits for both players
+        if self.state == FINISHED:
+            if opcode == protocol.REMATCH:
+                if self.match is not None:
+                    self.match.rematch(self.role)
+                else:
+                    self.new_game()
+            return
+
+        # client asked for a hint, there are no hints against another player
+        if opcode == protocol.HINT:
+            moves = self.server.engine.best_moves(self.game.board, "X") if self.match is None else []
+            self.send_message(protocol.HINT, self.game.board.coordinates(moves[0]) if moves else "")
+            return
+
+        server = self.server
+        start = time.perf_counter_ns()
+        if opcode == protocol.MOVE:
+            index = self.game.board.cell_index(message)
+        elif opcode == protocol.PLACE:
+            if self.game.board.height * self.game.board.width > protocol.BINARY_CELLS:
+                self.send_message(protocol.DECLINE)
+                self.close()
+                return
+            self.binary = True
+            index = self.game.placed_index(message)
+            if index is None:       # a duplicate or a move made on a stale board, the client is sent the board
+                self.send_sync()
+                return
+        else:
+            return
+        server.moves += 1
+
+        # the move is checked and relayed to the other player
+        if self.match is not None:
+            if not self.match.move(self.role, index):
+                self.reject_move()
+                return
+            server.move_time.record(time.perf_counter_ns() - start)
+            return
+
+        # moves are evaluated together with every other session's moves at the end of the loop iteration
+        if self.slot is not None:
+            self.cancel_deadline()
+            server.batch.submit(self, index, start)
+            return
+
+        # client sent a move, invalid moves mean the two boards are out of sync
+        valid = self.game.check_valid_index(index, "X")
+        checked = time.perf_counter_ns()
+        server.valid_move_time.record(checked - start)
+        if not valid:
+            self.reject_move()
+            return
+        if server.move_log is not None:
+            server.move_log.move(self.session_id, "X", index)
+
+        # check if client has won the game
+        won = self.game.win_check(self.game.board, "X")
+        server.win_check_time.record(time.perf_counter_ns() - checked)
+        if won:
+            self.state = FINISHED
+            self.arm_deadline()
+            server.move_time.record(time.perf_counter_ns() - start)
+            server.publish(self)
+            return
+
+        self.game.round_count += 2
+        if self.game.board.is_full():       # checks if we have reached a tie game
+            self.state = FINISHED
+            self.arm_deadline()
+            server.move_time.record(time.perf_counter_ns() - start)
+            server.publish(self)
+            return
+
+        self.server_move()
+        server.move_time.record(time.perf_counter_ns() - start)
+
+        # check if server has won the game or we have reached a tie game
+        checked = time.perf_counter_ns()
+        if self.game.win_check(self.game.board, "O") or self.game.board.is_full():
+            self.state = FINISHED
+        server.win_check_time.record(time.perf_counter_ns() - checked)
+        server.publish(self)
+
+    def accept_payload(self):
+        """
+        Encodes the ACCEPT of a new game as "height,width,k;token;role". The token resumes the game after a dropped
+        connection and the role is the client's player character.
+        :return: Payload as a string
+        """
+
+        size = ",".join(str(value) for value in self.game.size)
+        return size + ";" + self.server.make_token(self.session_id) + ";" + self.role
+
+    def start_game(self, size):
+        """
+        Starts a game against the server's engine, the client plays "X"
+        :param size: Represents the board size as a tuple of (height, width, k)
+        :return: NONE
+        """
+
+        self.ticket = None
+        self.game.size = size
+        self.game.create_board()
+        self.send_message(protocol.ACCEPT, self.accept_payload())
+        self.state = PLAYING
+        self.arm_deadline()
+        self.server.games += 1
+        self.server.attached[self.session_id] = self
+        if self.server.move_log is not None:
+            self.server.move_log.new_game(self.session_id, size)
+
+        # only the classic board is batched
+        if not bitboard.is_classic(self.game.board):
+            self.release_slot()
+
+    def join(self, message):
+        """
+        Puts the client in the lobby, or pairs it right away with a waiting player.
+        :param message: Represents the JOIN payload in the form "height,width,k;rating", the rating is optional
+        :return: NONE
+        """
+
+        size, _, rating = message.partition(";")
+        size = bitboard.parse_size(size)
+        if size is None or not (rating.isdigit() or rating == ""):
+            self.send_message(protocol.DECLINE)
+            self.close()
+            return
+        self.state = QUEUED
+        self.cancel_deadline()
+        self.ticket = lobby.Ticket(self, size, int(rating) if rating else lobby.DEFAULT_RATING)
+        opponent = self.server.lobby.enqueue(self.ticket)
+        if opponent is not None:        # the player that waited longer moves first
+            self.server.start_match(opponent.player, self)
+
+    def watch(self, message):
+        """
+        Turns the connection into a spectator of a game and sends it the game's current state. The game is found by
+        the session id of either of its players, the number before the "." of a session token.
+        :param message: Represents the id of the game
+        :return: NONE
+        """
+
+        player = self.server.find_session(int(message)) if message.isdigit() else None
+        if player is None:
+            self.send_message(protocol.DECLINE)
+            self.close()
+            return
+        self.state = WATCHING
+        self.cancel_deadline()
+        self.audience = self.server.audiences.get(player.game_id())
+        if self.audience is None:
+            self.audience = Audience(self.server, player.game_id())
+            self.server.audiences[self.audience.game_id] = self.audience
+        self.audience.spectators.add(self)
+        self.send_state(protocol.encode_frame(protocol.WATCH, player.resume_state().encode()))
+
+    def game_id(self):
+        """
+        Identifies the game played by the session, the session id of the client for a game against the engine and
+        the session id of player "X" for a match. The id stays the same when a game is resumed.
+        :return: Game id as an int
+        """
+
+        if self.match is not None:
+            return self.match.players["X"].session_id
+        return self.session_id
+
+    def resume(self, token):
+        """
+        Takes over the game of an earlier connection and sends the client its board and turn in a single RESUME frame.
+        Declines and closes the connection if the token is not valid or the game has expired. A connection bringing
+        the token of another worker process is handed to that worker, which answers as if it had accepted it.
+        :param token: Represents the session token handed out with the game invitation
+        :return: NONE
+        """
+
+        old = self.server.resume(token)
+        if old is None:
+            worker = self.server.token_worker(token)
+            if worker is not None and worker != self.server.worker and self.server.hand_off(self, worker, token):
+                return
+            self.send_message(protocol.DECLINE)
+            self.close()
+            return
+        self.session_id = old.session_id
+        self.game = old.game
+        self.state = PLAYING if old.state == PENDING else old.state
+        self.match = old.match
+        self.role = old.role
+        self.server.attached[self.session_id] = self
+        if self.match is not None:
+            self.match.players[self.role] = self
+            self.match.update_deadlines()
+        else:
+            self.arm_deadline()
+
+        # only the classic board is batched
+        if self.match is None and bitboard.is_classic(self.game.board):
+            if self.slot is not None:
+                self.server.batch.evaluator.reset(self.slot, self.game.board.x, self.game.board.o)
+        else:
+            self.release_slot()
+        self.send_message(protocol.RESUME, self.resume_state())
+
+    def resume_state(self):
+        """
+        Encodes the game for a RESUME frame as "height,width,k;cells;turn". Cells holds one character per position in
+        row order, "X", "O" or "-". Turn is the player to move, or "-" once the game is over and a rematch is expected.
+        :return: Payload as a string
+        """
+
+        board = self.game.board
+        cells = "".join("".join(row) for row in board.rows())
+        if self.state == FINISHED:
+            turn = "-"
+        elif self.match is not None:
+            turn = self.match.turn
+        else:
+            turn = "X" if board.x.bit_count() == board.o.bit_count() else "O"
+        return ",".join(str(value) for value in self.game.size) + ";" + cells + ";" + turn
+
+    def server_move(self):
+        """
+        Chooses the server's move, places it on the game board and sends it to the client.
+        :return: Bit index of the move
+        """
+
+        index = self.choose_move()
+        self.game.place(index, "O")
+        self.send_move(index)
+        self.arm_deadline()
+        if self.server.move_log is not None:
+            self.server.move_log.move(self.session_id, "O", index)
+        return index
+
+    def new_game(self):
+        """
+        Accepts the rematch and resets the game board and counters.
+        :return: NONE
+        """
+
+        self.send_message(protocol.ACCEPT)
+        self.game.create_board()
+        self.game.round_count = 0
+        self.state = PLAYING
+        self.arm_deadline()
+        self.server.games += 1
+        self.server.publish(self)
+        if self.slot is not None:
+            self.server.batch.evaluator.reset(self.slot)
+        if self.server.move_log is not None:
+            self.server.move_log.new_game(self.session_id, self.game.size)
+
+
+class Match:
+    """
+    Creates a Match Object. Holds the game played between two clients paired by the lobby. The server only checks
+    that every move is legal and made in turn, then relays it to the other player.
+    """
+
+    __slots__ = ("server", "game", "players", "turn", "rematches")
+
+    def __init__(self, server, size):
+        """
+        Initializes an empty board of the given size.
+        :param server: Represents the GameServer hosting the match
+        :param size: Represents the board size as a tuple of (height, width, k)
+        """
+
+        self.server = server
+        self.game = Game(size)
+        if server.recorder is not None:
+            self.game.history = history.GameHistory(server.recorder)
+        self.players = {"X": None, "O": None}       # player character -> GameSession
+        self.turn = "X"             # player to move, None once the game is over
+        self.rematches = set()      # players that asked for a rematch
+
+    def send(self, role, opcode, message=""):
+        """
+        Sends a message to one of the players, unless its connection has dropped. A dropped player gets the board
+        when it resumes.
+        :param role: Represents the player character of the receiver
+        :param opcode: Represents the type of message
+        :param message: Represents the message
+        :return: NONE
+        """
+
+        session = self.players[role]
+        if self.server.attached.get(session.session_id) is session:
+            session.send_message(opcode, message)
+
+    def move(self, role, index):
+        """
+        Plays a move for a player and relays it to the other player, in the form the other player sends its moves.
+        :param role: Represents the player character of the mover
+        :param index: Represents the bit index of the move sent by the mover, or None if it was malformed
+        :return: False if the move is out of turn or not legal, else True
+        """
+
+        if self.turn != role:
+            return False
+        start = time.perf_counter_ns()
+        valid = self.game.check_valid_index(index, role)
+        checked = time.perf_counter_ns()
+        self.server.valid_move_time.record(checked - start)
+        if not valid:
+            return False
+        other = "O" if role == "X" else "X"
+        session = self.players[other]
+        if self.server.attached.get(session.session_id) is session:
+            session.send_move(index)
+        self.game.round_count += 1
+
+        # check if the mover has won the game or we have reached a tie game
+        checked = time.perf_counter_ns()
+        won = self.game.win_check(self.game.board, role)
+        self.server.win_check_time.record(time.perf_counter_ns() - checked)
+        if won or self.game.board.is_full():
+            self.turn = None
+            for session in self.players.values():
+                session.state = FINISHED
+        else:
+            self.turn = other
+        self.update_deadlines()
+        self.server.publish(self.players[role])
+        return True
+
+    def rematch(self, role):
+        """
+        Records a player's rematch request. Once both players have asked, a new game is started with the same roles.
+        :param role: Represents the player character of the player asking
+        :return: NONE
+        """
+
+        self.rematches.add(role)
+        if len(self.rematches) == 2:
+            self.rematches.clear()
+            self.game.create_board()
+            self.game.round_count = 0
+            self.turn = "X"
+            self.server.games += 1
+            for role, session in self.players.items():
+                session.state = PLAYING
+                self.send(role, protocol.ACCEPT)
+            self.server.publish(self.players["X"])
+        self.update_deadlines()
+
+    def update_deadlines(self):
+        """
+        Arms the deadline of every connected player that has to act, the player to move or a player that has not yet
+        asked for a rematch, and cancels the deadline of the other.
+        :return: NONE
+        """
+
+        for role, session in self.players.items():
+            if self.server.attached.get(session.session_id) is session:
+                if self.turn == role or session.state == FINISHED and role not in self.rematches:
+                    session.arm_deadline()
+                else:
+                    session.cancel_deadline()
+
+
+class Audience:
+    """
+    Creates an Audience Object. Holds the spectators of one game and fans every new state of the game out to them.
+    Each state is encoded once into a single frame written as is to every spectator. The fan out is spread over
+    several event loop iterations, FAN_OUT_CHUNK spectators at a time, so a large audience does not stall other
+    games, and a state that is replaced before every spectator has it is skipped for the rest.
+    """
+
+    __slots__ = ("server", "game_id", "spectators", "latest", "round", "waiting", "scheduled")
+
+    def __init__(self, server, game_id):
+        """
+        Initializes an empty audience.
+        :param server: Represents the GameServer
+        :param game_id: Represents the id of the watched game
+        """
+
+        self.server = server
+        self.game_id = game_id
+        self.spectators = set()     # spectating GameSessions
+        self.latest = None          # newest state frame
+        self.round = None           # state frame the current fan out started with
+        self.waiting = []           # spectators not yet written to in the current fan out
+        self.scheduled = False
+
+    def publish(self, frame):
+        """
+        Starts writing a new state to every spectator.
+        :param frame: Represents the encoded WATCH frame
+        :return: NONE
+        """
+
+        self.latest = frame
+        if not self.scheduled:
+            self.start_round()
+
+    def start_round(self):
+        """
+        Schedules writing the newest state to every spectator.
+        :return: NONE
+        """
+
+        self.scheduled = True
+        self.round = self.latest
+        self.waiting = list(self.spectators)
+        asyncio.get_running_loop().call_soon(self.fan_out)
+
+    def fan_out(self):
+        """
+        Writes the newest state to the next FAN_OUT_CHUNK spectators. Runs until every spectator has the newest state.
+        :return: NONE
+        """
+
+        frame = self.latest
+        chunk = self.waiting[-FAN_OUT_CHUNK:]
+        del self.waiting[-FAN_OUT_CHUNK:]
+        for spectator in chunk:
+            if spectator.audience is self:
+                spectator.send_state(frame)
+        if self.waiting:
+            asyncio.get_running_loop().call_soon(self.fan_out)
+        elif self.latest is not self.round:     # replaced during the fan out, spectators served early need it
+            self.start_round()
+        else:
+            self.scheduled = False
+
+    def remove(self, spectator):
+        """
+        Removes a spectator whose connection has closed. The audience is dropped once it is empty.
+        :param spectator: Represents the spectating GameSession
+        :return: NONE
+        """
+
+        spectator.audience = None
+        self.spectators.discard(spectator)
+        if not self.spectators and self.server.audiences.get(self.game_id) is self:
+            del self.server.audiences[self.game_id]
+
+
+class BatchTicker:
+    """
+    Creates a BatchTicker Object. Collects the moves received by every session during one iteration of the event loop
+    and evaluates all of them in a single vectorized pass of a batch.BatchEvaluator at the end of the iteration.
+    """
+
+    def __init__(self, server):
+        """
+        Initializes the evaluator and the list of pending moves. Requires NumPy.
+        :param server: Represents the GameServer, its histograms are recorded into
+        """
+
+        import batch        # NumPy is only needed when batching is enabled
+
+        self.server = server
+        self.batch = batch
+        self.evaluator = batch.BatchEvaluator()
+        self.pending = []
+        self.scheduled = False
+
+    def submit(self, session, index, start):
+        """
+        Queues a client's move and schedules a tick if one is not already scheduled.
+        :param session: Represents the GameSession that received the move
+        :param index: Represents the bit index of the move sent by the client, or None if it was malformed
+        :param start: Represents the time.perf_counter_ns() reading taken when the move was received
+        :return: NONE
+        """
+
+        # malformed move, a position off the board or a move sent out of turn
+        if index is None or index >= bitboard.FULL.bit_length() or session.state == PENDING:
+            session.reject_move()
+            return
+        session.state = PENDING
+        self.pending.append((session, index, start))
+        if not self.scheduled:
+            self.scheduled = True
+            asyncio.get_running_loop().call_soon(self.tick)
+
+    def tick(self):
+        """
+        Applies every pending client move, then every server reply, evaluating each batch in one pass.
+        :return: NONE
+        """
+
+        np = self.batch.np
+        pending, self.pending = self.pending, []
+        self.scheduled = False
+        pending = [move for move in pending if move[0].slot is not None]
+        if not pending:
+            return
+
+        slots = np.fromiter((session.slot for session, index, start in pending), dtype=np.intp, count=len(pending))
+        cells = np.fromiter((index for session, index, start in pending), dtype=np.intp, count=len(pending))
+        played = time.perf_counter_ns()
+        valid, status = self.evaluator.play(slots, cells, "X")
+
+        # one pass checks every move and looks for a win, each move is counted with its share of the pass
+        server = self.server
+        share = (time.perf_counter_ns() - played) // len(pending)
+        server.valid_move_time.record_many(share, len(pending))
+        server.win_check_time.record_many(share, len(pending))
+
+        # game still in progress, the server replies
+        replies = []
+        for (session, index, start), is_valid, state in zip(pending, valid.tolist(), status.tolist()):
+            session.state = PLAYING
+            if not is_valid:        # invalid moves mean the two boards are out of sync
+                session.reject_move()
+                continue
+            session.game.place(index, "X")
+            session.game.round_count += 2
+            if server.move_log is not None:
+                server.move_log.move(session.session_id, "X", index)
+            if state != self.batch.ONGOING:
+                session.state = FINISHED
+                session.arm_deadline()
+                server.move_time.record(time.perf_counter_ns() - start)
+                continue
+            replies.append((session, session.server_move()))
+            server.move_time.record(time.perf_counter_ns() - start)
+        if replies:
+            slots = np.fromiter((session.slot for session, index in replies), dtype=np.intp, count=len(replies))
+            cells = np.fromiter((index for session, index in replies), dtype=np.intp, count=len(replies))
+            played = time.perf_counter_ns()
+            status = self.evaluator.play(slots, cells, "O")[1]
+            server.win_check_time.record_many((time.perf_counter_ns() - played) // len(replies), len(replies))
+            for (session, index), state in zip(replies, status.tolist()):
+                if state != self.batch.ONGOING:
+                    session.state = FINISHED
+
+        # frames that arrived behind the batched moves
+        for session, index, start in pending:
+            session.server.publish(session)
+            session.process_frames()
+
+
+class GameServer:
+    """
+    Creates a GameServer Object. This class is responsible for listening for incoming connections and tracking every
+    live GameSession. All sessions share a single event loop.
+    """
+
+    def __init__(self, host="127.0.0.1", port=2221, backlog=4096, batch=False, difficulty="hard",
+                 tablebase_path=None, log_dir=None, resume_ttl=60.0, lobby_window=200, lobby_wait=10.0,
+                 stats_interval=0.0, heartbeat_interval=10.0, heartbeat_timeout=30.0, move_timeout=60.0,
+                 reuse_port=False, chat_rate=5.0, chat_burst=10, send_high=65536, send_low=16384,
+                 slow_policy="throttle", stall_timeout=10.0, metrics_port=0, profile_dir=".", profile_seconds=10.0,
+                 admin_socket=None, unix_path=None, record_path=None, worker=None, handoff=None):
+        """
+        Initializes the server address and the set of live sessions.
+        :param host: Represents the host address to listen on
+        :param port: Represents the port number to listen on
+        :param backlog: Represents the number of pending connections the kernel may queue
+        :param batch: If True, win/tie checks for every session are batched with NumPy once per loop iteration
+        :param difficulty: Represents the difficulty level of the engine playing the server's moves
+        :param tablebase_path: Represents the path of a tablebase file the engine reads its moves from, or None
+        :param log_dir: Represents the directory of the move log used to recover games after a restart, or None
+        :param resume_ttl: Represents the number of seconds a game is kept after its connection drops
+        :param lobby_window: Represents the largest rating difference between two players paired by the lobby
+        :param lobby_wait: Represents the number of seconds a player waits in the lobby before playing the engine
+        :param stats_interval: Represents the number of seconds between printed lobby statistics, 0 for none
+        :param heartbeat_interval: Represents the number of seconds a client may be quiet before it is sent a PING
+        :param heartbeat_timeout: Represents the number of seconds a client may be quiet before it is disconnected
+        :param move_timeout: Represents the number of seconds a client has to move or ask for a rematch, 0 for none
+        :param reuse_port: If True, the port is bound with SO_REUSEPORT so several worker processes can share it
+        :param chat_rate: Represents the number of chat messages per second a client may send
+        :param chat_burst: Represents the number of chat messages a client may send at once
+        :param send_high: Represents the number of bytes queued for a client past which its slow_policy applies
+        :param send_low: Represents the number of queued bytes under which the slow_policy is lifted again
+        :param slow_policy: Represents what is done with a client over send_high, one of outbox.POLICIES
+        :param stall_timeout: Represents the number of seconds a client may go without reading before it is
+        disconnected
+        :param metrics_port: Represents the local port metrics are served on in the Prometheus format, 0 for none
+        :param profile_dir: Represents the directory profiles started by SIGUSR1 or the admin socket are written to
+        :param profile_seconds: Represents the default length of a profile in seconds
+        :param admin_socket: Represents the path of the local Unix socket taking admin commands, or None
+        :param unix_path: Represents the path of a Unix socket clients connect to instead of the host and port, or None
+        :param record_path: Represents the path of the file every game's record is appended to (see history.py), or
+        None
+        :param worker: Represents the index of the server's worker process, written into its session tokens, or None
+        for a single process
+        :param handoff: Represents the worker's end of the socket pair connections are handed to other workers over
+        (see supervisor.py), or None
+        """
+
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.backlog = backlog
+        self.sessions = set()
+        self.server = None
+        self.batch = BatchTicker(self) if batch else None
+        self.tablebase = tablebase.Tablebase(tablebase_path) if tablebase_path else None
+        self.engine = engine.Engine(difficulty, tablebase=self.tablebase)
+        self.move_log = movelog.MoveLog(log_dir) if log_dir else None
+        self.recorder = history.RecordWriter(record_path) if record_path else None
+        self.next_session_id = 0
+        self.resume_ttl = resume_ttl
+        self.secret = secrets.token_bytes(32)       # signs session tokens
+        self.worker = worker
+        self.handoff = handoff
+        self.attached = {}          # session id -> GameSession playing that game
+        self.detached = {}          # session id -> (dropped GameSession, expiry timer) of games waiting to be resumed
+        self.lobby = lobby.Lobby(window=lobby_window, max_wait=lobby_wait)
+        self.stats_interval = stats_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.move_timeout = move_timeout
+        self.timers = None          # timerwheel.TimerWheel holding every heartbeat, deadline and resume timer
+        self.reuse_port = reuse_port
+        self.connections = 0        # connections accepted
+        self.games = 0              # games started, including rematches
+        self.moves = 0              # moves received from clients
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_relayed = 0       # chat messages relayed to the other player
+        self.chat_dropped = 0       # chat messages over the rate limit, too long or with no one to receive them
+        self.chat_waiting = []      # outboxes holding chat, written at the end of the event loop iteration
+        self.audiences = {}         # game id -> Audience of the game's spectators
+        self.send_high = send_high
+        self.send_low = send_low
+        self.slow_policy = slow_policy
+        self.stall_timeout = stall_timeout
+        self.frames_coalesced = 0   # queued frames superseded by a newer one
+        self.frames_dropped = 0     # frames dropped for clients over the limit, or chat held back for too long
+        self.slow_disconnects = 0   # clients disconnected for not reading
+        self.moves_rejected = 0     # illegal or out of turn moves, the client is disconnected
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+        self.metrics = metrics.Registry()
+        histogram = self.metrics.histogram
+        self.receive_time = histogram("tictactoe_receive", "Time to handle the frames of one read from a client")
+        self.send_time = histogram("tictactoe_send", "Time to encode and send or queue one frame")
+        self.valid_move_time = histogram("tictactoe_valid_move", "Time to check and place a client's move")
+        self.win_check_time = histogram("tictactoe_win_check", "Time to check a board for a win")
+        self.move_time = histogram("tictactoe_move", "Time from receiving a client's move to sending the reply")
+        self.register_metrics()
+        self.profile_dir = profile_dir
+        self.profile_seconds = profile_seconds
+        self.profile = None         # admin.Profile while a profile is running
+        self.admin_socket = admin_socket
+        self.admin_server = None
+
+    def register_metrics(self):
+        """
+        Adds the server's counters and gauges to its metrics registry, they are read when the metrics are scraped.
+        :return: NONE
+        """
+
+        registry = self.metrics
+        for name, help in (("connections", "Connections accepted"),
+                           ("games", "Games started, including rematches"),
+                           ("moves", "Moves received from clients"),
+                           ("moves_rejected", "Illegal or out of turn moves received from clients"),
+                           ("chat_relayed", "Chat messages relayed to the other player"),
+                           ("chat_dropped", "Chat messages over the rate limit, too long or with no receiver"),
+                           ("frames_coalesced", "Queued frames superseded by a newer one"),
+                           ("frames_dropped", "Frames dropped for clients that do not read"),
+                           ("slow_disconnects", "Clients disconnected for not reading"),
+                           ("bytes_received", "Bytes received from clients"),
+                           ("bytes_sent", "Bytes written to clients")):
+            registry.counter("tictactoe_" + name + "_total", help, lambda name=name: getattr(self, name))
+        registry.gauge("tictactoe_sessions", "Open connections", lambda: len(self.sessions))
+        registry.gauge("tictactoe_games_attached", "Games held by a connection", lambda: len(self.attached))
+        registry.gauge("tictactoe_games_detached", "Games waiting to be resumed", lambda: len(self.detached))
+        registry.gauge("tictactoe_lobby_waiting", "Players waiting in the lobby", lambda: self.lobby.waiting)
+        registry.gauge("tictactoe_spectators", "Spectators of every game",
+                       lambda: sum(len(audience.spectators) for audience in self.audiences.values()))
+
+    def new_session_id(self):
+        """
+        Hands out the next session id, the move log keeps ids handed out before a restart from being handed out again.
+        :return: Session id as an int
+        """
+
+        session_id = self.next_session_id
+        self.next_session_id += 1
+        if self.move_log is not None:
+            self.move_log.issue(session_id)
+        return session_id
+
+    def make_token(self, session_id):
+        """
+        Creates the token a client presents to resume its game, the session id followed by its signature. A worker
+        process puts its index between the two, only the worker holding a game can resume it.
+        :param session_id: Represents the session id of the game
+        :return: Token as a string (e.g.: "42.9f86d081884c7d65", or "42.3.9f86d081884c7d65" from worker 3)
+        """
+
+        body = str(session_id) if self.worker is None else str(session_id) + "." + str(self.worker)
+        return body + "." + hmac.new(self.secret, body.encode(), hashlib.sha256).hexdigest()[:16]
+
+    def check_token(self, token):
+        """
+        Checks the signature of a session token.
+        :param token: Represents the token sent by the client
+        :return: The session id if the token is valid, else None
+        """
+
+        session_id, _, signature = token.partition(".")
+        if not session_id.isdigit():
+            return None
+        if not hmac.compare_digest(self.make_token(int(session_id)), token):
+            return None
+        return int(session_id)
+
+    def token_worker(self, token):
+        """
+        Finds the worker process a session token was handed out by, without checking its signature.
+        :param token: Represents the token sent by the client
+        :return: Index of the worker, or None for a token handed out by a single process or a malformed token
+        """
+
+        fields = token.split(".")
+        return int(fields[1]) if len(fields) == 3 and fields[1].isdigit() else None
+
+    def hand_off(self, session, worker, token):
+        """
+        Hands a connection that asked to resume another worker's game to that worker, through the supervisor. The
+        RESUME frame and anything read after it go along with the socket, and the connection is closed here.
+        :param session: Represents the GameSession of the connection
+        :param worker: Represents the index of the worker holding the game
+        :param token: Represents the session token sent in the RESUME frame
+        :return: True if the connection was handed off, False if it has to be declined here
+        """
+
+        import supervisor
+
+        decoder = session.decoder
+        message = (worker.to_bytes(2, "big") + protocol.encode_frame(protocol.RESUME, token.encode())
+                   + bytes(decoder.view[decoder.start:decoder.end]))
+        sock = session.transport.get_extra_info("socket")
+        if self.handoff is None or sock is None or len(message) > supervisor.HANDOFF_SIZE:
+            return False
+        try:
+            socket.send_fds(self.handoff, [message], [sock.fileno()])
+        except OSError:
+            return False
+        session.transport.abort()       # the socket now travels in the message, only this process's copy is closed
+        return True
+
+    def receive_handoffs(self):
+        """
+        Serves every connection handed to this worker by the supervisor, replaying the bytes read by the worker it
+        reached first, so the session answers its RESUME.
+        :return: NONE
+        """
+
+        import supervisor
+
+        while True:
+            try:
+                message, fds, flags, address = socket.recv_fds(self.handoff, supervisor.HANDOFF_SIZE, 1)
+            except OSError:         # nothing left to read
+                return
+            for fd in fds:
+                asyncio.ensure_future(self.adopt(socket.socket(fileno=fd), message))
+
+    async def adopt(self, sock, received):
+        """
+        Serves a connection handed over by another worker.
+        :param sock: Represents the connected socket
+        :param received: Represents the bytes the other worker read from it
+        :return: NONE
+        """
+
+        session = (await asyncio.get_running_loop().connect_accepted_socket(lambda: GameSession(self), sock))[1]
+        session.decoder.feed(received)
+        session.process_frames()
+
+    def detach(self, session):
+        """
+        Keeps the game of a dropped connection until it is resumed or its time to live runs out.
+        :param session: Represents the GameSession of the dropped connection
+        :return: NONE
+        """
+
+        if session.state == PENDING:      # the batched move was dropped, the client sends it again after resuming
+            session.state = PLAYING
+        timer = self.timers.schedule(self.resume_ttl, self.expire, session.session_id)
+        self.detached[session.session_id] = (session, timer)
+
+    def expire(self, session_id):
+        """
+        Ends a game that was not resumed in time.
+        :param session_id: Represents the session id of the game
+        :return: NONE
+        """
+
+        session, timer = self.detached.pop(session_id)
+        session.state = CLOSED
+        if session.match is not None:
+            self.end_match(session.match)
+            return
+        self.close_audience(session_id)
+        session.game.save_history()
+        if self.move_log is not None:
+            self.move_log.close_game(session_id)
+
+    def find_session(self, session_id):
+        """
+        Looks up the session playing a game, connected or waiting to be resumed.
+        :param session_id: Represents the session id of the player
+        :return: The GameSession, or None if there is no such game
+        """
+
+        session = self.attached.get(session_id)
+        if session is None and session_id in self.detached:
+            session = self.detached[session_id][0]
+        return session
+
+    def publish(self, session):
+        """
+        Sends the state of a game to its spectators, if it has any.
+        :param session: Represents a GameSession playing the game
+        :return: NONE
+        """
+
+        audience = self.audiences.get(session.game_id())
+        if audience is not None:
+            audience.publish(protocol.encode_frame(protocol.WATCH, session.resume_state().encode()))
+
+    def close_audience(self, game_id):
+        """
+        Tells the spectators of a game that has ended with a QUIT frame and disconnects them.
+        :param game_id: Represents the id of the game
+        :return: NONE
+        """
+
+        audience = self.audiences.pop(game_id, None)
+        if audience is not None:
+            for spectator in list(audience.spectators):
+                spectator.state = CLOSED
+                spectator.send_message(protocol.QUIT)
+                spectator.close()
+
+    def resume(self, token):
+        """
+        Hands a game over to a new connection. A game still held by a connection the server has not yet seen drop is
+        taken from that connection.
+        :param token: Represents the session token sent by the client
+        :return: The GameSession that held the game, or None if the token is not valid or the game has expired
+        """
+
+        session_id = self.check_token(token)
+        if session_id is None:
+            return None
+        if session_id in self.detached:
+            old, timer = self.detached.pop(session_id)
+            timer.cancel()
+            return old
+
+        old = self.attached.pop(session_id, None)
+        if old is None:
+            return None
+        old.release_slot()
+        old.cancel_deadline()
+        old.transport.abort()
+        return old
+
+    def restore(self, games):
+        """
+        Keeps every game recovered from the move log until it is resumed or its time to live runs out.
+        :param games: Represents the dictionary mapping session id to movelog.GameRecord
+        :return: NONE
+        """
+
+        for session_id, record in games.items():
+            session = GameSession(self)
+            session.session_id = session_id
+            game = session.game
+            game.history = None         # the moves made before the restart are not known, the game is not recorded
+            game.size = record.size
+            game.create_board()
+            game.round_count = record.round_count
+
+            # the last position of a line in row order sees the whole line
+            finished = False
+            for index in range(record.size[0] * record.size[1]):
+                for player, bits in (("X", record.x), ("O", record.o)):
+                    if bits >> index & 1:
+                        game.board.place(index, player)
+                        finished = finished or game.board.has_won(player)
+            session.state = FINISHED if finished or game.board.is_full() else PLAYING
+            self.detach(session)
+
+    def start_match(self, first, second):
+        """
+        Starts a game between two clients paired by the lobby.
+        :param first: Represents the GameSession that plays "X"
+        :param second: Represents the GameSession that plays "O"
+        :return: NONE
+        """
+
+        match = Match(self, first.ticket.size)
+        self.games += 1
+        for role, session in (("X", first), ("O", second)):
+            session.ticket = None
+            session.release_slot()
+            session.match = match
+            session.role = role
+            session.game = match.game
+            session.state = PLAYING
+            match.players[role] = session
+            self.attached[session.session_id] = session
+            session.send_message(protocol.ACCEPT, session.accept_payload())
+        match.update_deadlines()
+
+    def end_match(self, match):
+        """
+        Ends a match once one of its players has quit or did not resume in time. The other player is told with a QUIT
+        frame and disconnected.
+        :param match: Represents the Match
+        :return: NONE
+        """
+
+        self.close_audience(match.players["X"].session_id)
+        match.game.save_history()
+        for session in match.players.values():
+            session_id = session.session_id
+            if self.attached.get(session_id) is session:
+                del self.attached[session_id]
+                session.state = CLOSED
+                session.send_message(protocol.QUIT)
+                session.close()
+            elif session_id in self.detached and self.detached[session_id][0] is session:
+                self.detached.pop(session_id)[1].cancel()
+
+    def sweep_lobby(self):
+        """
+        Starts a game against the engine for every player that waited too long in the lobby. Runs every LOBBY_SWEEP
+        seconds.
+        :return: NONE
+        """
+
+        for ticket in self.lobby.expire():
+            ticket.player.start_game(ticket.size)
+        asyncio.get_running_loop().call_later(LOBBY_SWEEP, self.sweep_lobby)
+
+    def queue_chat(self, outbox):
+        """
+        Schedules writing the chat held by an outbox, after the game frames handled in the same event loop iteration.
+        :param outbox: Represents the outbox.Outbox holding the chat
+        :return: NONE
+        """
+
+        if not self.chat_waiting:
+            asyncio.get_running_loop().call_soon(self.flush_chat)
+        self.chat_waiting.append(outbox)
+
+    def flush_chat(self):
+        """
+        Writes the chat held by every outbox scheduled by queue_chat().
+        :return: NONE
+        """
+
+        waiting, self.chat_waiting = self.chat_waiting, []
+        for outbox in waiting:
+            outbox.flush_chat()
+
+    def report_stats(self):
+        """
+        Prints the lobby's queue-wait statistics as a line of JSON. Runs every stats interval.
+        :return: NONE
+        """
+
+        print("lobby", json.dumps(self.lobby.stats()), flush=True)
+        asyncio.get_running_loop().call_later(self.stats_interval, self.report_stats)
+
+    def tick_timers(self):
+        """
+        Fires every heartbeat, deadline and resume timer that came due. Runs every TIMER_TICK seconds.
+        :return: NONE
+        """
+
+        loop = asyncio.get_running_loop()
+        self.timers.advance(loop.time())
+        loop.call_later(TIMER_TICK, self.tick_timers)
+
+    def flush_records(self):
+        """
+        Appends the game records collected since the last flush to the record file, so a quiet server does not hold
+        finished games in memory. Runs every history.FLUSH_INTERVAL seconds.
+        :return: NONE
+        """
+
+        if self.recorder.buffer:
+            self.recorder.flush()
+        asyncio.get_running_loop().call_later(history.FLUSH_INTERVAL, self.flush_records)
+
+    def stats(self):
+        """
+        Summarizes the server's counters and the number of live sessions and games.
+        :return: Dictionary of statistics
+        """
+
+        return {
+            "connections": self.connections,
+            "games": self.games,
+            "moves": self.moves,
+            "chat_relayed": self.chat_relayed,
+            "chat_dropped": self.chat_dropped,
+            "frames_coalesced": self.frames_coalesced,
+            "frames_dropped": self.frames_dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "moves_rejected": self.moves_rejected,
+            "bytes_received": self.bytes_received,
+            "bytes_sent": self.bytes_sent,
+            "sessions": len(self.sessions),
+            "attached": len(self.attached),
+            "detached": len(self.detached),
+            "lobby_waiting": self.lobby.waiting,
+        }
+
+    def snapshot_sessions(self):
+        """
+        Describes every connected session, for the admin socket and profiles.
+        :return: Dictionary of the sessions and the number of games waiting to be resumed
+        """
+
+        quiet = self.timers.current
+        sessions = []
+        for session in self.sessions:
+            outbox = session.outbox
+            playing = session.state != INVITING and session.state != WATCHING
+            opponent = session.match.players["O" if session.role == "X" else "X"] if session.match else None
+            sessions.append({
+                "session_id": session.session_id,
+                "state": STATE_NAMES[session.state],
+                "role": session.role,
+                "opponent": opponent.session_id if opponent is not None else None,
+                "game": session.resume_state() if playing else None,
+                "quiet_seconds": (quiet - session.last_seen) * self.timers.tick,
+                "queued_bytes": outbox.queued,
+                "writable": outbox.writable,
+                "over_limit": outbox.over,
+            })
+        return {"sessions": sessions, "detached": len(self.detached), "audiences": len(self.audiences)}
+
+    def start_profile(self, seconds=None):
+        """
+        Starts profiling the server for a number of seconds, unless a profile is already running. Runs on SIGUSR1 and
+        for the admin socket's "profile" command.
+        :param seconds: Represents the length of the profile in seconds, None for profile_seconds
+        :return: Path the profile's files are written to, without their extension, or None
+        """
+
+        import admin        # cProfile and pstats are only loaded once a profile is asked for
+
+        if self.profile is not None:
+            return None
+        seconds = seconds or self.profile_seconds
+        self.profile = admin.Profile(self, GameSession, self.profile_dir)
+        self.profile.start()
+        asyncio.get_running_loop().call_later(seconds, self.stop_profile, self.profile)
+        print("Profiling for", seconds, "seconds into", self.profile.path, flush=True)
+        return self.profile.path
+
+    def stop_profile(self, profile):
+        """
+        Stops a profile and writes its files.
+        :param profile: Represents the admin.Profile, the profile may already have been stopped by drain()
+        :return: NONE
+        """
+
+        if self.profile is profile:
+            self.profile = None
+            print("Profile written to", ", ".join(profile.stop()), flush=True)
+
+    def snapshot_games(self):
+        """
+        Captures the state of every game for a move log snapshot.
+        :return: Tuple of (next session id, list of (session id, movelog.GameRecord))
+        """
+
+        sessions = list(self.attached.values()) + [session for session, timer in self.detached.values()]
+        games = []
+        for session in sessions:
+            if session.match is None:       # matches between two clients are not logged
+                game = session.game
+                record = movelog.GameRecord(game.size, game.board.x, game.board.o, game.round_count)
+                games.append((session.session_id, record))
+        return self.next_session_id, games
+
+    async def start(self):
+        """
+        Recovers games from the move log, binds the listening socket and begins accepting connections.
+        :return: NONE
+        """
+
+        loop = asyncio.get_running_loop()
+        self.timers = timerwheel.TimerWheel(TIMER_TICK, loop.time())
+        if self.move_log is not None:
+            recovered, self.next_session_id = self.move_log.open()
+            self.secret = self.move_log.load_secret()
+            self.restore(recovered)
+            self.move_log.start(self.snapshot_games)
+            print("Recovered", len(recovered), "games from", self.move_log.directory)
+
+        loop.call_later(TIMER_TICK, self.tick_timers)
+        loop.call_later(LOBBY_SWEEP, self.sweep_lobby)
+        if self.recorder is not None:
+            loop.call_later(history.FLUSH_INTERVAL, self.flush_records)
+        if self.stats_interval:
+            loop.call_later(self.stats_interval, self.report_stats)
+        if self.metrics_port:
+            self.metrics_server = await metrics.serve(self.metrics, "127.0.0.1", self.metrics_port)
+        if self.admin_socket:
+            import admin
+
+            self.admin_server = await admin.serve(self, self.admin_socket)
+        loop.add_signal_handler(signal.SIGUSR1, self.start_profile)
+        if self.handoff is not None:
+            self.handoff.setblocking(False)
+            loop.add_reader(self.handoff.fileno(), self.receive_handoffs)
+        if self.unix_path:
+            self.server = await loop.create_unix_server(lambda: GameSession(self), self.unix_path,
+                                                        backlog=self.backlog)
+        else:
+            self.server = await loop.create_server(lambda: GameSession(self), self.host, self.port,
+                                                   backlog=self.backlog, reuse_address=True,
+                                                   reuse_port=self.reuse_port or None)
+
+    async def serve_socket(self, sock):
+        """
+        Serves a client over a socket that is already connected, e.g. one end of a socket.socketpair() whose other end
+        is held by a client in the same process. The server must have been started.
+        :param sock: Represents the connected socket
+        :return: NONE
+        """
+
+        await asyncio.get_running_loop().connect_accepted_socket(lambda: GameSession(self), sock)
+
+    async def serve_forever(self):
+        """
+        Starts the server and serves connections until cancelled.
+        :return: NONE
+        """
+
+        await self.start()
+        if self.unix_path:
+            print("Server listening on:", self.unix_path)
+        else:
+            print("Server listening on:", self.host, "on port:", self.port)
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            if self.move_log is not None:
+                await self.move_log.close()
+            if self.recorder is not None:
+                self.recorder.close()
+
+    async def drain(self, timeout):
+        """
+        Stops accepting connections and waits for the games in progress to finish before closing the move log. Used
+        by a worker process that is being replaced, other workers bound to the same port take the new connections.
+        :param timeout: Represents the number of seconds to wait before dropping the remaining connections
+        :return: NONE
+        """
+
+        self.server.close()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        if self.admin_server is not None:
+            self.admin_server.close()
+        if self.profile is not None:
+            self.stop_profile(self.profile)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.sessions and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+        for session in list(self.sessions):
+            session.transport.abort()
+        await asyncio.sleep(0)      # let the aborted connections detach their games
+        if self.move_log is not None:
+            await self.move_log.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+
+async def serve(server):
+    """
+    Runs a GameServer in a single process until SIGINT or SIGTERM. Either signal cancels serve_forever(), which
+    closes the move log and the record file on the way out.
+    :param server: Represents the GameServer
+    :return: NONE
+    """
+
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    await server.serve_forever()
+
+
+def main():
+    """
+    Parses the command line and runs a GameServer until interrupted, or a supervisor running one GameServer in each of
+    several worker processes.
+    :return: NONE
+    """
+
+    parser = argparse.ArgumentParser(description="Multi-session tic-tac-toe server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2221)
+    parser.add_argument("--unix", metavar="PATH",
+                        help="listen on this Unix socket instead of --host and --port, worker N adds .N")
+    parser.add_argument("--backlog", type=int, default=4096)
+    parser.add_argument("--batch", action="store_true", help="evaluate all moves once per loop tick (needs NumPy)")
+    parser.add_argument("--difficulty", choices=sorted(engine.DIFFICULTY), default="hard")
+    parser.add_argument("--tablebase", help="read the engine's moves and hints from this tablebase file")
+    parser.add_argument("--log-dir", help="append accepted moves to a move log in this directory and recover from it")
+    parser.add_argument("--record", metavar="PATH",
+                        help="append the record of every game to this file (see history.py), worker N adds .N")
+    parser.add_argument("--resume-ttl", type=float, default=60.0,
+                        help="seconds a game is kept for the client to resume after its connection drops")
+    parser.add_argument("--lobby-window", type=int, default=200,
+                        help="largest rating difference between two players paired by the lobby")
+    parser.add_argument("--lobby-wait", type=float, default=10.0,
+                        help="seconds a player waits in the lobby for an opponent before playing the engine")
+    parser.add_argument("--stats-interval", type=float, default=0.0, help="print lobby statistics every N seconds")
+    parser.add_argument("--heartbeat-interval", type=float, default=10.0,
+                        help="seconds a client may be quiet before the server sends it a PING")
+    parser.add_argument("--heartbeat-timeout", type=float, default=30.0,
+                        help="seconds a client may be quiet before the server disconnects it")
+    parser.add_argument("--move-timeout", type=float, default=60.0,
+                        help="seconds a client has to move or ask for a rematch before its game ends, 0 for none")
+    parser.add_argument("--chat-rate", type=float, default=5.0, help="chat messages per second a client may send")
+    parser.add_argument("--chat-burst", type=int, default=10, help="chat messages a client may send at once")
+    parser.add_argument("--send-high", type=int, default=65536,
+                        help="bytes queued for a client that does not read before --slow-policy applies")
+    parser.add_argument("--send-low", type=int, default=16384,
+                        help="queued bytes under which --slow-policy is lifted again")
+    parser.add_argument("--slow-policy", choices=outbox.POLICIES, default="throttle",
+                        help="stop reading from, drop frames for or disconnect a client over --send-high")
+    parser.add_argument("--stall-timeout", type=float, default=10.0,
+                        help="seconds a client may go without reading what it was sent before it is disconnected")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="serve metrics on this local port in the Prometheus format, worker N uses the port + N")
+    parser.add_argument("--profile-dir", default=".", help="directory profiles started by SIGUSR1 are written to")
+    parser.add_argument("--profile-seconds", type=float, default=10.0, help="length of a profile started by SIGUSR1")
+    parser.add_argument("--admin-socket",
+                        help="take admin commands (profile, sessions, stats) on this Unix socket, worker N adds .N")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="run N worker processes sharing the port with SO_REUSEPORT, 0 for a single process")
+    parser.add_argument("--drain-timeout", type=float, default=30.0,
+                        help="seconds a worker replaced by a rolling restart waits for its games to finish")
+    args = parser.parse_args()
+
+    if args.workers:
+        import supervisor
+
+        def make_server(index, handoff):
+            log_dir = os.path.join(args.log_dir, "worker-" + str(index)) if args.log_dir else None
+            return GameServer(args.host, args.port, args.backlog, args.batch, args.difficulty, args.tablebase,
+                              log_dir, args.resume_ttl, args.lobby_window, args.lobby_wait, 0.0,
+                              args.heartbeat_interval, args.heartbeat_timeout, args.move_timeout, reuse_port=True,
+                              chat_rate=args.chat_rate, chat_burst=args.chat_burst, send_high=args.send_high,
+                              send_low=args.send_low, slow_policy=args.slow_policy,
+                              stall_timeout=args.stall_timeout,
+                              metrics_port=args.metrics_port + index if args.metrics_port else 0,
+                              profile_dir=args.profile_dir, profile_seconds=args.profile_seconds,
+                              admin_socket=args.admin_socket + "." + str(index) if args.admin_socket else None,
+                              unix_path=args.unix + "." + str(index) if args.unix else None,
+                              record_path=args.record + "." + str(index) if args.record else None, worker=index,
+                              handoff=handoff)
+
+        # a worker's move log can only be opened by one process, its replacement starts once it has exited
+        supervisor.Supervisor(make_server, args.workers, args.stats_interval, args.drain_timeout,
+                              serial=args.log_dir is not None).run()
+        return
+
+    server = GameServer(args.host, args.port, args.backlog, args.batch, args.difficulty, args.tablebase,
+                        args.log_dir, args.resume_ttl, args.lobby_window, args.lobby_wait, args.stats_interval,
+                        args.heartbeat_interval, args.heartbeat_timeout, args.move_timeout,
+                        chat_rate=args.chat_rate, chat_burst=args.chat_burst, send_high=args.send_high,
+                        send_low=args.send_low, slow_policy=args.slow_policy, stall_timeout=args.stall_timeout,
+                        metrics_port=args.metrics_port, profile_dir=args.profile_dir,
+                        profile_seconds=args.profile_seconds, admin_socket=args.admin_socket, unix_path=args.unix,
+                        record_path=args.record)
+    try:
+        asyncio.run(serve(server))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://numpy.org/doc/stable/user/basics.indexing.html#advanced-indexing
+(2) https://www.chessprogramming.org/Bitboards
+
+Vectorized win/tie evaluation for many games at once. Every live game owns a slot in two uint16 arrays holding the
+"X" and "O" bitboards (see bitboard.py). A batch of pending moves is applied and every affected game is checked for a
+winner or a tie in a handful of NumPy operations instead of one Python call per game.
+
+Requires NumPy.
+"""
+
+import numpy as np
+
+import bitboard
+
+# game states returned by BatchEvaluator.play()
+ONGOING = 0
+X_WINS = 1
+O_WINS = 2
+TIE = 3
+
+# WIN_ARRAY[bits] is True if the 9-bit int "bits" holds a winning line
+WIN_ARRAY = np.array(bitboard.WIN_TABLE, dtype=bool)
+CELL_BITS = np.array([1 << index for index in range(9)], dtype=np.uint16)
+
+
+class BatchEvaluator:
+    """
+    Creates a BatchEvaluator Object. This class is responsible for storing the boards of every live game in shared
+    arrays, handing out a slot to each game, and applying and evaluating batches of moves.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Initializes the board arrays and the list of free slots.
+        :param capacity: Represents the number of games that fit before the arrays are grown
+        """
+
+        self.x = np.zeros(capacity, dtype=np.uint16)
+        self.o = np.zeros(capacity, dtype=np.uint16)
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def _grow(self):
+        """
+        Doubles the size of the board arrays.
+        :return: NONE
+        """
+
+        capacity = len(self.x)
+        self.x = np.concatenate((self.x, np.zeros(capacity, dtype=np.uint16)))
+        self.o = np.concatenate((self.o, np.zeros(capacity, dtype=np.uint16)))
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def allocate(self):
+        """
+        Reserves a slot holding an empty board for a new game.
+        :return: The slot number
+        """
+
+        if not self.free:
+            self._grow()
+        slot = self.free.pop()
+        self.x[slot] = 0
+        self.o[slot] = 0
+        return slot
+
+    def release(self, slot):
+        """
+        Returns a game's slot once the game is no longer needed.
+        :param slot: Represents the slot number
+        :return: NONE
+        """
+
+        self.free.append(slot)
+
+    def reset(self, slot, x=0, o=0):
+        """
+        Clears the board held in a slot for a rematch, or loads the board of a resumed game.
+        :param slot: Represents the slot number
+        :param x: Represents the positions held by "X"
+        :param o: Represents the positions held by "O"
+        :return: NONE
+        """
+
+        self.x[slot] = x
+        self.o[slot] = o
+
+    def evaluate(self, slots):
+        """
+        Checks the boards held in the given slots for a winner or a tie.
+        :param slots: Represents an int array of slot numbers
+        :return: uint8 array holding ONGOING, X_WINS, O_WINS or TIE for every slot
+        """
+
+        x = self.x[slots]
+        o = self.o[slots]
+        status = np.zeros(len(slots), dtype=np.uint8)
+        status[(x | o) == bitboard.FULL] = TIE
+        status[WIN_ARRAY[o]] = O_WINS
+        status[WIN_ARRAY[x]] = X_WINS
+        return status
+
+    def play(self, slots, cells, player):
+        """
+        Applies one move to each of the given games and evaluates the resulting boards. A game may appear only once in
+        a batch. Moves onto a taken position are rejected and leave that board unchanged.
+        :param slots: Represents an int array of slot numbers
+        :param cells: Represents an int array holding the bit index of each game's move
+        :param player: Represents the player character making every move, "X" or "O"
+        :return: Tuple of (bool array, True where the move was valid; uint8 array of game states)
+        """
+
+        bits = CELL_BITS[cells]
+        valid = ((self.x[slots] | self.o[slots]) & bits) == 0
+        board = self.x if player == "X" else self.o
+        board[slots[valid]] |= bits[valid]
+        return valid, self.evaluate(slots)
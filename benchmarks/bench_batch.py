@@ -0,0 +1,101 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Benchmark of batch.BatchEvaluator against calling Game.win_check() on every game one object at a time.
+Every board plays a random game; on each tick one move is applied to every game still in progress and all of them
+are checked for a winner or a tie.
+
+Run from the repository root (requires NumPy):
+    python -m benchmarks.bench_batch --boards 1000 100000 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import batch
+from game import Game
+
+
+def make_moves(boards, seed):
+    """
+    Builds a random order of the 9 positions for every board.
+    :param boards: Represents the number of boards
+    :param seed: Represents the random seed
+    :return: (boards x 9) int array of bit indexes
+    """
+
+    rng = np.random.default_rng(seed)
+    return rng.permuted(np.tile(np.arange(9, dtype=np.intp), (boards, 1)), axis=1)
+
+
+def run_batch(moves):
+    """
+    Plays every game to the end with a BatchEvaluator, one vectorized pass per tick.
+    :param moves: Represents the move order of every board
+    :return: Tuple of (seconds taken, number of board evaluations)
+    """
+
+    evaluator = batch.BatchEvaluator(len(moves))
+    slots = np.array([evaluator.allocate() for i in range(len(moves))], dtype=np.intp)
+    live = np.arange(len(moves), dtype=np.intp)
+    evaluations = 0
+    start = time.perf_counter()
+    for turn in range(9):
+        player = "X" if turn % 2 == 0 else "O"
+        status = evaluator.play(slots[live], moves[live, turn], player)[1]
+        evaluations += len(live)
+        live = live[status == batch.ONGOING]
+        if not len(live):
+            break
+    return time.perf_counter() - start, evaluations
+
+
+def run_objects(moves):
+    """
+    Plays every game to the end with one Game object per game, calling win_check() on each in turn.
+    :param moves: Represents the move order of every board
+    :return: Tuple of (seconds taken, number of board evaluations)
+    """
+
+    games = [Game() for i in range(len(moves))]
+    order = moves.tolist()
+    live = list(range(len(moves)))
+    evaluations = 0
+    start = time.perf_counter()
+    for turn in range(9):
+        player = "X" if turn % 2 == 0 else "O"
+        still_live = []
+        for number in live:
+            game = games[number]
+            game.board.place(order[number][turn], player)
+            if not game.win_check(game.board, player) and not game.board.is_full():
+                still_live.append(number)
+        evaluations += len(live)
+        live = still_live
+        if not live:
+            break
+    return time.perf_counter() - start, evaluations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch win/tie evaluation throughput")
+    parser.add_argument("--boards", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--seed", type=int, default=2221)
+    args = parser.parse_args()
+
+    print(f"{'boards':>10} {'batch evals/sec':>18} {'object evals/sec':>18} {'speedup':>8}")
+    for boards in args.boards:
+        moves = make_moves(boards, args.seed)
+        batch_seconds, evaluations = run_batch(moves)
+        object_seconds, object_evaluations = run_objects(moves)
+        assert evaluations == object_evaluations
+        print(f"{boards:>10,} {evaluations / batch_seconds:>18,.0f} {evaluations / object_seconds:>18,.0f} "
+              f"{object_seconds / batch_seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
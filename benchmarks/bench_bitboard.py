@@ -0,0 +1,154 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Micro-benchmark comparing the list of lists game board that TicTacToe used originally with the BitBoard engine.
+Both boards replay the same random games, calling check_valid_move(), win_check() and the tie check after every
+move.
+
+Run from the repository root:
+    python -m benchmarks.bench_bitboard --games 20000
+"""
+
+import argparse
+import random
+import time
+
+import bitboard
+
+
+class LegacyBoard:
+    """
+    Copy of the original list of lists board logic from client.py / server.py, kept only for comparison.
+    """
+
+    def __init__(self):
+        self.game_board = [["-"] * 3 for i in range(3)]
+        self.round_count = 0
+
+    def check_valid_move(self, coordinates, player):
+        try:
+            coord_split = coordinates.split(",")
+            int(coord_split[0])
+            int(coord_split[1])
+        except (ValueError, IndexError):
+            return False
+        coord_split = coordinates.split(",")
+        x_coord = int(coord_split[0])
+        y_coord = int(coord_split[1])
+        if x_coord <= 2 and y_coord <= 2:
+            if self.game_board[x_coord][y_coord] == "-":
+                self.game_board[x_coord][y_coord] = player
+                return True
+        return False
+
+    def win_check(self, player):
+        board = self.game_board
+        char_count = 0
+        for i in range(3):
+            for j in range(3):
+                if board[i][j] == player:
+                    char_count += 1
+            if char_count == 3:
+                return True
+            char_count = 0
+        for i in range(3):
+            for j in range(3):
+                if board[j][i] == player:
+                    char_count += 1
+            if char_count == 3:
+                return True
+            char_count = 0
+        for i in range(3):
+            if board[i][i] == player:
+                char_count += 1
+        if char_count == 3:
+            return True
+        return False
+
+    def is_tie(self):
+        self.round_count += 1
+        return self.round_count == 9
+
+
+class BitBoardGame:
+    """
+    The same operations as LegacyBoard, implemented the way TicTacToe now does on top of a BitBoard.
+    """
+
+    def __init__(self):
+        self.board = bitboard.BitBoard()
+
+    def check_valid_move(self, coordinates, player):
+        index = bitboard.cell_index(coordinates)
+        if index is None or not self.board.is_open(index):
+            return False
+        self.board.place(index, player)
+        return True
+
+    def win_check(self, player):
+        return self.board.has_won(player)
+
+    def is_tie(self):
+        return self.board.is_full()
+
+
+def make_games(count, seed):
+    """
+    Builds random move sequences, every game is a shuffled list of all 9 positions as "row,column" strings.
+    :param count: Represents the number of games to build
+    :param seed: Represents the random seed
+    :return: List of move lists
+    """
+
+    rng = random.Random(seed)
+    cells = [str(i) + "," + str(j) for i in range(3) for j in range(3)]
+    games = []
+    for i in range(count):
+        moves = cells[:]
+        rng.shuffle(moves)
+        games.append(moves)
+    return games
+
+
+def play(board_class, games):
+    """
+    Replays every game on a fresh board until it is won or tied.
+    :param board_class: Represents the board implementation being measured
+    :param games: Represents the move sequences to replay
+    :return: Tuple of (seconds taken, number of moves played)
+    """
+
+    moves_played = 0
+    start = time.perf_counter()
+    for moves in games:
+        board = board_class()
+        player = "X"
+        for coordinates in moves:
+            board.check_valid_move(coordinates, player)
+            moves_played += 1
+            if board.win_check(player) or board.is_tie():
+                break
+            player = "O" if player == "X" else "X"
+    return time.perf_counter() - start, moves_played
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the list board with the bitboard engine")
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=2221)
+    args = parser.parse_args()
+
+    games = make_games(args.games, args.seed)
+    results = {}
+    for name, board_class in (("list board", LegacyBoard), ("bitboard", BitBoardGame)):
+        seconds, moves_played = play(board_class, games)
+        results[name] = seconds
+        print(f"{name:>10}: {seconds:.3f}s  {moves_played / seconds:,.0f} moves/sec  "
+              f"{seconds / moves_played * 1e9:,.0f} ns/move")
+    print(f"speedup: {results['list board'] / results['bitboard']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
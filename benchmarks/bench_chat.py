@@ -0,0 +1,255 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Chat flood benchmark. Starts async_server.py in a separate process and pairs N matches through the lobby. Both
+players of every match play games as fast as the server relays their moves. In the chat runs both players also send
+200 byte chat messages at many times the server's rate limit, saturating the chat channel, and a separate process
+runs matches whose players do nothing but send chat as fast as their connections take it. Reports the p50/p99 time
+for a move to be relayed to the other player, for a run without chat, a run with the server's default chat rate limit
+and a run with the limit lifted. The move p99 of both chat runs must stay within --max-p99-ratio times the p99 of the
+run without chat, else the benchmark exits with an error.
+
+Run from the repository root:
+    python -m benchmarks.bench_chat --pairs 50 --seconds 5
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import subprocess
+import sys
+import time
+
+import bitboard
+import protocol
+from benchmarks.bench_e2e import percentile, wait_for_port
+
+CHAT = protocol.encode_frame(protocol.CHAT, b"x" * 200)
+FLOOD_RATING = 5000     # far outside the rating window of the measured players, so they are never paired together
+SCENARIOS = (
+    ("no_chat", False, []),
+    ("chat", True, []),
+    ("chat_unlimited", True, ["--chat-rate", "1e9", "--chat-burst", "1000000000"]),
+)
+
+
+class Player:
+    """
+    Creates a Player Object. Holds one side of a match: its connection and the game frames it has received.
+    """
+
+    def __init__(self, reader, writer):
+        """
+        Initializes the player.
+        :param reader: Represents the connection's StreamReader
+        :param writer: Represents the connection's StreamWriter
+        """
+
+        self.reader = reader
+        self.writer = writer
+        self.frames = asyncio.Queue()       # game frames, chat is only counted
+        self.chat = 0
+
+    async def receive(self):
+        """
+        Reads frames until the connection closes.
+        :return: NONE
+        """
+
+        try:
+            while True:
+                opcode, length = protocol.HEADER.unpack(await self.reader.readexactly(protocol.HEADER.size))
+                payload = await self.reader.readexactly(length) if length else b""
+                if opcode == protocol.CHAT:
+                    self.chat += 1
+                elif opcode == protocol.PING:
+                    self.writer.write(protocol.encode_frame(protocol.PONG))
+                else:
+                    self.frames.put_nowait((opcode, payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.frames.put_nowait((protocol.QUIT, b""))
+
+
+async def pair(host, port, rating=1500):
+    """
+    Joins the lobby with two connections, one after the other so they are paired with each other.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param rating: Represents the rating both players join with
+    :return: Dictionary mapping "X" and "O" to the Players
+    """
+
+    players = {}
+    joined = []
+    for i in range(2):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(protocol.encode_frame(protocol.JOIN, b"3,3,3;" + str(rating).encode()))
+        joined.append(Player(reader, writer))
+    for player in joined:
+        asyncio.get_running_loop().create_task(player.receive())
+        opcode, payload = await player.frames.get()
+        players[payload.decode().split(";")[2]] = player
+    return players
+
+
+async def play(players, deadline, rng, latencies):
+    """
+    Plays random games until the deadline, timing how long each move takes to reach the other player.
+    :param players: Represents the dictionary mapping "X" and "O" to the Players
+    :param deadline: Represents the time.monotonic() value to stop at
+    :param rng: Represents the random number generator choosing the moves
+    :param latencies: Represents the list the relay times in seconds are appended to
+    :return: NONE
+    """
+
+    while time.monotonic() < deadline:
+        board = bitboard.make_board(3, 3, 3)
+        cells = list(range(9))
+        rng.shuffle(cells)
+        turn, other = "X", "O"
+        for index in cells:
+            board.place(index, turn)
+            start = time.perf_counter()
+            players[turn].writer.write(protocol.encode_frame(protocol.MOVE, board.coordinates(index).encode()))
+            opcode, payload = await players[other].frames.get()
+            if opcode != protocol.MOVE:
+                return
+            latencies.append(time.perf_counter() - start)
+            if board.has_won(turn) or board.is_full():
+                break
+            turn, other = other, turn
+        for player in players.values():
+            player.writer.write(protocol.encode_frame(protocol.REMATCH))
+        for player in players.values():
+            if (await player.frames.get())[0] != protocol.ACCEPT:
+                return
+
+
+async def chatter(player, deadline, rate):
+    """
+    Sends chat messages at a fixed rate until the deadline.
+    :param player: Represents the Player sending the chat
+    :param deadline: Represents the time.monotonic() value to stop at
+    :param rate: Represents the number of messages per second
+    :return: Number of chat messages sent
+    """
+
+    sent = 0
+    while time.monotonic() < deadline:
+        player.writer.write(CHAT)
+        sent += 1
+        await asyncio.sleep(1 / rate)
+    return sent
+
+
+async def flood(host, port, pairs, seconds):
+    """
+    Pairs matches whose players send chat as fast as their connections take it until the time is up.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param pairs: Represents the number of flooding matches
+    :param seconds: Represents the number of seconds to flood for
+    :return: NONE
+    """
+
+    async def firehose(player):
+        while time.monotonic() < deadline:
+            player.writer.write(CHAT * 16)
+            await player.writer.drain()
+
+    matches = [await pair(host, port, FLOOD_RATING) for i in range(pairs)]
+    deadline = time.monotonic() + seconds
+    await asyncio.gather(*(firehose(player) for players in matches for player in players.values()))
+
+
+def run_flood(host, port, pairs, seconds):
+    """
+    Entry point of the flooding process.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param pairs: Represents the number of flooding matches
+    :param seconds: Represents the number of seconds to flood for
+    :return: NONE
+    """
+
+    asyncio.run(flood(host, port, pairs, seconds))
+
+
+async def run(host, port, pairs, seconds, rate):
+    """
+    Pairs the matches and plays them for a fixed time.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param pairs: Represents the number of matches
+    :param seconds: Represents the number of seconds to play for
+    :param rate: Represents the number of chat messages per second sent by each player, 0 for none
+    :return: Tuple of (sorted relay times, chat messages sent, chat messages received)
+    """
+
+    matches = [await pair(host, port) for i in range(pairs)]
+    deadline = time.monotonic() + seconds
+    latencies = []
+    rng = random.Random(0)
+    chatters = [chatter(player, deadline, rate) for players in matches for player in players.values()] if rate else []
+    results = await asyncio.gather(*(play(players, deadline, rng, latencies) for players in matches), *chatters)
+    for players in matches:
+        for player in players.values():
+            player.writer.write(protocol.encode_frame(protocol.QUIT))
+            player.writer.close()
+    received = sum(player.chat for players in matches for player in players.values())
+    return sorted(latencies), sum(results[pairs:]), received
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move latency under a chat flood")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2235)
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--chat-rate", type=float, default=100.0, help="chat messages per second sent by each player")
+    parser.add_argument("--flood-pairs", type=int, default=2, help="matches doing nothing but flooding chat")
+    parser.add_argument("--max-p99-ratio", type=float, default=1.5,
+                        help="largest move p99 of a chat run as a multiple of the move p99 without chat")
+    args = parser.parse_args()
+
+    results = {"benchmark": "chat", "pairs": args.pairs}
+    for name, chat, server_args in SCENARIOS:
+        command = [sys.executable, "async_server.py", "--host", args.host, "--port", str(args.port)]
+        server = subprocess.Popen(command + server_args, stdout=subprocess.DEVNULL)
+        try:
+            wait_for_port(args.host, args.port)
+            if server.poll() is not None:
+                sys.exit("async_server.py exited with status " + str(server.returncode))
+            flooder = None
+            if chat and args.flood_pairs:
+                flooder = multiprocessing.get_context("fork").Process(
+                    target=run_flood, args=(args.host, args.port, args.flood_pairs, args.seconds + 1))
+                flooder.start()
+            rate = args.chat_rate if chat else 0
+            latencies, sent, received = asyncio.run(run(args.host, args.port, args.pairs, args.seconds, rate))
+            if flooder is not None:
+                flooder.join()
+        finally:
+            server.terminate()
+            server.wait()
+        results[name] = {
+            "moves": len(latencies),
+            "chat_sent": sent,
+            "chat_received": received,
+            "move_p50_us": percentile(latencies, 0.50) * 1e6,
+            "move_p99_us": percentile(latencies, 0.99) * 1e6,
+        }
+    bound = results["no_chat"]["move_p99_us"] * args.max_p99_ratio
+    over = [name for name, chat, server_args in SCENARIOS if results[name]["move_p99_us"] > bound]
+    results["move_p99_bound_us"] = bound
+    print(json.dumps(results, indent=2))
+    if over:
+        sys.exit("move p99 over " + str(round(bound)) + " us with chat in: " + ", ".join(over))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+End-to-end latency benchmark. Starts async_server.py on a loopback port in a separate process, runs N BotClients
+against it concurrently and reports games/sec, moves/sec and the p50/p99/p999 round-trip time of a move. Results are
+written as JSON so runs can be compared between releases.
+
+Run from the repository root:
+    python -m benchmarks.bench_e2e --bots 100 --games 50 --output e2e.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+from bot_client import BotClient
+
+
+def percentile(ordered, fraction):
+    """
+    Looks up a percentile in a sorted list.
+    :param ordered: Represents the sorted samples
+    :param fraction: Represents the percentile as a fraction (e.g.: 0.99)
+    :return: The sample at that percentile, or None if there are no samples
+    """
+
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def wait_for_port(host, port, timeout=10.0):
+    """
+    Waits until a server accepts connections on the given address.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param timeout: Represents the number of seconds to wait
+    :return: NONE
+    """
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+async def run_bots(host, port, bots, games):
+    """
+    Runs every bot concurrently until all of them have finished.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param bots: Represents the number of bots
+    :param games: Represents the number of games played by each bot
+    :return: List of finished BotClients
+    """
+
+    clients = [BotClient(host, port, games, seed) for seed in range(bots)]
+    await asyncio.gather(*(client.run() for client in clients))
+    return clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end game latency benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2231)
+    parser.add_argument("--bots", type=int, default=100)
+    parser.add_argument("--games", type=int, default=50, help="games played by each bot")
+    parser.add_argument("--server-args", default="", help="extra arguments passed to async_server.py")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    command = [sys.executable, "async_server.py", "--host", args.host, "--port", str(args.port)]
+    server = subprocess.Popen(command + args.server_args.split(), stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.host, args.port)
+        if server.poll() is not None:
+            sys.exit("async_server.py exited with status " + str(server.returncode))
+        start = time.perf_counter()
+        clients = asyncio.run(run_bots(args.host, args.port, args.bots, args.games))
+        seconds = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    games = sum(client.games_played for client in clients)
+    moves = sum(client.moves_played for client in clients)
+    results = {
+        "benchmark": "e2e",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "bots": args.bots,
+        "games_per_bot": args.games,
+        "server_args": args.server_args,
+        "seconds": seconds,
+        "games": games,
+        "moves": moves,
+        "games_per_sec": games / seconds,
+        "moves_per_sec": moves / seconds,
+        "rtt_samples": len(latencies),
+        "rtt_p50_us": percentile(latencies, 0.50) * 1e6 if latencies else None,
+        "rtt_p99_us": percentile(latencies, 0.99) * 1e6 if latencies else None,
+        "rtt_p999_us": percentile(latencies, 0.999) * 1e6 if latencies else None,
+    }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
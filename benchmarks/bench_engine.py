@@ -0,0 +1,91 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Benchmark of the built-in engine. Every reachable position where the game is still in progress is solved (all
+moves scored) first with an empty transposition table and then again with the warm table. Reports positions solved
+per second, the transposition table hit rate and the average time per move. With --tablebase the same positions are
+also looked up in a tablebase file (see tablebase.py).
+
+Run from the repository root:
+    python -m benchmarks.bench_engine
+"""
+
+import argparse
+import time
+
+import bitboard
+import engine
+import tablebase
+
+
+def reachable_positions():
+    """
+    Lists every position that can occur in a game and is not yet won or tied.
+    :return: List of (BitBoard, player to move) tuples
+    """
+
+    positions = []
+    seen = set()
+    stack = [(0, 0, "X")]
+    while stack:
+        x, o, player = stack.pop()
+        if (x, o) in seen:
+            continue
+        seen.add((x, o))
+        board = bitboard.BitBoard(x, o)
+        if board.has_won("X") or board.has_won("O") or board.is_full():
+            continue
+        positions.append((board, player))
+        for index in board.open_cells():
+            if player == "X":
+                stack.append((x | 1 << index, o, "O"))
+            else:
+                stack.append((x, o | 1 << index, "X"))
+    return positions
+
+
+def solve_all(searcher, positions):
+    """
+    Scores every move of every position.
+    :param searcher: Represents the Engine doing the search
+    :param positions: Represents the positions to solve
+    :return: Seconds taken
+    """
+
+    start = time.perf_counter()
+    for board, player in positions:
+        searcher.best_moves(board, player)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine search throughput")
+    parser.add_argument("--rounds", type=int, default=5, help="warm table passes over every position")
+    parser.add_argument("--tablebase", help="also time lookups in this tablebase file")
+    args = parser.parse_args()
+
+    positions = reachable_positions()
+    table = engine.TranspositionTable()
+    searcher = engine.Engine("hard", table=table)
+    print(f"{len(positions):,} reachable positions in progress")
+
+    seconds = solve_all(searcher, positions)
+    print(f"cold table: {len(positions) / seconds:>12,.0f} positions/sec  {seconds / len(positions) * 1e6:8.1f} us/move"
+          f"  hit rate {table.hit_rate():.1%}  {searcher.nodes:,} nodes  {len(table.entries):,} entries")
+
+    table.probes = table.hits = 0
+    seconds = sum(solve_all(searcher, positions) for i in range(args.rounds))
+    solved = len(positions) * args.rounds
+    print(f"warm table: {solved / seconds:>12,.0f} positions/sec  {seconds / solved * 1e6:8.1f} us/move"
+          f"  hit rate {table.hit_rate():.1%}")
+
+    if args.tablebase:
+        tablebase_engine = engine.Engine("hard", tablebase=tablebase.Tablebase(args.tablebase))
+        seconds = sum(solve_all(tablebase_engine, positions) for i in range(args.rounds))
+        print(f" tablebase: {solved / seconds:>12,.0f} positions/sec  {seconds / solved * 1e6:8.1f} us/move")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Benchmark of GridBoard's incremental win check on large boards. Random games are played to the end (a win or a full
+board) and every move is checked both with GridBoard.has_won(), which only follows the four lines through the last
+move, and with a full scan of every k in a row line on the board.
+
+Run from the repository root:
+    python -m benchmarks.bench_grid --games 10
+"""
+
+import argparse
+import random
+import time
+
+import bitboard
+
+
+def line_masks(height, width, k):
+    """
+    Builds a bit mask for every line of k positions on the board, in all four directions.
+    :param height: Represents the number of rows
+    :param width: Represents the number of columns
+    :param k: Represents the number of characters in a row needed to win
+    :return: List of masks
+    """
+
+    masks = []
+    for row in range(height):
+        for column in range(width):
+            for row_step, column_step in bitboard.GridBoard.DIRECTIONS:
+                end_row = row + row_step * (k - 1)
+                end_column = column + column_step * (k - 1)
+                if 0 <= end_row < height and 0 <= end_column < width:
+                    mask = 0
+                    for step in range(k):
+                        mask |= 1 << ((row + row_step * step) * width + column + column_step * step)
+                    masks.append(mask)
+    return masks
+
+
+def make_games(height, width, count, seed):
+    """
+    Builds random move orders covering the whole board.
+    :param height: Represents the number of rows
+    :param width: Represents the number of columns
+    :param count: Represents the number of games
+    :param seed: Represents the random seed
+    :return: List of move lists
+    """
+
+    rng = random.Random(seed)
+    games = []
+    for i in range(count):
+        moves = list(range(height * width))
+        rng.shuffle(moves)
+        games.append(moves)
+    return games
+
+
+def play(height, width, k, games, check):
+    """
+    Plays every game until the win check reports a winner or the board is full.
+    :param height: Represents the number of rows
+    :param width: Represents the number of columns
+    :param k: Represents the number of characters in a row needed to win
+    :param games: Represents the move orders
+    :param check: Represents the win check, called with (board, player)
+    :return: Tuple of (seconds taken, number of checks)
+    """
+
+    checks = 0
+    start = time.perf_counter()
+    for moves in games:
+        board = bitboard.GridBoard(height, width, k)
+        player = "X"
+        for index in moves:
+            board.place(index, player)
+            checks += 1
+            if check(board, player) or board.is_full():
+                break
+            player = "O" if player == "X" else "X"
+    return time.perf_counter() - start, checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental vs. full scan win detection on large boards")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=2221)
+    args = parser.parse_args()
+
+    print(f"{'board':>12} {'moves/game':>11} {'incremental us':>15} {'full scan us':>13} {'speedup':>8}")
+    for height, width, k in ((15, 15, 5), (19, 19, 5), (32, 32, 6), (64, 64, 8)):
+        games = make_games(height, width, args.games, args.seed)
+        masks = line_masks(height, width, k)
+
+        def full_scan(board, player):
+            bits = board.x if player == "X" else board.o
+            for mask in masks:
+                if bits & mask == mask:
+                    return True
+            return False
+
+        incremental, checks = play(height, width, k, games, bitboard.GridBoard.has_won)
+        scan, scan_checks = play(height, width, k, games, full_scan)
+        assert checks == scan_checks
+        print(f"{str(height) + 'x' + str(width) + ' k=' + str(k):>12} {checks / len(games):>11.0f} "
+              f"{incremental / checks * 1e6:>15.2f} {scan / checks * 1e6:>13.2f} {scan / incremental:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Game record benchmark. Writes a record file of --records random 3x3 games (history.py), the games drawn from a pool of
+--distinct random games so the file is quick to build, then reads it back:
+
+    read      read_records() alone, in --chunk-size chunks and through mmap
+    analyze   read_records() and Analysis.add() for every record, in chunks and through mmap
+
+Each is reported as records/sec and MB/sec. One more chunked pass runs under tracemalloc and reports the peak memory
+allocated while analyzing, which stays the same however large the file is.
+
+Run from the repository root:
+    python -m benchmarks.bench_history --records 1000000
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+
+import bitboard
+import history
+
+
+def random_games(count, seed=0):
+    """
+    Plays random games and encodes each one as a record.
+    :param count: Represents the number of games
+    :param seed: Represents the random seed
+    :return: List of encoded records
+    """
+
+    rng = random.Random(seed)
+    records = []
+    for number in range(count):
+        board = bitboard.BitBoard()
+        moves = []
+        player = "X"
+        while not (board.has_won("X") or board.has_won("O") or board.is_full()):
+            index = rng.choice(board.open_cells())
+            board.place(index, player)
+            moves.append(index)
+            player = "O" if player == "X" else "X"
+        times = [min(history.MAX_TIME, int(rng.expovariate(1 / 1500))) for move in moves]
+        records.append(history.encode_record((3, 3, 3), history.outcome(board), 1654000000 + number, moves, times))
+    return records
+
+
+def write_file(path, records, distinct):
+    """
+    Writes a record file.
+    :param path: Represents the path of the file
+    :param records: Represents the number of records written
+    :param distinct: Represents the number of different random games the records are drawn from
+    :return: NONE
+    """
+
+    pool = random_games(distinct)
+    writer = history.RecordWriter(path)
+    for number in range(records):
+        writer.write(pool[number % distinct])
+    writer.close()
+
+
+def timed(path, analyze, chunk_size, use_mmap):
+    """
+    Reads a record file once.
+    :param path: Represents the path of the file
+    :param analyze: If True, every record is added to an Analysis
+    :param chunk_size: Represents the number of bytes read at once
+    :param use_mmap: If True, the file is mapped into memory instead of being read in chunks
+    :return: Tuple of (seconds taken, number of records)
+    """
+
+    start = time.perf_counter()
+    if analyze:
+        records = history.analyze(path, chunk_size=chunk_size, use_mmap=use_mmap).games
+    else:
+        records = 0
+        for record in history.read_records(path, chunk_size, use_mmap):
+            records += 1
+    return time.perf_counter() - start, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record file write and streaming analysis throughput")
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--distinct", type=int, default=10000, help="different random games in the file")
+    parser.add_argument("--chunk-size", type=int, default=history.CHUNK_SIZE)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "records.bin")
+        start = time.perf_counter()
+        write_file(path, args.records, args.distinct)
+        results["write_records_per_sec"] = args.records / (time.perf_counter() - start)
+        megabytes = os.path.getsize(path) / 1e6
+        results["file_mb"] = megabytes
+        results["bytes_per_record"] = megabytes * 1e6 / args.records
+
+        print("pass             records/sec      MB/sec")
+        for analyze in (False, True):
+            for use_mmap in (False, True):
+                name = ("analyze" if analyze else "read") + ("_mmap" if use_mmap else "_chunks")
+                seconds, records = timed(path, analyze, args.chunk_size, use_mmap)
+                results[name] = {"records_per_sec": records / seconds, "mb_per_sec": megabytes / seconds}
+                print(f"{name:<15}{records / seconds:>13,.0f}{megabytes / seconds:>12.1f}")
+
+        tracemalloc.start()
+        history.analyze(path, chunk_size=args.chunk_size)
+        results["analyze_peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    print(f"{results['bytes_per_record']:.1f} bytes per record, {results['analyze_peak_kb']:.0f} KiB peak while "
+          f"analyzing {results['file_mb']:.1f} MB")
+    print(json.dumps({"benchmark": "history", "python": platform.python_version(), "records": args.records,
+                      "distinct": args.distinct, "chunk_size": args.chunk_size, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
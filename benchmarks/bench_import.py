@@ -0,0 +1,112 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Import and startup benchmark. Every module is imported by a fresh interpreter started with "python -X importtime" and
+its cumulative import time, the module and everything it imports, is the best of --repeat runs. Then, in this
+process, reports the time to create:
+
+    game           --sessions game.Game objects
+    session        --sessions async_server.GameSession objects of one GameServer, with nothing connected
+    pair           --pairs server.TicTacToe and client.TicTacToe games, each pair talking over a socket.socketpair()
+    engine_tables  the engine's symmetry tables, built by the first search rather than by "import engine"
+
+No socket is opened by importing any of the modules, so the whole benchmark runs without a server.
+
+Run from the repository root:
+    python -m benchmarks.bench_import --repeat 5 --sessions 10000
+"""
+
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import time
+
+MODULES = ("bitboard", "protocol", "game", "transport", "engine", "tablebase", "metrics", "outbox", "lobby", "server",
+           "client", "bot_client", "admin", "async_server", "tournament", "history")
+
+
+def import_time(module, repeat):
+    """
+    Measures the cumulative import time of a module in fresh interpreters.
+    :param module: Represents the name of the module
+    :param repeat: Represents the number of interpreters started
+    :return: Best cumulative import time in milliseconds
+    """
+
+    best = None
+    for attempt in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                                capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                cumulative = int(fields[1]) / 1000
+                best = cumulative if best is None else min(best, cumulative)
+    return best
+
+
+def timed(build):
+    """
+    Times one call of a function.
+    :param build: Represents the function
+    :return: Tuple of (seconds taken, the function's result)
+    """
+
+    start = time.perf_counter()
+    result = build()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and in-process startup cost")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--pairs", type=int, default=200, help="socket pairs, two file descriptors each")
+    args = parser.parse_args()
+
+    imports = {module: import_time(module, args.repeat) for module in MODULES}
+    for module, milliseconds in imports.items():
+        print(f"import {module:<14}{milliseconds:>8.2f} ms")
+
+    import async_server
+    import client
+    import engine
+    import server
+    import transport
+    from game import Game
+
+    startup = {}
+    seconds, games = timed(lambda: [Game() for i in range(args.sessions)])
+    startup["game_us"] = seconds / args.sessions * 1e6
+    game_server = async_server.GameServer()
+    seconds, sessions = timed(lambda: [async_server.GameSession(game_server) for i in range(args.sessions)])
+    startup["session_us"] = seconds / args.sessions * 1e6
+
+    def pairs():
+        built = []
+        for i in range(args.pairs):
+            server_end, client_end = socket.socketpair()
+            built.append((server.TicTacToe(transport.Connection(server_end)),
+                          client.TicTacToe(transport.Connection(client_end))))
+        return built
+
+    seconds, built = timed(pairs)
+    startup["pair_us"] = seconds / args.pairs * 1e6
+    for server_game, client_game in built:
+        server_game.connection.close()
+        client_game.connection.close()
+    seconds, tables = timed(engine.symmetry_tables)
+    startup["engine_tables_ms"] = seconds * 1e3
+    for name, value in startup.items():
+        print(f"{name:<21}{value:>8.2f}")
+
+    print(json.dumps({"benchmark": "import", "python": sys.version.split()[0], "import_ms": imports,
+                      "sessions": args.sessions, "pairs": args.pairs, "startup": startup}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Lobby benchmark. First measures the cost of one enqueue while n players are already waiting, for the bucketed
+lobby.Lobby and for a single queue that is scanned from the front for the first compatible player. Then starts
+async_server.py in a separate process, has N bots join the lobby at the same moment with random ratings and reports
+the time each bot waited to be paired.
+
+Run from the repository root:
+    python -m benchmarks.bench_lobby --bots 1000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+import lobby
+from benchmarks.bench_e2e import percentile, wait_for_port
+from bot_client import BotClient
+
+SIZE = (3, 3, 3)
+
+
+class ScanLobby:
+    """
+    Creates a ScanLobby Object. Baseline lobby holding every waiting player in one list, scanned from the front for
+    the first player with the same board size within the rating window.
+    """
+
+    def __init__(self, window=200):
+        """
+        Initializes an empty lobby.
+        :param window: Represents the largest rating difference between two paired players
+        """
+
+        self.window = window
+        self.waiting = []
+
+    def enqueue(self, ticket):
+        """
+        Pairs a player with the first compatible waiting player, or queues the player.
+        :param ticket: Represents the new player's lobby.Ticket
+        :return: The opponent's Ticket, or None if the player was queued
+        """
+
+        for position, opponent in enumerate(self.waiting):
+            if opponent.size == ticket.size and abs(opponent.rating - ticket.rating) <= self.window:
+                del self.waiting[position]
+                return opponent
+        self.waiting.append(ticket)
+        return None
+
+
+def time_enqueue(queue, waiting, pairs):
+    """
+    Fills a lobby with players no newcomer can be paired with, then times pairs of players that pair with each other.
+    :param queue: Represents the lobby to fill
+    :param waiting: Represents the number of players already waiting
+    :param pairs: Represents the number of timed pairs
+    :return: Seconds per enqueue
+    """
+
+    tickets = [lobby.Ticket(None, SIZE, 10000 + 1000 * i) for i in range(waiting)]     # outside every rating window
+    if isinstance(queue, ScanLobby):
+        queue.waiting.extend(tickets)       # every scan would fail, skip the quadratic fill
+    else:
+        for ticket in tickets:
+            queue.enqueue(ticket)
+    start = time.perf_counter()
+    for i in range(pairs):
+        queue.enqueue(lobby.Ticket(None, SIZE, 1500))
+        queue.enqueue(lobby.Ticket(None, SIZE, 1500))
+    return (time.perf_counter() - start) / (2 * pairs)
+
+
+async def run_bots(host, port, bots, games, seed):
+    """
+    Has every bot join the lobby at the same moment and play until all of them have finished.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param bots: Represents the number of bots
+    :param games: Represents the number of games played by each pair of bots
+    :param seed: Represents the random seed used for the bots' ratings
+    :return: List of finished BotClients
+    """
+
+    rng = random.Random(seed)
+    clients = [BotClient(host, port, games, i, SIZE, lobby=True, rating=max(0, int(rng.gauss(1500, 200))))
+               for i in range(bots)]
+    await asyncio.gather(*(client.run() for client in clients))
+    return clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lobby pairing benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2233)
+    parser.add_argument("--bots", type=int, default=1000)
+    parser.add_argument("--games", type=int, default=5, help="games played by each pair of bots")
+    parser.add_argument("--pairs", type=int, default=500, help="timed pairs per queue size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("waiting      lobby (us/enqueue)   scan (us/enqueue)")
+    for waiting in (0, 1000, 10000, 50000):
+        bucketed = time_enqueue(lobby.Lobby(), waiting, args.pairs)
+        scanned = time_enqueue(ScanLobby(), waiting, args.pairs)
+        print(f"{waiting:<12} {bucketed * 1e6:<20.2f} {scanned * 1e6:.2f}")
+
+    command = [sys.executable, "async_server.py", "--host", args.host, "--port", str(args.port)]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.host, args.port)
+        if server.poll() is not None:
+            sys.exit("async_server.py exited with status " + str(server.returncode))
+        start = time.perf_counter()
+        clients = asyncio.run(run_bots(args.host, args.port, args.bots, args.games, args.seed))
+        seconds = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    waits = sorted(client.queue_wait for client in clients if client.queue_wait is not None)
+    print(json.dumps({
+        "benchmark": "lobby",
+        "bots": args.bots,
+        "seconds": seconds,
+        "games": sum(client.games_played for client in clients) // 2,
+        "paired_as_o": sum(1 for client in clients if client.role == "O"),
+        "wait_p50_ms": percentile(waits, 0.50) * 1000,
+        "wait_p99_ms": percentile(waits, 0.99) * 1000,
+        "wait_max_ms": waits[-1] * 1000,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Session memory benchmark. Creates N games or sessions in a fresh process for each layout and reports the growth of
+the process's resident set size divided by N, the bytes a host needs per concurrent game. Layouts:
+
+    list_game      TicTacToe as first written: an instance __dict__, a list of three lists of one character strings
+                   and the state as a string
+    game           game.Game, slotted, with a bitboard.BitBoard
+    session        async_server.GameSession without a connection, as held for a game waiting to be resumed: the
+                   slotted session, its Game and its receive buffer
+    table          a row of three 16-bit words in one shared array('H'): the two players' bits, the round count and
+                   the state, the floor for the board and state of a 3x3 game
+
+The connection itself (socket, transport, kernel buffers) is not included. Linux only, the resident set size is read
+from /proc.
+
+Run from the repository root:
+    python -m benchmarks.bench_memory --sizes 100000 1000000
+"""
+
+import argparse
+import array
+import json
+import multiprocessing
+import os
+
+import async_server
+import bitboard
+from game import Game
+
+PAGE = os.sysconf("SC_PAGE_SIZE")
+
+
+class ListGame:
+    """
+    Creates a ListGame Object. The game as it was first written, kept for comparison: a __dict__ per instance and a
+    list of lists board.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty 3x3 board.
+        """
+
+        self.size = (bitboard.SIZE, bitboard.SIZE, bitboard.SIZE)
+        self.board = [["_" for j in range(bitboard.SIZE)] for i in range(bitboard.SIZE)]
+        self.round_count = 0
+        self.engine = None
+        self.state = "invite"
+
+
+def resident():
+    """
+    Reads the resident set size of the process.
+    :return: Resident set size in bytes
+    """
+
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * PAGE
+
+
+def build(layout, count):
+    """
+    Creates count games or sessions of one layout.
+    :param layout: Represents the name of the layout
+    :param count: Represents the number of games or sessions
+    :return: The object(s) holding them
+    """
+
+    if layout == "list_game":
+        return [ListGame() for i in range(count)]
+    if layout == "game":
+        return [Game() for i in range(count)]
+    if layout == "session":
+        server = async_server.GameServer()
+        return [async_server.GameSession(server) for i in range(count)]
+    table = array.array("H", bytes(6 * count))
+    for row in range(0, 3 * count, 3):
+        table[row + 2] = async_server.PLAYING << 8
+    return table
+
+
+def measure(layout, count, pipe):
+    """
+    Entry point of the measuring process, sends back the bytes per game or session.
+    :param layout: Represents the name of the layout
+    :param count: Represents the number of games or sessions
+    :param pipe: Represents the connection to the benchmark process
+    :return: NONE
+    """
+
+    async_server.GameServer()       # warm up whatever the server creates once, e.g. the engine's tables
+    before = resident()
+    built = build(layout, count)
+    pipe.send((resident() - before) / count)
+    del built
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per game and per session")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--layouts", nargs="+", default=["list_game", "game", "session", "table"])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("fork")
+    results = {}
+    print("layout      " + "".join(f"{count:>14}" for count in args.sizes) + "   (bytes each)")
+    for layout in args.layouts:
+        results[layout] = {}
+        for count in args.sizes:
+            pipe, child = context.Pipe()
+            process = context.Process(target=measure, args=(layout, count, child))
+            process.start()
+            results[layout][count] = pipe.recv()
+            process.join()
+        print(f"{layout:<12}" + "".join(f"{results[layout][count]:>14.0f}" for count in args.sizes))
+    print(json.dumps({"benchmark": "memory", "bytes_per_game": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
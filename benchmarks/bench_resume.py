@@ -0,0 +1,127 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Reconnect storm benchmark. Starts async_server.py in a separate process, opens N games and plays one move in each,
+then drops every connection at once as a network blip would. Every client then reconnects at the same moment and
+resumes its game with its session token. Reports how long the whole storm took to resume, the p50/p99 time to resume
+a single game and checks that every game came back with the moves already played.
+
+Run from the repository root:
+    python -m benchmarks.bench_resume --clients 2000
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+import protocol
+from benchmarks.bench_e2e import percentile, wait_for_port
+
+
+async def receive(reader):
+    """
+    Waits for a complete frame.
+    :param reader: Represents the connection's StreamReader
+    :return: Tuple of (opcode, payload as a string)
+    """
+
+    opcode, length = protocol.HEADER.unpack(await reader.readexactly(protocol.HEADER.size))
+    payload = await reader.readexactly(length) if length else b""
+    return opcode, payload.decode()
+
+
+async def start_game(host, port):
+    """
+    Opens a game, plays the center position and waits for the server's reply.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :return: Tuple of (session token, StreamWriter of the connection)
+    """
+
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(protocol.encode_frame(protocol.INVITE, b"3,3,3"))
+    opcode, message = await receive(reader)
+    writer.write(protocol.encode_frame(protocol.MOVE, b"1,1"))
+    await receive(reader)
+    return message.split(";")[1], writer
+
+
+async def resume_game(host, port, token):
+    """
+    Reconnects and resumes a game.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param token: Represents the session token of the game
+    :return: Tuple of (seconds taken, RESUME payload or None if the game was not resumed)
+    """
+
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(protocol.encode_frame(protocol.RESUME, token.encode()))
+    opcode, message = await receive(reader)
+    seconds = time.perf_counter() - start
+    writer.write(protocol.encode_frame(protocol.QUIT))
+    writer.close()
+    return seconds, message if opcode == protocol.RESUME else None
+
+
+async def storm(host, port, clients):
+    """
+    Opens every game, drops every connection and resumes every game at once.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param clients: Represents the number of games
+    :return: Tuple of (seconds for the whole storm, list of (seconds, payload) per game)
+    """
+
+    games = await asyncio.gather(*(start_game(host, port) for i in range(clients)))
+    for token, writer in games:
+        writer.transport.abort()
+    await asyncio.sleep(0.5)        # let the server see every connection drop
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(resume_game(host, port, token) for token, writer in games))
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconnect storm benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2232)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--server-args", default="", help="extra arguments passed to async_server.py")
+    args = parser.parse_args()
+
+    command = [sys.executable, "async_server.py", "--host", args.host, "--port", str(args.port)]
+    server = subprocess.Popen(command + args.server_args.split(), stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.host, args.port)
+        if server.poll() is not None:
+            sys.exit("async_server.py exited with status " + str(server.returncode))
+        seconds, results = asyncio.run(storm(args.host, args.port, args.clients))
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(latency for latency, message in results)
+    resumed = [message for latency, message in results if message is not None]
+    intact = sum(1 for message in resumed if message.split(";")[1].count("-") == 7)
+    print(json.dumps({
+        "benchmark": "resume",
+        "clients": args.clients,
+        "resumed": len(resumed),
+        "boards_intact": intact,
+        "seconds": seconds,
+        "resumes_per_sec": len(resumed) / seconds,
+        "resume_p50_us": percentile(latencies, 0.50) * 1e6,
+        "resume_p99_us": percentile(latencies, 0.99) * 1e6,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Multi-core scaling benchmark. Starts async_server.py with 1, 2, ... N worker processes sharing the port with
+SO_REUSEPORT and drives it from several load processes, so the load generator is not held to one core either. Each
+run first measures connections/sec (connect, invite, accept, quit) and then moves/sec of BotClients playing games
+for a fixed time. The speedup over one worker is reported for both. The speedup is bounded by the number of cores
+left over for the load processes, run it on a machine with cores to spare.
+
+Run from the repository root:
+    python -m benchmarks.bench_scaling --max-workers 4 --load-procs 4
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import protocol
+from benchmarks.bench_e2e import wait_for_port
+from bot_client import BotClient
+
+
+async def connect_loop(host, port, deadline):
+    """
+    Opens connections one after the other until the deadline, each one invites the server and quits once accepted.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param deadline: Represents the time.monotonic() value to stop at
+    :return: Number of accepted connections
+    """
+
+    accepted = 0
+    while time.monotonic() < deadline:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(protocol.encode_frame(protocol.INVITE, b"3,3,3"))
+        opcode, length = protocol.HEADER.unpack(await reader.readexactly(protocol.HEADER.size))
+        await reader.readexactly(length)
+        writer.write(protocol.encode_frame(protocol.QUIT))
+        writer.close()
+        accepted += opcode == protocol.ACCEPT
+    return accepted
+
+
+async def play_loop(host, port, seed, seconds):
+    """
+    Runs a BotClient for a fixed time.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param seed: Represents the bot's random seed
+    :param seconds: Represents the number of seconds to play for
+    :return: Number of moves played
+    """
+
+    bot = BotClient(host, port, 10 ** 9, seed)
+    try:
+        await asyncio.wait_for(bot.run(), seconds)
+    except asyncio.TimeoutError:
+        pass
+    return bot.moves_played
+
+
+async def load(host, port, concurrency, seconds, seed):
+    """
+    Runs both phases from one load process.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param concurrency: Represents the number of concurrent connections of this process
+    :param seconds: Represents the length of each phase in seconds
+    :param seed: Represents the seed of this process's bots
+    :return: Tuple of (accepted connections, moves played)
+    """
+
+    deadline = time.monotonic() + seconds
+    accepted = await asyncio.gather(*(connect_loop(host, port, deadline) for i in range(concurrency)))
+    moves = await asyncio.gather(*(play_loop(host, port, seed + i, seconds) for i in range(concurrency)))
+    return sum(accepted), sum(moves)
+
+
+def run_load(arguments):
+    """
+    Entry point of a load process.
+    :param arguments: Represents the tuple of arguments passed to load()
+    :return: Tuple of (accepted connections, moves played)
+    """
+
+    return asyncio.run(load(*arguments))
+
+
+def measure(args, workers):
+    """
+    Starts the server with the given number of workers and runs the load processes against it.
+    :param args: Represents the parsed command line
+    :param workers: Represents the number of worker processes
+    :return: Tuple of (connections/sec, moves/sec)
+    """
+
+    command = [sys.executable, "async_server.py", "--host", args.host, "--port", str(args.port),
+               "--workers", str(workers), "--drain-timeout", "0"]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.host, args.port)
+        time.sleep(0.5)     # every worker is listening once the supervisor has seen them all ready
+        if server.poll() is not None:
+            sys.exit("async_server.py exited with status " + str(server.returncode))
+        jobs = [(args.host, args.port, args.concurrency, args.seconds, 1000 * i) for i in range(args.load_procs)]
+        with multiprocessing.get_context("fork").Pool(args.load_procs) as pool:
+            results = pool.map(run_load, jobs)
+    finally:
+        server.terminate()
+        server.wait()
+    return sum(accepted for accepted, moves in results) / args.seconds, \
+        sum(moves for accepted, moves in results) / args.seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-core scaling benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2234)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--load-procs", type=int, default=os.cpu_count(), help="processes generating the load")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent connections per load process")
+    parser.add_argument("--seconds", type=float, default=3.0, help="length of each phase")
+    args = parser.parse_args()
+
+    runs = []
+    print("workers   connections/sec   moves/sec   speedup (connections, moves)")
+    for workers in range(1, args.max_workers + 1):
+        connections, moves = measure(args, workers)
+        runs.append({"workers": workers, "connections_per_sec": connections, "moves_per_sec": moves})
+        base = runs[0]
+        print(f"{workers:<9} {connections:<17.0f} {moves:<11.0f} "
+              f"{connections / base['connections_per_sec']:.2f}x, {moves / base['moves_per_sec']:.2f}x")
+    print(json.dumps({"benchmark": "scaling", "cpus": os.cpu_count(), "load_procs": args.load_procs,
+                      "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
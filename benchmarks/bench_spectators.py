@@ -0,0 +1,262 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Spectator fan-out benchmark. Starts async_server.py in a separate process and plays one game against the engine,
+one move every --interval seconds, first with nobody watching and then with N spectators connected from a separate
+process. Some of the spectators (--slow) never read, once their socket buffers fill the server skips states for them
+and drops them if they stay stalled. Reports the player's move round trip with and without the audience, the p50/p99
+time from a move being sent to a spectator receiving the new board, how many board states the spectators received and
+how many slow spectators were dropped. Raise the open file limit first (e.g. `ulimit -n 65536`).
+
+Run from the repository root:
+    python -m benchmarks.bench_spectators --watchers 10000
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import bitboard
+import protocol
+from benchmarks.bench_e2e import percentile, wait_for_port
+
+CONNECT_BATCH = 500     # spectators connecting at once
+
+
+class Watcher(asyncio.Protocol):
+    """
+    Creates a Watcher Object. A spectator connection that timestamps every board state it receives. A slow watcher
+    never reads from its socket.
+    """
+
+    def __init__(self, game_id, slow):
+        """
+        Initializes the watcher.
+        :param game_id: Represents the id of the watched game
+        :param slow: If True, the watcher never reads
+        """
+
+        self.game_id = game_id
+        self.slow = slow
+        self.decoder = protocol.FrameDecoder()
+        self.received = []          # (time.monotonic(), cells) of every state received
+        self.transport = None
+        self.lost = False
+
+    def connection_made(self, transport):
+        """
+        Asks to watch the game once connected.
+        :param transport: Represents the connection's transport
+        :return: NONE
+        """
+
+        self.transport = transport
+        transport.write(protocol.encode_frame(protocol.WATCH, self.game_id.encode()))
+        if self.slow:
+            transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+            transport.pause_reading()
+
+    def data_received(self, data):
+        """
+        Timestamps every board state received.
+        :param data: Represents the received bytes
+        :return: NONE
+        """
+
+        now = time.monotonic()
+        self.decoder.feed(data)
+        for opcode, payload in self.decoder.frames():
+            if opcode == protocol.WATCH:
+                self.received.append((now, payload.split(b";")[1]))
+            elif opcode == protocol.PING:
+                self.transport.write(protocol.encode_frame(protocol.PONG))
+
+    def connection_lost(self, exc):
+        """
+        Records that the server has dropped the watcher.
+        :param exc: Represents the exception that closed the connection, or None
+        :return: NONE
+        """
+
+        self.lost = True
+
+
+async def watch(host, port, game_id, watchers, slow, pipe):
+    """
+    Connects every spectator, reports that they are connected, then waits for the player's send times and works out
+    the delivery latency of every state received.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param game_id: Represents the id of the watched game
+    :param watchers: Represents the number of spectators
+    :param slow: Represents the number of spectators that never read
+    :param pipe: Represents the connection to the benchmark process
+    :return: NONE
+    """
+
+    loop = asyncio.get_running_loop()
+    connected = []
+    for start in range(0, watchers, CONNECT_BATCH):
+        batch = range(start, min(watchers, start + CONNECT_BATCH))
+        results = await asyncio.gather(*(loop.create_connection(lambda i=i: Watcher(game_id, i < slow), host, port)
+                                         for i in batch))
+        connected.extend(watcher for transport, watcher in results)
+    pipe.send(len(connected))
+
+    # the benchmark process answers with the time each board state was sent, once the game is over
+    sent = await loop.run_in_executor(None, pipe.recv)
+    latencies = []
+    states = 0
+    for watcher in connected:
+        if watcher.slow:
+            continue
+        for received, cells in watcher.received:
+            times = [moment for moment in sent.get(cells, ()) if moment <= received]
+            if times:
+                latencies.append(received - max(times))
+        states += len(watcher.received)
+    readers = watchers - slow
+    latencies.sort()
+    pipe.send({
+        "states_received_per_watcher": states / readers if readers else 0,
+        "fanout_p50_us": percentile(latencies, 0.50) * 1e6 if latencies else None,
+        "fanout_p99_us": percentile(latencies, 0.99) * 1e6 if latencies else None,
+        "slow_dropped": sum(1 for watcher in connected if watcher.slow and watcher.lost),
+    })
+    for watcher in connected:
+        watcher.transport.abort()
+
+
+def run_watchers(host, port, game_id, watchers, slow, pipe):
+    """
+    Entry point of the spectators' process.
+    :param host: Represents the server's host address
+    :param port: Represents the server's port number
+    :param game_id: Represents the id of the watched game
+    :param watchers: Represents the number of spectators
+    :param slow: Represents the number of spectators that never read
+    :param pipe: Represents the connection to the benchmark process
+    :return: NONE
+    """
+
+    asyncio.run(watch(host, port, game_id, watchers, slow, pipe))
+
+
+def receive(sock, decoder):
+    """
+    Waits for the next frame that is not a heartbeat.
+    :param sock: Represents the player's socket
+    :param decoder: Represents the player's FrameDecoder
+    :return: Tuple of (opcode, payload bytes)
+    """
+
+    while True:
+        opcode, payload = protocol.read_frame(sock, decoder)
+        if opcode != protocol.PING:
+            return opcode, payload
+        protocol.send_frame(sock, protocol.PONG)
+
+
+def play(sock, decoder, seconds, interval, rng, sent):
+    """
+    Plays random games against the engine for a fixed time, one move per interval.
+    :param sock: Represents the player's socket
+    :param decoder: Represents the player's FrameDecoder
+    :param seconds: Represents the number of seconds to play for
+    :param interval: Represents the number of seconds between moves
+    :param rng: Represents the random number generator choosing the moves
+    :param sent: Represents the dictionary mapping the cells of a board state to the times a move leading to it was
+    sent, filled in here
+    :return: Sorted list of move round trip times in seconds
+    """
+
+    deadline = time.monotonic() + seconds
+    round_trips = []
+    while time.monotonic() < deadline:
+        board = bitboard.make_board(3, 3, 3)
+        while True:
+            index = rng.choice([cell for cell in range(9) if board.is_open(cell)])
+            board.place(index, "X")
+            start = time.monotonic()
+            protocol.send_frame(sock, protocol.MOVE, board.coordinates(index).encode())
+            if not board.has_won("X") and not board.is_full():
+                opcode, payload = receive(sock, decoder)
+                round_trips.append(time.monotonic() - start)
+                board.place(board.cell_index(payload.decode()), "O")
+            cells = "".join("".join(row) for row in board.rows()).encode()
+            sent.setdefault(cells, []).append(start)
+            time.sleep(interval)
+            if board.has_won("X") or board.has_won("O") or board.is_full():
+                break
+        protocol.send_frame(sock, protocol.REMATCH)
+        receive(sock, decoder)
+    return sorted(round_trips)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spectator fan-out benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2236)
+    parser.add_argument("--watchers", type=int, default=10000)
+    parser.add_argument("--slow", type=int, default=100, help="spectators that never read")
+    parser.add_argument("--seconds", type=float, default=12.0,
+                        help="length of each phase, slow spectators are dropped after 10 seconds")
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between the player's moves")
+    args = parser.parse_args()
+
+    command = [sys.executable, "async_server.py", "--host", args.host, "--port", str(args.port)]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    watchers = None
+    try:
+        wait_for_port(args.host, args.port)
+        if server.poll() is not None:
+            sys.exit("async_server.py exited with status " + str(server.returncode))
+        sock = socket.create_connection((args.host, args.port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        decoder = protocol.FrameDecoder()
+        protocol.send_frame(sock, protocol.INVITE, b"3,3,3")
+        game_id = receive(sock, decoder)[1].decode().split(";")[1].partition(".")[0]
+        rng = random.Random(0)
+        alone = play(sock, decoder, args.seconds, args.interval, rng, {})
+
+        pipe, child = multiprocessing.get_context("fork").Pipe()
+        watchers = multiprocessing.get_context("fork").Process(
+            target=run_watchers, args=(args.host, args.port, game_id, args.watchers, args.slow, child))
+        watchers.start()
+        connected = pipe.recv()
+        sent = {}
+        watched = play(sock, decoder, args.seconds, args.interval, rng, sent)
+        time.sleep(0.5)     # let the last states arrive
+        pipe.send(sent)
+        fan_out = pipe.recv()
+        protocol.send_frame(sock, protocol.QUIT)
+        watchers.join()
+    finally:
+        if watchers is not None and watchers.is_alive():
+            watchers.terminate()
+        server.terminate()
+        server.wait()
+
+    print(json.dumps({
+        "benchmark": "spectators",
+        "watchers": connected,
+        "slow": args.slow,
+        "states_sent": sum(len(times) for times in sent.values()),
+        "move_rtt_alone_p50_us": percentile(alone, 0.50) * 1e6,
+        "move_rtt_alone_p99_us": percentile(alone, 0.99) * 1e6,
+        "move_rtt_watched_p50_us": percentile(watched, 0.50) * 1e6,
+        "move_rtt_watched_p99_us": percentile(watched, 0.99) * 1e6,
+        **fan_out,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Timer benchmark. Arms one move deadline for each of N sessions, then re-arms every deadline R times, as the server
+does after every move, then fires a spread of due timers. Compares the server's timerwheel.TimerWheel, which
+reschedules the same Timer, with asyncio's loop.call_later(), whose cancelled handles stay in the loop's heap until
+they reach the front, and with a plain heapq using lazy deletion. Reports microseconds per arm, per re-arm and the
+number of entries each structure still holds after the re-arms, then the time to fire every deadline.
+
+Run from the repository root:
+    python -m benchmarks.bench_timers --sessions 100000
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import random
+import time
+
+import timerwheel
+
+TICK = 0.1
+
+
+def noop(*args):
+    pass
+
+
+def bench_wheel(delays, rounds):
+    """
+    Arms, re-arms and fires the deadlines on a TimerWheel.
+    :param delays: Represents the list of deadline delays in seconds, one per session
+    :param rounds: Represents the number of times every deadline is re-armed
+    :return: Dictionary of results
+    """
+
+    wheel = timerwheel.TimerWheel(TICK, 0.0)
+    start = time.perf_counter()
+    timers = [wheel.schedule(delay, noop) for delay in delays]
+    arm = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        for timer, delay in zip(timers, delays):
+            wheel.reschedule(timer, delay)
+    rearm = time.perf_counter() - start
+    held = sum(len(bucket) for level in wheel.wheels for bucket in level)
+
+    start = time.perf_counter()
+    fired = wheel.advance(max(delays) + TICK)
+    fire = time.perf_counter() - start
+    return {"arm_us": arm / len(delays) * 1e6, "rearm_us": rearm / (rounds * len(delays)) * 1e6, "held": held,
+            "fired": fired, "fire_ms": fire * 1000}
+
+
+def bench_call_later(delays, rounds):
+    """
+    Arms and re-arms the deadlines with loop.call_later(), then runs the loop until every deadline has fired.
+    :param delays: Represents the list of deadline delays in seconds, one per session
+    :param rounds: Represents the number of times every deadline is re-armed
+    :return: Dictionary of results
+    """
+
+    loop = asyncio.new_event_loop()
+    fired = [0]
+
+    def count():
+        fired[0] += 1
+
+    start = time.perf_counter()
+    handles = [loop.call_later(delay, count) for delay in delays]
+    arm = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        for position, delay in enumerate(delays):
+            handles[position].cancel()
+            handles[position] = loop.call_later(delay, count)
+    rearm = time.perf_counter() - start
+    held = len(loop._scheduled)     # cancelled handles are only dropped once they outnumber the live ones
+
+    # the loop fires on the wall clock, so the time spent firing is not comparable and is not reported
+    loop.run_until_complete(asyncio.sleep(max(delays) + TICK))
+    loop.close()
+    return {"arm_us": arm / len(delays) * 1e6, "rearm_us": rearm / (rounds * len(delays)) * 1e6, "held": held,
+            "fired": fired[0], "fire_ms": None}
+
+
+def bench_heap(delays, rounds):
+    """
+    Arms, re-arms and fires the deadlines on a heapq of (deadline, sequence, entry) with lazy deletion.
+    :param delays: Represents the list of deadline delays in seconds, one per session
+    :param rounds: Represents the number of times every deadline is re-armed
+    :return: Dictionary of results
+    """
+
+    heap = []
+    sequence = itertools.count()
+
+    def schedule(delay):
+        entry = [True]
+        heapq.heappush(heap, (delay, next(sequence), entry))
+        return entry
+
+    start = time.perf_counter()
+    entries = [schedule(delay) for delay in delays]
+    arm = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        for position, delay in enumerate(delays):
+            entries[position][0] = False
+            entries[position] = schedule(delay)
+    rearm = time.perf_counter() - start
+    held = len(heap)
+
+    start = time.perf_counter()
+    fired = 0
+    while heap:
+        if heapq.heappop(heap)[2][0]:
+            fired += 1
+    fire = time.perf_counter() - start
+    return {"arm_us": arm / len(delays) * 1e6, "rearm_us": rearm / (rounds * len(delays)) * 1e6, "held": held,
+            "fired": fired, "fire_ms": fire * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Timer wheel benchmark")
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=5, help="times every deadline is re-armed")
+    parser.add_argument("--max-delay", type=float, default=2.0, help="longest deadline in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    delays = [rng.uniform(TICK, args.max_delay) for i in range(args.sessions)]
+    results = {}
+    for name, bench in (("timerwheel", bench_wheel), ("call_later", bench_call_later), ("heapq", bench_heap)):
+        results[name] = bench(delays, args.rounds)
+    print(json.dumps({"benchmark": "timers", "sessions": args.sessions, "rounds": args.rounds, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Tournament scaling benchmark. Plays the same round-robin tournament between the random, greedy and minimax strategies
+(tournament.py) with 1, 2, ... N worker processes and reports games/sec, moves/sec and the speedup over one worker.
+The chunks of games get the same seeds whatever the number of workers, so every run plays exactly the same games. The
+speedup is bounded by the number of cores, run it on a machine with cores to spare.
+
+Run from the repository root:
+    python -m benchmarks.bench_tournament --max-workers 4 --games 1000000
+"""
+
+import argparse
+import json
+import os
+import platform
+
+from tournament import STRATEGIES, Tournament
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tournament games/sec per worker count")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--games", type=int, default=300000, help="games in every match")
+    parser.add_argument("--chunk", type=int, default=5000, help="games handed to a worker at once")
+    args = parser.parse_args()
+
+    runs = []
+    print("workers       games     games/sec     moves/sec   speedup")
+    for workers in range(1, args.max_workers + 1):
+        tournament = Tournament(list(STRATEGIES), args.games, chunk=args.chunk)
+        tournament.run(workers=workers)
+        runs.append({"workers": workers, "games": tournament.games_played, "seconds": tournament.seconds,
+                     "games_per_sec": tournament.games_played / tournament.seconds,
+                     "moves_per_sec": tournament.moves_played / tournament.seconds})
+        run = runs[-1]
+        print(f"{workers:<8}{run['games']:>12,}{run['games_per_sec']:>14,.0f}{run['moves_per_sec']:>14,.0f}"
+              f"{run['games_per_sec'] / runs[0]['games_per_sec']:>9.2f}x")
+    print(json.dumps({"benchmark": "tournament", "python": platform.python_version(), "cpus": os.cpu_count(),
+                      "players": list(STRATEGIES), "games_per_match": args.games, "chunk": args.chunk,
+                      "standings": tournament.standings(), "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
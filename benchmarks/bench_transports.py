@@ -0,0 +1,202 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Transport benchmark comparing TCP loopback (with TCP_NODELAY), a Unix socket and a socket.socketpair() handed to the
+server process when it is forked. Two measurements for each transport:
+
+    echo      one blocking transport.Connection sends MOVE frames to a process echoing them back, one at a time: the
+              round-trip time of a frame and round trips/sec, the cost of the transport alone
+    game      --bots BotClients play --games games each against an async_server.GameServer in another process: the
+              round-trip time of a move, moves/sec and games/sec
+
+Run from the repository root:
+    python -m benchmarks.bench_transports --bots 50 --games 20 --round-trips 20000
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import tempfile
+import time
+
+import async_server
+import protocol
+import transport
+from benchmarks.bench_e2e import percentile
+from bot_client import BotClient
+
+TRANSPORTS = ("tcp", "unix", "pair")
+
+
+def echo(listener, pair):
+    """
+    Entry point of the echo process, sends every frame back until the peer closes its socket.
+    :param listener: Represents the listening socket, or None for a socket pair
+    :param pair: Represents the socket pair as a tuple of (echo end, client end), or None
+    :return: NONE
+    """
+
+    if listener is not None:
+        connection = transport.accept(listener)[0]
+    else:
+        pair[1].close()         # the client end is held by the benchmark process only, so its close is seen here
+        connection = transport.Connection(pair[0])
+    while True:
+        frame = connection.receive()
+        if frame is None:
+            return
+        connection.send(*frame)
+
+
+def run_echo(kind, directory, round_trips, context):
+    """
+    Measures frame round trips over one transport.
+    :param kind: Represents the transport, one of TRANSPORTS
+    :param directory: Represents the directory the Unix socket is created in
+    :param round_trips: Represents the number of frames sent and received back
+    :param context: Represents the multiprocessing context used to fork the echo process
+    :return: Dictionary of results
+    """
+
+    path = os.path.join(directory, "echo.sock")
+    listener = pair = None
+    if kind == "tcp":
+        listener = transport.listen("127.0.0.1", 0)
+    elif kind == "unix":
+        listener = transport.listen_unix(path)
+    else:
+        pair = socket.socketpair()
+    process = context.Process(target=echo, args=(listener, pair))
+    process.start()
+    if kind == "tcp":
+        connection = transport.connect(*listener.getsockname())
+    elif kind == "unix":
+        connection = transport.connect_unix(path)
+    else:
+        connection = transport.Connection(pair[1])
+    (listener or pair[0]).close()
+
+    latencies = []
+    with connection:
+        payload = b"1,1"
+        start = time.perf_counter()
+        for i in range(round_trips):
+            sent = time.perf_counter()
+            connection.send(protocol.MOVE, payload)
+            connection.receive()
+            latencies.append(time.perf_counter() - sent)
+        seconds = time.perf_counter() - start
+    process.join()
+    latencies.sort()
+    return {"round_trips_per_sec": round_trips / seconds, "rtt_p50_us": percentile(latencies, 0.50) * 1e6,
+            "rtt_p99_us": percentile(latencies, 0.99) * 1e6}
+
+
+def serve(kind, path, ends, pipe):
+    """
+    Entry point of the game server process.
+    :param kind: Represents the transport, one of TRANSPORTS
+    :param path: Represents the path of the Unix socket
+    :param ends: Represents the server ends of the socket pairs, one per bot
+    :param pipe: Represents the connection the server's address is sent back on once it accepts clients
+    :return: NONE
+    """
+
+    async def run():
+        server = async_server.GameServer("127.0.0.1", 0, unix_path=path if kind == "unix" else None)
+        await server.start()
+        for sock in ends:
+            await server.serve_socket(sock)
+        pipe.send(server.server.sockets[0].getsockname())
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+async def run_bots(kind, address, ends, bots, games):
+    """
+    Runs every bot concurrently until all of them have finished.
+    :param kind: Represents the transport, one of TRANSPORTS
+    :param address: Represents the address the server listens on, a (host, port) tuple or a Unix socket path
+    :param ends: Represents the client ends of the socket pairs, one per bot
+    :param bots: Represents the number of bots
+    :param games: Represents the number of games played by each bot
+    :return: List of finished BotClients
+    """
+
+    if kind == "tcp":
+        clients = [BotClient(*address, games=games, seed=seed) for seed in range(bots)]
+    elif kind == "unix":
+        clients = [BotClient(games=games, seed=seed, unix_path=address) for seed in range(bots)]
+    else:
+        clients = [BotClient(games=games, seed=seed, sock=sock) for seed, sock in enumerate(ends)]
+    await asyncio.gather(*(client.run() for client in clients))
+    return clients
+
+
+def run_game(kind, directory, bots, games, context):
+    """
+    Measures games played by bots over one transport.
+    :param kind: Represents the transport, one of TRANSPORTS
+    :param directory: Represents the directory the Unix socket is created in
+    :param bots: Represents the number of bots
+    :param games: Represents the number of games played by each bot
+    :param context: Represents the multiprocessing context used to fork the server process
+    :return: Dictionary of results
+    """
+
+    path = os.path.join(directory, "game.sock")
+    pairs = [socket.socketpair() for i in range(bots)] if kind == "pair" else []
+    pipe, child = context.Pipe()
+    process = context.Process(target=serve, args=(kind, path, [pair[0] for pair in pairs], child))
+    process.start()
+    try:
+        address = pipe.recv()
+        for pair in pairs:
+            pair[0].close()
+        start = time.perf_counter()
+        clients = asyncio.run(run_bots(kind, address, [pair[1] for pair in pairs], bots, games))
+        seconds = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.join()
+
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    return {"moves_per_sec": sum(client.moves_played for client in clients) / seconds,
+            "games_per_sec": sum(client.games_played for client in clients) / seconds,
+            "rtt_p50_us": percentile(latencies, 0.50) * 1e6, "rtt_p99_us": percentile(latencies, 0.99) * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-move latency and throughput over TCP, Unix sockets and pairs")
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument("--round-trips", type=int, default=20000, help="frames echoed by each transport")
+    parser.add_argument("--bots", type=int, default=50)
+    parser.add_argument("--games", type=int, default=20, help="games played by each bot")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("fork")
+    results = {"echo": {}, "game": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in args.transports:
+            results["echo"][kind] = run_echo(kind, directory, args.round_trips, context)
+            results["game"][kind] = run_game(kind, directory, args.bots, args.games, context)
+
+    print("transport   echo p50 us   echo p99 us  round trips/s   move p50 us   move p99 us      moves/s")
+    for kind in args.transports:
+        echoed, played = results["echo"][kind], results["game"][kind]
+        print(f"{kind:<10}{echoed['rtt_p50_us']:>12.1f}{echoed['rtt_p99_us']:>14.1f}"
+              f"{echoed['round_trips_per_sec']:>15,.0f}{played['rtt_p50_us']:>14.1f}{played['rtt_p99_us']:>14.1f}"
+              f"{played['moves_per_sec']:>13,.0f}")
+    print(json.dumps({"benchmark": "transports", "python": platform.python_version(), "bots": args.bots,
+                      "games_per_bot": args.games, "round_trips": args.round_trips, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
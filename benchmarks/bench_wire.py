@@ -0,0 +1,183 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Wire format benchmark comparing text MOVE frames ("row,column") with binary PLACE frames (2 bytes without a header,
+sequence number and bit index) for the 3x3 board. Three measurements:
+
+    frame     bytes per move and per board state, a RESUME/WATCH text state against a packed SYNC board
+    codec     ns to encode a move and to decode a received move and check it against the board, --moves random moves
+    game      --bots BotClients play --games games each against an async_server.GameServer in another process, once
+              sending MOVE frames and once PLACE frames: bytes on the wire per game both ways, moves/sec and the
+              round-trip time of a move
+
+Run from the repository root:
+    python -m benchmarks.bench_wire --moves 200000 --bots 50 --games 20
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import random
+import time
+
+import bitboard
+import protocol
+from benchmarks.bench_e2e import percentile
+from benchmarks.bench_transports import serve
+from bot_client import BotClient
+from game import Game
+
+FORMATS = ("text", "binary")
+
+
+def random_moves(count, seed=0):
+    """
+    Plays random games until enough moves have been made, recording every move with the board it was played on.
+    :param count: Represents the number of moves
+    :param seed: Represents the random seed
+    :return: List of (X positions, O positions, sequence number, bit index, player) tuples, the positions held before
+    the move
+    """
+
+    rng = random.Random(seed)
+    moves = []
+    board = bitboard.BitBoard()
+    player = "X"
+    while len(moves) < count:
+        if board.is_full() or board.has_won("X") or board.has_won("O"):
+            board = bitboard.BitBoard()
+            player = "X"
+        index = rng.choice(board.open_cells())
+        moves.append((board.x, board.o, board.x.bit_count() + board.o.bit_count() + 1, index, player))
+        board.place(index, player)
+        player = "O" if player == "X" else "X"
+    return moves
+
+
+def measure_codec(moves):
+    """
+    Times encoding every move in both formats, then decoding and playing it on a copy of its board the way the
+    server does.
+    :param moves: Represents the moves returned by random_moves()
+    :return: Dictionary of ns per move for each format and step
+    """
+
+    start = time.perf_counter_ns()
+    text = [protocol.encode_frame(protocol.MOVE, bitboard.coordinates(move[3]).encode()) for move in moves]
+    text_encode = time.perf_counter_ns() - start
+    start = time.perf_counter_ns()
+    binary = [protocol.encode_place(move[2], move[3], bitboard.SIZE) for move in moves]
+    binary_encode = time.perf_counter_ns() - start
+
+    results = {}
+    for name, frames, encoded in (("text", text, text_encode), ("binary", binary, binary_encode)):
+        games = []
+        for x, o, sequence, index, player in moves:
+            played = Game()
+            played.board = bitboard.BitBoard(x, o)
+            games.append(played)
+        start = time.perf_counter_ns()
+        if name == "text":
+            for played, frame, move in zip(games, frames, moves):
+                played.check_valid_index(played.board.cell_index(frame[protocol.HEADER.size:].decode()), move[4])
+        else:
+            for played, frame, move in zip(games, frames, moves):
+                payload = bytes((frame[0] & protocol.SEQUENCE_MASK, frame[1]))
+                played.check_valid_index(played.placed_index(payload), move[4])
+        decoded = time.perf_counter_ns() - start
+        results[name] = {"encode_ns": encoded / len(moves), "decode_and_check_ns": decoded / len(moves)}
+    return results
+
+
+def measure_frames(moves):
+    """
+    Measures the size of a move and of a board state in both formats.
+    :param moves: Represents the moves returned by random_moves()
+    :return: Dictionary of bytes per frame for each format
+    """
+
+    played = Game()
+    played.board = bitboard.BitBoard(*moves[-1][:2])
+    state = "3,3,3;" + "".join(char for row in played.game_board for char in row) + ";X"
+    text_moves = [protocol.encode_frame(protocol.MOVE, bitboard.coordinates(move[3]).encode()) for move in moves]
+    return {"text": {"move_bytes": sum(len(frame) for frame in text_moves) / len(moves),
+                     "board_bytes": len(protocol.encode_frame(protocol.RESUME, state.encode()))},
+            "binary": {"move_bytes": len(protocol.encode_place(1, 0, bitboard.SIZE)),
+                       "board_bytes": len(played.sync_frame())}}
+
+
+async def run_bots(address, bots, games, binary):
+    """
+    Runs every bot concurrently until all of them have finished.
+    :param address: Represents the server's (host, port) address
+    :param bots: Represents the number of bots
+    :param games: Represents the number of games played by each bot
+    :param binary: If True, the bots send PLACE frames, else MOVE frames
+    :return: List of finished BotClients
+    """
+
+    clients = [BotClient(*address, games=games, seed=seed, binary=binary) for seed in range(bots)]
+    await asyncio.gather(*(client.run() for client in clients))
+    return clients
+
+
+def measure_game(bots, games, binary, context):
+    """
+    Measures games played by bots in one format.
+    :param bots: Represents the number of bots
+    :param games: Represents the number of games played by each bot
+    :param binary: If True, the bots send PLACE frames, else MOVE frames
+    :param context: Represents the multiprocessing context used to fork the server process
+    :return: Dictionary of results
+    """
+
+    pipe, child = context.Pipe()
+    process = context.Process(target=serve, args=("tcp", None, [], child))
+    process.start()
+    try:
+        address = pipe.recv()
+        start = time.perf_counter()
+        clients = asyncio.run(run_bots(address, bots, games, binary))
+        seconds = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.join()
+
+    played = sum(client.games_played for client in clients)
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    return {"bytes_sent_per_game": sum(client.bytes_sent for client in clients) / played,
+            "bytes_received_per_game": sum(client.bytes_received for client in clients) / played,
+            "moves_per_sec": sum(client.moves_played for client in clients) / seconds,
+            "rtt_p50_us": percentile(latencies, 0.50) * 1e6, "rtt_p99_us": percentile(latencies, 0.99) * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text MOVE frames vs. binary PLACE and SYNC frames")
+    parser.add_argument("--moves", type=int, default=200000, help="moves encoded and decoded by the codec measurement")
+    parser.add_argument("--bots", type=int, default=50)
+    parser.add_argument("--games", type=int, default=20, help="games played by each bot")
+    args = parser.parse_args()
+
+    moves = random_moves(args.moves)
+    results = {"frame": measure_frames(moves), "codec": measure_codec(moves), "game": {}}
+    context = multiprocessing.get_context("fork")
+    for name in FORMATS:
+        results["game"][name] = measure_game(args.bots, args.games, name == "binary", context)
+
+    print("format    move B  board B  encode ns  decode ns  sent B/game  recv B/game    moves/s  move p50 us")
+    for name in FORMATS:
+        frame, codec, played = results["frame"][name], results["codec"][name], results["game"][name]
+        print(f"{name:<8}{frame['move_bytes']:>8.1f}{frame['board_bytes']:>9}{codec['encode_ns']:>11.0f}"
+              f"{codec['decode_and_check_ns']:>11.0f}{played['bytes_sent_per_game']:>13.1f}"
+              f"{played['bytes_received_per_game']:>13.1f}{played['moves_per_sec']:>11,.0f}"
+              f"{played['rtt_p50_us']:>13.1f}")
+    print(json.dumps({"benchmark": "wire", "python": platform.python_version(), "moves": args.moves, "bots": args.bots,
+                      "games_per_bot": args.games, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
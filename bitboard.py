@@ -0,0 +1,367 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://www.chessprogramming.org/Bitboards
+(2) https://docs.python.org/3/library/stdtypes.html#bitwise-operations-on-integer-types
+
+Bitboard representation of a 3x3 tic-tac-toe board. Each player's characters are stored as a 9-bit int where bit
+(row * 3 + column) is set when the player holds that position. Moves, win checks and tie checks are single bitwise
+operations or table lookups instead of loops over a list of lists.
+
+GridBoard extends the same representation to any height x width board where k in a row wins (e.g.: 15x15 gomoku with
+k=5). Its win check only follows the four lines through the last placed character, so it costs O(k) per move.
+"""
+
+SIZE = 3
+MAX_SIZE = 64       # largest height or width accepted in a game invitation
+FULL = (1 << SIZE * SIZE) - 1       # every position on the board is taken
+
+# the 8 lines that win the game: 3 rows, 3 columns and 2 diagonals
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+)
+
+# WIN_TABLE[bits] is True if the 9-bit int "bits" holds at least one winning line
+WIN_TABLE = tuple(any(bits & mask == mask for mask in WIN_MASKS) for bits in range(FULL + 1))
+
+# maps every well formed move string to its bit index
+CELL_INDEX = {str(i) + "," + str(j): i * SIZE + j for i in range(SIZE) for j in range(SIZE)}
+
+# TERNARY[bits] is the 9-bit int "bits" read as base-3 digits, one per position, used to pack a 3x3 board
+TERNARY = tuple(sum(3 ** index for index in range(SIZE * SIZE) if bits >> index & 1) for bits in range(FULL + 1))
+
+
+def cell_index(coordinates):
+    """
+    Converts coordinates in the form "row,column" into the bit index of that position on the board.
+    :param coordinates: Represents the desired coordinates on the game board (e.g.: "0,2")
+    :return: Bit index from 0 to 8, or None if the coordinates are malformed or out of range
+    """
+
+    index = CELL_INDEX.get(coordinates)
+    if index is not None:
+        return index
+
+    # slow path for input such as " 0, 2", accepted by int()
+    try:
+        x_coord, y_coord = coordinates.split(",")
+        x_coord = int(x_coord)
+        y_coord = int(y_coord)
+    except ValueError:
+        return None
+    if 0 <= x_coord < SIZE and 0 <= y_coord < SIZE:
+        return x_coord * SIZE + y_coord
+    return None
+
+
+def parse_size(message):
+    """
+    Reads the board size sent with a game invitation in the form "height,width,k". An empty message means the
+    classic 3x3 board.
+    :param message: Represents the payload of the invitation
+    :return: Tuple of (height, width, k), or None if the size is malformed or not supported
+    """
+
+    if not message:
+        return SIZE, SIZE, SIZE
+    try:
+        height, width, k = (int(value) for value in message.split(","))
+    except ValueError:
+        return None
+    if not (1 <= height <= MAX_SIZE and 1 <= width <= MAX_SIZE and 1 <= k <= max(height, width)):
+        return None
+    return height, width, k
+
+
+def make_board(height=SIZE, width=SIZE, k=SIZE):
+    """
+    Creates an empty board of the given size.
+    :param height: Represents the number of rows
+    :param width: Represents the number of columns
+    :param k: Represents the number of characters in a row needed to win
+    :return: A BitBoard for the classic 3x3 game, else a GridBoard
+    """
+
+    if height == width == k == SIZE:
+        return BitBoard()
+    return GridBoard(height, width, k)
+
+
+def is_classic(board):
+    """
+    Checks if a board is the classic 3x3 game with 3 in a row, the only size the engine and tablebase know.
+    :param board: Represents the game board
+    :return: True for a 3x3 board with k=3, else False
+    """
+
+    return board.height == board.width == board.k == SIZE
+
+
+def packed_size(cells):
+    """
+    Finds the number of bytes a packed board takes.
+    :param cells: Represents the number of positions on the board
+    :return: Number of bytes, 2 for the 3x3 board
+    """
+
+    return ((3 ** cells - 1).bit_length() + 7) // 8
+
+
+def pack(board):
+    """
+    Packs a board into bytes, every position as a base-3 digit: 0 when open, 1 for "X" and 2 for "O". Bit index 0 is
+    the lowest digit.
+    :param board: Represents the board, a BitBoard or GridBoard
+    :return: Packed board as big-endian bytes
+    """
+
+    cells = board.height * board.width
+    if cells == SIZE * SIZE:
+        value = TERNARY[board.x] + 2 * TERNARY[board.o]
+    else:
+        value = 0
+        for index in range(cells - 1, -1, -1):
+            value = value * 3 + (board.x >> index & 1) + 2 * (board.o >> index & 1)
+    return value.to_bytes(packed_size(cells), "big")
+
+
+def unpack(data, cells):
+    """
+    Reads a board packed by pack().
+    :param data: Represents the packed board
+    :param cells: Represents the number of positions on the board
+    :return: String with one character per position in row order, "X", "O" or "-", or None if the data does not hold
+    a board of that size
+    """
+
+    value = int.from_bytes(data, "big")
+    if len(data) != packed_size(cells) or value >= 3 ** cells:
+        return None
+    characters = []
+    for index in range(cells):
+        value, digit = divmod(value, 3)
+        characters.append("-XO"[digit])
+    return "".join(characters)
+
+
+def coordinates(index):
+    """
+    Converts a bit index back into coordinates in the form "row,column"
+    :param index: Represents a bit index from 0 to 8
+    :return: Coordinates as a string (e.g.: "0,2")
+    """
+
+    return str(index // SIZE) + "," + str(index % SIZE)
+
+
+class BitBoard:
+    """
+    Creates a BitBoard Object. This class is responsible for tracking which positions are held by each player, using
+    one 9-bit int for "X" and one for "O".
+    """
+
+    __slots__ = ("x", "o")
+    height = width = k = SIZE
+
+    def __init__(self, x=0, o=0):
+        """
+        Initializes the board from the two players' bitboards. Both are empty by default.
+        :param x: Represents the positions held by "X"
+        :param o: Represents the positions held by "O"
+        """
+
+        self.x = x
+        self.o = o
+
+    def cell_index(self, coordinates):
+        """
+        Converts coordinates in the form "row,column" into the bit index of that position on this board.
+        :param coordinates: Represents the desired coordinates on the game board (e.g.: "0,2")
+        :return: Bit index, or None if the coordinates are malformed or out of range
+        """
+
+        return cell_index(coordinates)
+
+    def coordinates(self, index):
+        """
+        Converts a bit index on this board back into coordinates in the form "row,column"
+        :param index: Represents a bit index
+        :return: Coordinates as a string (e.g.: "0,2")
+        """
+
+        return coordinates(index)
+
+    def is_open(self, index):
+        """
+        Checks if a position on the board is free.
+        :param index: Represents the bit index of the position
+        :return: True if neither player holds the position, else False
+        """
+
+        return not (self.x | self.o) >> index & 1
+
+    def place(self, index, player):
+        """
+        Places the player's character at a position on the board.
+        :param index: Represents the bit index of the position
+        :param player: Represents the player character, "X" or "O"
+        :return: NONE
+        """
+
+        if player == "X":
+            self.x |= 1 << index
+        else:
+            self.o |= 1 << index
+
+    def has_won(self, player):
+        """
+        Checks if the player holds any of the 8 winning lines.
+        :param player: Represents the player character, "X" or "O"
+        :return: True if the player has won the game, else False
+        """
+
+        if player == "X":
+            return WIN_TABLE[self.x]
+        return WIN_TABLE[self.o]
+
+    def is_full(self):
+        """
+        Checks if every position on the board has been taken.
+        :return: True if the board is full, else False
+        """
+
+        return self.x | self.o == FULL
+
+    def open_cells(self):
+        """
+        Lists the free positions on the board in row order.
+        :return: List of bit indexes
+        """
+
+        taken = self.x | self.o
+        return [index for index in range(self.height * self.width) if not taken >> index & 1]
+
+    def rows(self):
+        """
+        Renders the board as a list of rows of one character strings, "X", "O" or "-"
+        :return: List of lists representing the board
+        """
+
+        board = []
+        for i in range(self.height):
+            row = []
+            for j in range(self.width):
+                bit = 1 << (i * self.width + j)
+                if self.x & bit:
+                    row.append("X")
+                elif self.o & bit:
+                    row.append("O")
+                else:
+                    row.append("-")
+            board.append(row)
+        return board
+
+
+class GridBoard(BitBoard):
+    """
+    Creates a GridBoard Object. This class is responsible for tracking a height x width board where k characters in a
+    row win. Each player's positions are held in an int with one bit per position, bit (row * width + column).
+    """
+
+    __slots__ = ("height", "width", "k", "last")
+
+    # the four line directions through a position: row, column, diagonal, anti-diagonal
+    DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+    def __init__(self, height, width, k, x=0, o=0):
+        """
+        Initializes an empty board of the given size.
+        :param height: Represents the number of rows
+        :param width: Represents the number of columns
+        :param k: Represents the number of characters in a row needed to win
+        :param x: Represents the positions held by "X"
+        :param o: Represents the positions held by "O"
+        """
+
+        super().__init__(x, o)
+        self.height = height
+        self.width = width
+        self.k = k
+        self.last = None        # bit index of the last placed character
+
+    def cell_index(self, coordinates):
+        """
+        Converts coordinates in the form "row,column" into the bit index of that position on this board.
+        :param coordinates: Represents the desired coordinates on the game board (e.g.: "7,7")
+        :return: Bit index, or None if the coordinates are malformed or out of range
+        """
+
+        try:
+            x_coord, y_coord = coordinates.split(",")
+            x_coord = int(x_coord)
+            y_coord = int(y_coord)
+        except ValueError:
+            return None
+        if 0 <= x_coord < self.height and 0 <= y_coord < self.width:
+            return x_coord * self.width + y_coord
+        return None
+
+    def coordinates(self, index):
+        """
+        Converts a bit index on this board back into coordinates in the form "row,column"
+        :param index: Represents a bit index
+        :return: Coordinates as a string (e.g.: "7,7")
+        """
+
+        return str(index // self.width) + "," + str(index % self.width)
+
+    def place(self, index, player):
+        """
+        Places the player's character at a position on the board and remembers it as the last move.
+        :param index: Represents the bit index of the position
+        :param player: Represents the player character, "X" or "O"
+        :return: NONE
+        """
+
+        super().place(index, player)
+        self.last = index
+
+    def has_won(self, player):
+        """
+        Checks if the last character placed gave the player k in a row. Only the four lines through that position
+        are followed, at most k - 1 positions each way.
+        :param player: Represents the player character, "X" or "O"
+        :return: True if the player has won the game, else False
+        """
+
+        bits = self.x if player == "X" else self.o
+        if self.last is None or not bits >> self.last & 1:
+            return False
+
+        height, width, k = self.height, self.width, self.k
+        row, column = divmod(self.last, width)
+        for row_step, column_step in self.DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                i = row + row_step * sign
+                j = column + column_step * sign
+                while count < k and 0 <= i < height and 0 <= j < width and bits >> (i * width + j) & 1:
+                    count += 1
+                    i += row_step * sign
+                    j += column_step * sign
+            if count >= k:
+                return True
+        return False
+
+    def is_full(self):
+        """
+        Checks if every position on the board has been taken.
+        :return: True if the board is full, else False
+        """
+
+        return self.x | self.o == (1 << self.height * self.width) - 1
@@ -0,0 +1,244 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://docs.python.org/3/library/asyncio-stream.html
+(2) https://docs.python.org/3/library/random.html
+
+Headless client that plays tic-tac-toe against a server without a human at the keyboard. A bot speaks the same
+protocol as TicTacToe.initiate_game(), TicTacToe.play_game() and TicTacToe.declare_winner() in client.py: it sends an
+INVITE, moves first as "X" by picking a random open position, and asks for a REMATCH after every game. With lobby=True
+the bot joins the lobby instead and plays whichever role it is given against another client. Moves are sent as binary
+PLACE frames unless binary=False, and the bytes sent and received are counted.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import bitboard
+import protocol
+
+
+class BotClient:
+    """
+    Creates a BotClient Object. This class is responsible for connecting to a server, playing a number of games and
+    recording the round-trip time of every move.
+    """
+
+    def __init__(self, host="127.0.0.1", port=2221, games=1, seed=None, size=(3, 3, 3), lobby=False, rating=None,
+                 unix_path=None, sock=None, binary=True):
+        """
+        Initializes the bot's server address, number of games and move statistics.
+        :param host: Represents the server's host address
+        :param port: Represents the server's port number
+        :param games: Represents the number of games to play before quitting
+        :param seed: Represents the random seed used to pick moves
+        :param size: Represents the board size to ask the server for, as a tuple of (height, width, k in a row)
+        :param lobby: If True, the bot joins the lobby to play another client instead of the server
+        :param rating: Represents the rating sent to the lobby, or None
+        :param unix_path: Represents the path of the server's Unix socket, used instead of the host and port, or None
+        :param sock: Represents a socket already connected to the server, e.g. one end of a socket.socketpair(), or
+        None
+        :param binary: If True, moves are sent as PLACE frames on boards small enough for them, else as MOVE frames
+        """
+
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.sock = sock
+        self.games = games
+        self.rng = random.Random(seed)
+        self.size = size
+        self.lobby = lobby
+        self.rating = rating
+        self.binary = binary and size[0] * size[1] <= protocol.BINARY_CELLS
+        self.role = "X"
+        self.queue_wait = None      # seconds from joining the lobby to being paired
+        self.reader = None
+        self.writer = None
+        self.latencies = []         # seconds from sending a move to receiving the server's reply
+        self.games_played = 0
+        self.moves_played = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    async def check_receive(self):
+        """
+        Waits for a complete frame from the server.
+        :return: Tuple of (opcode, payload bytes). A closed connection is reported as a QUIT frame. Heartbeat PINGs are
+        answered here, they and chat messages are never returned.
+        """
+
+        while True:
+            try:
+                header = await self.reader.readexactly(protocol.PLACE_SIZE)
+                if header[0] & protocol.COMPACT:
+                    self.bytes_received += protocol.PLACE_SIZE
+                    return protocol.PLACE, bytes((header[0] & protocol.SEQUENCE_MASK, header[1]))
+                header += await self.reader.readexactly(protocol.HEADER.size - protocol.PLACE_SIZE)
+                opcode, length = protocol.HEADER.unpack(header)
+                payload = await self.reader.readexactly(length) if length else b""
+            except asyncio.IncompleteReadError:
+                return protocol.QUIT, b""
+            self.bytes_received += protocol.HEADER.size + length
+            if opcode == protocol.PING:
+                self.send_message(protocol.PONG)
+            elif opcode != protocol.CHAT:
+                return opcode, payload
+
+    def send_message(self, opcode, message=""):
+        """
+        Encodes a message into a frame and writes it to the server.
+        :param opcode: Represents the type of message, one of the opcodes from protocol.py
+        :param message: Represents the message created by the bot
+        :return: NONE
+        """
+
+        self.write(protocol.encode_frame(opcode, message.encode()))
+
+    def write(self, frame):
+        """
+        Writes an encoded frame to the server.
+        :param frame: Represents the encoded frame as bytes
+        :return: NONE
+        """
+
+        self.bytes_sent += len(frame)
+        self.writer.write(frame)
+
+    async def initiate_game(self):
+        """
+        Invites the server to play, or joins the lobby, and waits for the answer.
+        :return: True if the game was accepted, else False
+        """
+
+        size = ",".join(str(value) for value in self.size)
+        sent = time.perf_counter()
+        if self.lobby:
+            self.send_message(protocol.JOIN, size + ";" + (str(self.rating) if self.rating else ""))
+        else:
+            self.send_message(protocol.INVITE, size)
+        opcode, payload = await self.check_receive()
+        self.queue_wait = time.perf_counter() - sent
+        if opcode != protocol.ACCEPT:
+            return False
+        fields = payload.decode().split(";")
+        self.role = fields[2] if len(fields) > 2 else "X"
+        return True
+
+    async def play_game(self):
+        """
+        Plays one game to the end, moving first when playing "X".
+        :return: True if the game finished normally, False if the server closed its socket
+        """
+
+        board = bitboard.make_board(*self.size)
+        other = "O" if self.role == "X" else "X"
+        my_turn = self.role == "X"
+        while True:
+            if my_turn:
+                index = self.rng.choice(board.open_cells())
+                board.place(index, self.role)
+                if self.binary:
+                    self.write(protocol.encode_place(board.x.bit_count() + board.o.bit_count(), index, board.width))
+                else:
+                    self.send_message(protocol.MOVE, board.coordinates(index))
+                self.moves_played += 1
+
+                # check if the bot has won the game or we have reached a tie game
+                if board.has_won(self.role) or board.is_full():
+                    return True
+
+            my_turn = True
+            sent = time.perf_counter()
+            opcode, payload = await self.check_receive()
+            self.latencies.append(time.perf_counter() - sent)
+            if opcode == protocol.MOVE:
+                index = board.cell_index(payload.decode())
+            elif opcode == protocol.PLACE:
+                sequence, index = protocol.decode_place(payload)
+                if sequence != protocol.place_sequence(board.x.bit_count() + board.o.bit_count() + 1):
+                    return False
+            else:
+                return False
+            if index is None or index >= board.height * board.width or not board.is_open(index):
+                return False
+            board.place(index, other)
+            self.moves_played += 1
+
+            # check if the opponent has won the game or we have reached a tie game
+            if board.has_won(other) or board.is_full():
+                return True
+
+    async def declare_winner(self):
+        """
+        Asks the server for a rematch.
+        :return: True if the server accepted the rematch, else False
+        """
+
+        self.send_message(protocol.REMATCH, "Play Again? (y or n)")
+        opcode, payload = await self.check_receive()
+        return opcode == protocol.ACCEPT
+
+    async def run(self):
+        """
+        Connects to the server and plays until the requested number of games has been played or the server stops.
+        :return: NONE
+        """
+
+        if self.sock is not None:
+            self.reader, self.writer = await asyncio.open_connection(sock=self.sock)
+        elif self.unix_path:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.unix_path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            if not await self.initiate_game():
+                return
+            while True:
+                if not await self.play_game():
+                    return
+                self.games_played += 1
+                if self.games_played == self.games:
+                    self.send_message(protocol.QUIT)
+                    return
+                if not await self.declare_winner():
+                    return
+        finally:
+            self.writer.close()
+
+
+def main():
+    """
+    Parses the command line and runs a single bot.
+    :return: NONE
+    """
+
+    parser = argparse.ArgumentParser(description="Headless tic-tac-toe client")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2221)
+    parser.add_argument("--unix", metavar="PATH",
+                        help="connect to the server's Unix socket instead of --host and --port")
+    parser.add_argument("--games", type=int, default=1)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--rows", type=int, default=3, help="board height")
+    parser.add_argument("--columns", type=int, default=3, help="board width")
+    parser.add_argument("--k", type=int, default=3, help="number of characters in a row needed to win")
+    parser.add_argument("--lobby", action="store_true", help="play another client paired by the server's lobby")
+    parser.add_argument("--rating", type=int, help="rating used by the lobby to pick an opponent")
+    parser.add_argument("--text", action="store_true", help="send moves as text MOVE frames instead of PLACE frames")
+    args = parser.parse_args()
+
+    bot = BotClient(args.host, args.port, args.games, args.seed, (args.rows, args.columns, args.k), args.lobby,
+                    args.rating, args.unix, binary=not args.text)
+    asyncio.run(bot.run())
+    print("Played", bot.games_played, "games,", bot.moves_played, "moves,", bot.bytes_sent, "bytes sent,",
+          bot.bytes_received, "bytes received")
+
+
+if __name__ == "__main__":
+    main()
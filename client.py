@@ -7,176 +7,372 @@ Sources:
 (1) https://docs.python.org/3.4/howto/sockets.html
 (2) https://realpython.com/python-sockets/
 (3) Computer Networking: A Top Down Approach 8th edition, (Jim Kurose, Keith Ross)
+(4) https://docs.python.org/3/library/selectors.html
 
 """
 
-import socket
+import argparse
+import collections
+import functools
+import os
+import random
+import selectors
+import sys
+import time
 
+import bitboard
+import game
+import protocol
+import transport
 
-class TicTacToe:
+RECONNECT_ATTEMPTS = 6
+RECONNECT_DELAY = 0.25      # seconds, doubled after every failed attempt
+RECONNECT_MAX_DELAY = 8.0
+HEARTBEAT_INTERVAL = 10.0   # seconds of silence from the server before the client sends a PING
+HEARTBEAT_TIMEOUT = 30.0    # seconds of silence from the server before the connection is treated as dropped
+
+
+class TicTacToe(game.Game):
     """
-    Creates a TicTacToe Object. This class is responsible for initializing and creating a tic-tac-toe game board and
-    tracking how many rounds have been played throughout the course of the game. Includes various methods for carrying
-    out game play.
+    Creates a TicTacToe Object. This class is responsible for playing the client's side of a game against the server,
+    or against another client paired by the server's lobby. Includes various methods for carrying out game play.
     """
 
-    def __init__(self):
+    def __init__(self, connection, size=(3, 3, 3), lobby=False, rating=None, connect=None, keyboard=None, binary=True):
         """
-        Initializes and creates a tic-tac-toe board and creates a variable for tracking the number of rounds played
-        throughout the course of the game.
+        Initializes the game and creates a variable for tracking the number of rounds played throughout the course of
+        the game.
+        :param connection: Represents the transport.Connection to the server
+        :param size: Represents the board size to ask the server for, as a tuple of (height, width, k in a row)
+        :param lobby: If True, the client joins the server's lobby to play another client instead of the server
+        :param rating: Represents the client's rating used by the lobby to pick an opponent, or None
+        :param connect: Represents the function opening a new Connection to the server after the connection drops, or
+        None to give up on a dropped game
+        :param keyboard: Represents the file the user types into, sys.stdin if None, e.g. the read end of a pipe
+        :param binary: If True, moves are sent as PLACE frames on boards small enough for them, else as MOVE frames
         """
 
-        self.game_board = []
-        self.create_board()
-        self.round_count = 0
+        super().__init__(size)
+        self.connection = connection
+        self.connect = connect
+        self.keyboard = keyboard if keyboard is not None else sys.stdin
+        self.selector = None    # waits on the keyboard and the server at once, created by the first wait()
+        self.token = ""         # session token handed out by the server, used to resume the game after a drop
+        self.lobby = lobby
+        self.rating = rating
+        self.role = "X"         # the client's player character, "X" moves first
+        self.other = "O"
+        self.opponent = "Opponent" if lobby else "Server"
+        self.lines = collections.deque()        # lines typed but not yet read
+        self.typed = b""                        # keyboard input after the last complete line
+        self.held = collections.deque()         # frames received while waiting for the keyboard, read later
+        self.last_heard = time.monotonic()      # when the last bytes were received from the server
+        self.ping_sent = False
+        self.binary = binary
+        self.sends_place = False    # True while the game's moves are sent as PLACE frames
+
+    def wait(self, for_line):
+        """
+        Waits on the keyboard and the socket at once, so a frame from the server shows up while the user is typing and
+        a line typed while waiting on the server is not stuck behind it. PINGs from the server are answered and chat
+        messages are printed here. Once the game has a session token the client sends its own PING after
+        HEARTBEAT_INTERVAL seconds of silence, and a server that stays silent for HEARTBEAT_TIMEOUT seconds is treated
+        as a dropped connection.
+        :param for_line: If True, lines already typed are returned before frames, else frames before lines
+        :return: A typed line as a string, or a tuple of (opcode, decoded payload as a string, or bytes for PLACE and
+        SYNC) for a received frame
+        """
 
-    def create_board(self):
+        while True:
+            if for_line and self.lines:
+                return self.lines.popleft()
+            if not for_line and self.held:
+                return self.held.popleft()
+            frame = self.connection.next_frame()
+            if frame is not None:
+                opcode, payload = frame
+                if opcode == protocol.PING:
+                    self.send_message(protocol.PONG)
+                elif opcode == protocol.CHAT:
+                    role, _, text = payload.decode(errors="replace").partition(";")
+                    print("[" + role + "]", text)
+                elif opcode in protocol.BINARY:
+                    return opcode, payload
+                elif opcode != protocol.PONG:
+                    return opcode, payload.decode()
+                continue
+            if self.lines:
+                return self.lines.popleft()
+
+            timeout = None
+            if self.token:
+                quiet = time.monotonic() - self.last_heard
+                if quiet >= HEARTBEAT_TIMEOUT:
+                    return self.connection_lost()
+                if quiet >= HEARTBEAT_INTERVAL and not self.ping_sent:
+                    self.send_message(protocol.PING)
+                    self.ping_sent = True
+                timeout = (HEARTBEAT_TIMEOUT if self.ping_sent else HEARTBEAT_INTERVAL) - quiet
+
+            for key, events in self.open_selector().select(timeout):
+                if key.data == "keyboard":
+                    self.read_keyboard()
+                    continue
+                try:
+                    received = self.connection.recv_into()
+                except OSError:
+                    received = 0
+                if not received:
+                    return self.connection_lost()
+                self.last_heard = time.monotonic()
+                self.ping_sent = False
+
+    def open_selector(self):
         """
-        Creates an empty 3x3 tic-tac-toe game board and appends each row of the board to self.game_board
-        :return: NONE
+        Creates the selector waiting on the keyboard and the server, the first time it is needed.
+        :return: The selector
         """
 
-        for i in range(3):
-            row = []
-            for j in range(3):
-                row.append("-")
-            self.game_board.append(row)
+        if self.selector is None:
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.connection, selectors.EVENT_READ, "socket")
+            self.selector.register(self.keyboard, selectors.EVENT_READ, "keyboard")
+        return self.selector
 
-    def print_board(self):
+    def read_keyboard(self):
         """
-        Prints the current game board to the command prompt or terminal
+        Reads whatever the user has typed and splits it into lines. Lines starting with '/say ' are sent as chat right
+        away. Closing the input (e.g.: Ctrl-D) counts as '/q'.
         :return: NONE
         """
 
-        for i in range(3):
-            print(self.game_board[i], "\n")
+        data = os.read(self.keyboard.fileno(), 4096)
+        if not data:
+            self.selector.unregister(self.keyboard)
+            self.lines.append("/q")
+            return
+        *lines, self.typed = (self.typed + data).split(b"\n")
+        for line in lines:
+            line = line.decode(errors="replace").rstrip("\r")
+            if line.startswith("/say "):
+                self.send_message(protocol.CHAT, line[5:])
+            else:
+                self.lines.append(line)
+
+    def read_line(self):
+        """
+        Waits for the user to type a line, used in place of input(). Frames received in the meantime are handled right
+        away: a QUIT from the server ends the wait and a resumed game is printed again. Any other frame is held for the
+        next check_receive().
+        :return: The typed line as a string, or None if the game has ended
+        """
+
+        while True:
+            event = self.wait(True)
+            if isinstance(event, str):
+                return event
+            opcode, message = event
+            if opcode == protocol.QUIT or opcode == protocol.DECLINE:
+                print(self.opponent + " has closed the connection")
+                return None
+            if opcode == protocol.RESUME:
+                turn, winner = self.resume_game(message)
+                if turn != self.role:       # the game moved on while the connection was down
+                    print("Game could not be resumed where it was left")
+                    return None
+                self.print_board()
+                print("Your turn")
+                continue
+            self.held.append(event)
 
     def check_receive(self):
         """
-        Checks if the client has received a response from the server. Received messages are decoded and returned.
-        :return: Decoded message as a string
+        Checks if the client has received a response from the server. Waits for a complete frame, the frame's payload
+        is decoded and returned along with its opcode. Typing '/q' while waiting quits at once and is reported as a QUIT
+        frame. If the connection drops the client reconnects and resumes the game, which is reported as a RESUME frame.
+        A connection that can not be resumed is reported as a QUIT frame.
+        :return: Tuple of (opcode, decoded payload as a string, or bytes for PLACE and SYNC)
+        """
+
+        while True:
+            event = self.wait(False)
+            if not isinstance(event, str):
+                return event
+            if event == "/q":
+                self.send_message(protocol.QUIT)
+                return protocol.QUIT, ""
+            print("Waiting on the " + self.opponent.lower() + "...")
+
+    def connection_lost(self):
+        """
+        Reconnects after the connection has dropped and reports the outcome as a frame.
+        :return: Tuple of (RESUME, board and turn) if the game was resumed, else (QUIT, "")
         """
 
-        recv_message = client_socket.recv(2221)
-        decoded_message = recv_message.decode()
-        return decoded_message
+        state = self.reconnect()
+        if state is None:
+            return protocol.QUIT, ""
+        return protocol.RESUME, state
 
-    def send_message(self, message):
+    def reconnect(self):
         """
-        Receives a client created message. The message is encoded and sent to the server
-        :param message: Represents the message created by the client
-        :return: NONE
+        Opens a new connection to the server and resumes the game with the session token. Attempts are spread out
+        with exponential backoff and random jitter, so clients dropped by the same network blip do not all reconnect
+        at the same moment. A server running several worker processes passes the connection on to the worker
+        holding the game, whichever worker it reaches.
+        :return: RESUME payload holding the board and turn, or None if the game could not be resumed
         """
 
-        encoded_message = message.encode()
-        client_socket.send(encoded_message)
+        self.open_selector().unregister(self.connection)
+        self.connection.close()
+        if not self.token or self.connect is None:
+            return None
+        print("Connection lost, reconnecting...")
+
+        for attempt in range(RECONNECT_ATTEMPTS):
+            time.sleep(random.uniform(0, min(RECONNECT_MAX_DELAY, RECONNECT_DELAY * 2 ** attempt)))
+            connection = None
+            try:
+                connection = self.connect()
+                connection.send(protocol.RESUME, self.token.encode())
+                frame = connection.receive()
+            except OSError:
+                frame = None
+            if frame is None:       # server is not back yet
+                if connection is not None:
+                    connection.close()
+                continue
+
+            # server no longer holds the game
+            self.connection = connection
+            if frame[0] != protocol.RESUME:
+                return None
+            self.selector.register(connection, selectors.EVENT_READ, "socket")
+            self.last_heard = time.monotonic()
+            self.ping_sent = False
+            print("Reconnected, game resumed")
+            return frame[1].decode()
+        return None
+
+    def resume_game(self, state):
+        """
+        Replaces the game board with the board sent by the server in a RESUME frame.
+        :param state: Represents the RESUME payload in the form "height,width,k;cells;turn"
+        :return: Tuple of (player to move, or "-" if the game is over, winner of a finished game)
+        """
 
-    def get_coordinates(self):
+        size, cells, turn = state.split(";")
+        self.size = bitboard.parse_size(size)
+        return turn, self.load_board(cells)
+
+    def sync_game(self, payload):
         """
-        Prompts the client for input coordinates for the desired game character position on the game board.
-        If the coordinates are equal to "/q", a message is sent to the server and returns False.
-        Else the user input is returned
-        :return: User input returned in the form of a string, else return False
+        Replaces the game board with the board sent by the server in a SYNC frame. The player to move follows from the
+        number of characters each player has placed.
+        :param payload: Represents the SYNC payload, a sequence number and the packed board
+        :return: Tuple of (player to move, or "-" if the game is over, winner of a finished game), or None if the
+        payload does not hold a board of the game's size
         """
 
-        coordinates = input()
-        if coordinates == "/q":
-            self.send_message(coordinates)
-            return False
-        return coordinates
+        cells = bitboard.unpack(payload[1:], self.size[0] * self.size[1])
+        if cells is None:
+            return None
+        winner = self.load_board(cells)
+        if winner != "TIE" or self.board.is_full():
+            return "-", winner
+        return "X" if self.board.x.bit_count() == self.board.o.bit_count() else "O", winner
+
+    def load_board(self, cells):
+        """
+        Creates a new game board holding the given characters.
+        :param cells: Represents one character per position in row order, "X", "O" or "-"
+        :return: Winner of the game on the board, "TIE" if there is none
+        """
 
-    def check_valid_move(self, coordinates, player):
+        self.create_board()
+        winner = "TIE"
+        for index, char in enumerate(cells):
+            if char != "-":
+                self.board.place(index, char)
+
+                # the last position of a line in row order sees the whole line
+                if self.win_check(self.board, char):
+                    winner = "Client" if char == self.role else self.opponent
+        self.round_count = 2 * self.board.x.bit_count()
+        return winner
+
+    def send_message(self, opcode, message=""):
         """
-        Tests the received coordinates for validity. Attempts to split coordinates, x and y coordinates
-        are checked if they fall in range of the game board, and game board is checked to see if the coordinates
-        correspond to an open position. If True, game board is updated with player's character. Else method returns
-        False.
-        :param coordinates: Represents the desired coordinates on the game board by the player.
-        :param player:  Represents the character to be placed
-        :return: If coordinates are valid, returns True. Else, Returns False
+        Receives a client created message. The message is encoded into a frame and all of it is sent to the server.
+        A dropped connection is noticed by the next check_receive(), which resumes the game.
+        :param opcode: Represents the type of message, one of the opcodes from protocol.py
+        :param message: Represents the message created by the client
+        :return: NONE
         """
 
-        # attempts to split user input at "," if error thrown, returns False
         try:
-            coord_split = coordinates.split(",")
-            int(coord_split[0])
-            int(coord_split[1])
-        except ValueError:
-            return False
-        except IndexError:
-            return False
+            self.connection.send(opcode, message.encode())
+        except OSError:
+            pass
 
-        else:
-            # splits "coordinates" variable into two variables
-            coord_split = coordinates.split(",")
-            x_coord = int(coord_split[0])
-            y_coord = int(coord_split[1])
-            if x_coord <= 2 and y_coord <= 2:                   # checks if x,y coordinates are in range
-                if self.game_board[x_coord][y_coord] == "-":     # checks if game board spot is occupied
-                    self.game_board[x_coord][y_coord] = player
-                    return True
-
-        return False
-
-    def place_char(self, coordinates, player):
-        """
-        Splits user input into x,y coordinates and places the player's character at the desired coordinates on the
-        game board.
-        :param coordinates: Represents the input coordinates from a player
-        :param player:  Represents a player character
+    def send_move(self, index):
+        """
+        Sends the client's move, which has been placed on the board, to the server. The move is sent as a PLACE frame
+        when the game's moves are sent that way, else as a MOVE frame with the coordinates.
+        :param index: Represents the bit index of the move
         :return: NONE
         """
 
-        coord_split = coordinates.split(",")
-        x_coord = int(coord_split[0])
-        y_coord = int(coord_split[1])
-        self.game_board[x_coord][y_coord] = player
+        if not self.sends_place:
+            self.send_message(protocol.MOVE, self.board.coordinates(index))
+            return
+        try:
+            self.connection.write(protocol.encode_place(self.moves(), index, self.board.width))
+        except OSError:
+            pass
 
-    def win_check(self, board, player):
+    def received_index(self, opcode, message):
         """
-        Checks if a user has won the game by placing three of their characters in a row on the game board.
-        Checks are made for each row, column and diagonal of the current game board.
-        If the variable "char_count" is equal to 3, the player has won the game.
-        :param board: Represents the current game board
-        :param player: Represents the player's character
-        :return: If variable "char_count" is equal to 3, returns True. Else, returns False
+        Reads the position of a move received from the server.
+        :param opcode: Represents the type of message, MOVE or PLACE
+        :param message: Represents the coordinates of a MOVE or the payload of a PLACE
+        :return: Bit index of the position, or None if the move is malformed or out of sequence
         """
 
-        char_count = 0      # variable to track player character counts from the current game board
-        # checks each row
-        for i in range(3):
-            for j in range(3):
-                if board[i][j] == player:
-                    char_count += 1
-            if char_count == 3:
-                return True
-            char_count = 0
-
-        # checks each column
-        for i in range(3):
-            for j in range(3):
-                if board[j][i] == player:
-                    char_count += 1
-            if char_count == 3:
-                return True
-            char_count = 0
+        if opcode == protocol.MOVE:
+            return self.board.cell_index(message)
+        return self.placed_index(message)
 
-        # checks diagonal top-left to bottom-right
-        for i in range(3):
-            if board[i][i] == player:
-                char_count += 1
-        if char_count == 3:
-            return True
-        char_count = 0
+    def get_coordinates(self):
+        """
+        Prompts the client for input coordinates for the desired game character position on the game board.
+        If the coordinates are equal to "/q", a message is sent to the server and returns False.
+        If the input is "/hint", the server is asked for a hint and the client is prompted again.
+        Else the user input is returned
+        :return: User input returned in the form of a string, else return False
+        """
 
-        # check diagonal bottom-left to top-right
-        for i in range(2, -1):
-            if board[i][i] == player:
-                char_count += 1
-        if char_count == 3:
-            return True
+        coordinates = self.read_line()
+        while coordinates == "/hint":
+            self.send_message(protocol.HINT)
+            opcode, hint = self.check_receive()
+            if opcode == protocol.QUIT:
+                return False
+            if opcode == protocol.RESUME:       # connection dropped, the board is sent again
+                self.resume_game(hint)
+                self.print_board()
+                print("Your turn")
+            else:
+                print("Hint:", hint if hint else "none available")
+            coordinates = self.read_line()
+
+        if coordinates is None:     # server closed the connection while the client was typing
+            return False
 
-        return False
+        if coordinates == "/q":
+            self.send_message(protocol.QUIT)
+            return False
+        return coordinates
 
     def initiate_game(self):
         """
@@ -188,37 +384,51 @@ class TicTacToe:
         while True:
             print("Type '/q' to rage quit at any time")
             print("See if the server would like to play a game of Tic-Tac-Toe by sending '?'")
-            snd_message = input()
+            snd_message = self.read_line()
+            if snd_message is None:
+                return False
 
-            # client initiates the game
+            # client initiates the game, asking for its board size
             if snd_message == "?":
-                self.send_message(snd_message)
+                size = ",".join(str(value) for value in self.size)
+                if self.lobby:
+                    self.send_message(protocol.JOIN, size + ";" + (str(self.rating) if self.rating else ""))
+                    print("Waiting for an opponent...")
+                else:
+                    self.send_message(protocol.INVITE, size)
                 return True
 
             # client closes socket
             elif snd_message == "/q":
-                self.send_message(snd_message)
+                self.send_message(protocol.QUIT)
                 return False
 
     def game_accepted(self):
         """
-        Checks the client's received message from the server. If the message data is equal to "y", the server has
-        accepted the game invitation. If the message data is equal to "/q" or "n", the server has closed its socket.
+        Checks the client's received message from the server. If the message is an ACCEPT frame, the server has
+        accepted the game invitation. If the message is a QUIT or DECLINE frame, the server has closed its socket.
         :return: True if game invitation was accepted, False otherwise
         """
 
         # loop to repeatedly check for received message from server
         while True:
-            recv_message = self.check_receive()
-            if recv_message:
+            opcode, recv_message = self.check_receive()
 
-                # Server has closed its socket
-                if recv_message == "/q" or recv_message == "n":
-                    return False
+            # Server has closed its socket
+            if opcode == protocol.QUIT or opcode == protocol.DECLINE:
+                return False
 
-                # server has accepted game invitation
-                if recv_message == "y":
-                    return True
+            # server has accepted game invitation, the server's reply holds the board size, a session token and the
+            # client's player character
+            if opcode == protocol.ACCEPT:
+                fields = recv_message.split(";")
+                self.size = bitboard.parse_size(fields[0])
+                self.token = fields[1] if len(fields) > 1 else ""
+                self.role = fields[2] if len(fields) > 2 else "X"
+                self.other = "O" if self.role == "X" else "X"
+                self.sends_place = self.binary and self.size[0] * self.size[1] <= protocol.BINARY_CELLS
+                self.create_board()
+                return True
 
     def play_game(self):
         """
@@ -228,26 +438,57 @@ class TicTacToe:
         :return: Returns True if a game is in progress, False if the server's socket is closed
         """
 
-        print("Server has accepted the game!")
-        print("You will go first. Enter the row number, followed by a comma, followed by the column number"
-              " to pick a spot (e.g.: 0,2)")
-        first_move = True
+        if self.lobby:
+            print("Matched with an opponent! Type '/say' followed by a message to chat")
+        else:
+            print("Server has accepted the game!")
+        print("You are " + self.role + " and will go " + ("first" if self.role == "X" else "second") + ". Enter the row"
+              " number, followed by a comma, followed by the column number to pick a spot (e.g.: 0,2). Type '/hint' for"
+              " a hint")
+        if self.token:
+            print("Others can watch this game with: python client.py --watch " + self.token.partition(".")[0])
+        first_move = self.role == "X"
         # loop runs until client or server close their socket
         while True:
 
             # checks message received by the server
             if not first_move:
-                recv_message = self.check_receive()
+                opcode, recv_message = self.check_receive()
 
                 # server has closed its socket
-                if recv_message == "/q":
+                if opcode == protocol.QUIT:
                     return False
-                self.place_char(recv_message, "O")
 
-                # check if server has won the game
-                if self.win_check(self.game_board, "O"):
-                    winner = "Server"
+                # connection dropped and the game was resumed, or the boards fell out of step, carry on from the
+                # server's board
+                if opcode == protocol.RESUME or opcode == protocol.SYNC:
+                    if opcode == protocol.RESUME:
+                        state = self.resume_game(recv_message)
+                    else:
+                        state = self.sync_game(recv_message)
+                    if state is None:
+                        print("Server sent a board that does not fit the game")
+                        self.send_message(protocol.QUIT)
+                        return False
+                    turn, winner = state
+                    if turn == "-":
+                        return self.declare_winner(winner)
+                    first_move = turn == self.role
+                    continue
+                if opcode != protocol.MOVE and opcode != protocol.PLACE:
+                    continue
+
+                # a move that does not follow the client's board, the server is asked for its board
+                if not self.check_valid_index(self.received_index(opcode, recv_message), self.other):
+                    self.send_message(protocol.SYNC)
+                    continue
+
+                # check if the opponent has won the game
+                if self.win_check(self.board, self.other):
+                    winner = self.opponent
                     return self.declare_winner(winner)
+                if self.board.is_full():        # boards with an even number of positions fill on the opponent's move
+                    return self.declare_winner("TIE")
 
             first_move = False
             self.print_board()
@@ -262,16 +503,16 @@ class TicTacToe:
                     return False
 
                 # checks if client input is valid and if client has won the game
-                if self.check_valid_move(coordinates, "X"):
-                    if self.win_check(self.game_board, "X"):
+                index = self.board.cell_index(coordinates)
+                if self.check_valid_index(index, self.role):
+                    self.send_move(index)
+                    if self.win_check(self.board, self.role):
                         winner = "Client"
-                        self.send_message(coordinates)
                         return self.declare_winner(winner)
 
                     # client entered valid input, game still in progress
-                    self.send_message(coordinates)
                     self.round_count += 2
-                    if self.round_count == 10:      # checks if we have reached a tie game
+                    if self.board.is_full():        # checks if we have reached a tie game
                         return self.declare_winner("TIE")
                     break
 
@@ -279,6 +520,25 @@ class TicTacToe:
                 else:
                     print("No dice. Please enter a valid move")
 
+    def watch_game(self, game_id):
+        """
+        Watches a game played by others, printing the board every time it changes until the game ends or the client
+        types '/q'.
+        :param game_id: Represents the id of the game, the session id of one of its players
+        :return: NONE
+        """
+
+        self.send_message(protocol.WATCH, game_id)
+        while True:
+            opcode, recv_message = self.check_receive()
+            if opcode == protocol.DECLINE:
+                print("There is no game", game_id)
+            if opcode != protocol.WATCH:
+                return
+            turn, winner = self.resume_game(recv_message)
+            self.print_board()
+            print("Game over" if turn == "-" else turn + " to move")
+
     def declare_winner(self, winner):
         """
         Prints to command prompt/terminal at statement declaring the winner or if the game was a tie.
@@ -293,44 +553,67 @@ class TicTacToe:
             print(winner + " has won the game!")
 
         print("Rematch request sent. Waiting on server response...")
-        if winner == "Server":
-            snd_message = "Play Again? (y or n)"
-            self.send_message(snd_message)
-
-        # loop runs until client receives a message from the server
-        while True:
-            recv_message = self.check_receive()
-            if recv_message:
-                if recv_message != "y":
-                    return False
-                break
+        snd_message = "Play Again? (y or n)"
+        self.send_message(protocol.REMATCH, snd_message)
+
+        # waits for the server's answer to the rematch request
+        opcode, recv_message = self.check_receive()
+        if opcode == protocol.RESUME:
+            turn, winner = self.resume_game(recv_message)
+            if turn == "-":     # rematch request was lost with the connection
+                return self.declare_winner(winner)
+            return True
+        if opcode != protocol.ACCEPT:
+            return False
 
         # reset the game board and counters
-        self.game_board = []
         self.create_board()
         self.round_count = 0
         return True
 
 
-with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as client_socket:
+def main():
     """
-    Creates a client side socket and assigns the socket a host and port number and Establishes a connection to the 
-    server. Calls methods from the "TicTacToe" class
+    Parses the command line, connects to the server and plays games until either side quits, or watches a game.
+    :return: NONE
     """
-    game = TicTacToe()
-    replay = False
-    host = "127.0.0.1"      # host address
-    port = 2221             # port number
-    client_socket.connect((host, port))      # establishes connection to server, initiates three-way handshake
-    print("Connected to local host on port:", port)
-
-    # loop is True until either the server has closed its socket or the client wishes to close its socket
-    while True:
-        if not replay:
-            if not game.initiate_game():    # sends game invitation to server
-                break
-            if not game.game_accepted():    # receives game invitation response from server
+
+    parser = argparse.ArgumentParser(description="Two player tic-tac-toe client")
+    parser.add_argument("--rows", type=int, default=3, help="board height")
+    parser.add_argument("--columns", type=int, default=3, help="board width")
+    parser.add_argument("--k", type=int, default=3, help="number of characters in a row needed to win")
+    parser.add_argument("--lobby", action="store_true", help="play another client paired by the server's lobby")
+    parser.add_argument("--rating", type=int, help="rating used by the lobby to pick an opponent")
+    parser.add_argument("--watch", metavar="GAME", help="watch the game with this id instead of playing")
+    parser.add_argument("--unix", metavar="PATH", help="connect to the server's Unix socket instead of the TCP port")
+    parser.add_argument("--text", action="store_true", help="send moves as text MOVE frames instead of PLACE frames")
+    args = parser.parse_args()
+
+    connect = functools.partial(transport.connect_unix, args.unix) if args.unix else transport.connect
+    game = TicTacToe(connect(), (args.rows, args.columns, args.k), args.lobby, args.rating, connect=connect,
+                     binary=not args.text)
+    if args.unix:
+        print("Connected to:", args.unix)
+    else:
+        print("Connected to local host on port:", transport.PORT)
+    try:
+        if args.watch:
+            game.watch_game(args.watch)
+
+        replay = False
+        # loop is True until either the server has closed its socket or the client wishes to close its socket
+        while not args.watch:
+            if not replay:
+                if not game.initiate_game():    # sends game invitation to server
+                    break
+                if not game.game_accepted():    # receives game invitation response from server
+                    break
+            if not game.play_game():            # begins game play
                 break
-        if not game.play_game():            # begins game play
-            break
-        replay = True
+            replay = True
+    finally:
+        game.connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://www.chessprogramming.org/Negamax
+(2) https://www.chessprogramming.org/Alpha-Beta
+(3) https://www.chessprogramming.org/Transposition_Table
+
+Built-in tic-tac-toe engine. Positions are searched with negamax and alpha-beta pruning. Results are kept in a
+transposition table keyed by the canonical form of the board, the smallest of its 8 rotations and reflections, so a
+position and all of its symmetric copies are only searched once. The table is shared by every Engine in the process.
+"""
+
+import random
+
+import bitboard
+
+# transposition table entry flags
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# difficulty level -> chance of playing the best move instead of a random one
+DIFFICULTY = {
+    "easy": 0.0,
+    "medium": 0.6,
+    "hard": 1.0,
+}
+
+# center first, then corners, then edges, so alpha-beta cuts off early
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+
+def _symmetries():
+    """
+    Builds the 8 rotations and reflections of the board as lists mapping every bit index to its new index.
+    :return: List of 8 permutations
+    """
+
+    size = bitboard.SIZE
+    permutations = []
+    for reflect in (False, True):
+        for turns in range(4):
+            permutation = []
+            for index in range(size * size):
+                row, column = divmod(index, size)
+                if reflect:
+                    column = size - 1 - column
+                for turn in range(turns):
+                    row, column = column, size - 1 - row
+                permutation.append(row * size + column)
+            permutations.append(permutation)
+    return permutations
+
+
+def _symmetry_tables():
+    """
+    Precomputes, for every symmetry, the transformed value of every possible 9-bit int.
+    :return: List of 8 tuples of 512 ints
+    """
+
+    tables = []
+    for permutation in _symmetries():
+        table = []
+        for bits in range(bitboard.FULL + 1):
+            moved = 0
+            for index in range(bitboard.SIZE * bitboard.SIZE):
+                if bits >> index & 1:
+                    moved |= 1 << permutation[index]
+            table.append(moved)
+        tables.append(tuple(table))
+    return tables
+
+
+SYMMETRY_TABLES = None      # built by symmetry_tables() on the first search, not when the module is imported
+
+
+def symmetry_tables():
+    """
+    Builds the symmetry tables the first time they are needed.
+    :return: List of 8 tuples of 512 ints
+    """
+
+    global SYMMETRY_TABLES
+    if SYMMETRY_TABLES is None:
+        SYMMETRY_TABLES = _symmetry_tables()
+    return SYMMETRY_TABLES
+
+
+def canonical(own, other):
+    """
+    Finds the canonical key of a position, the smallest key among its 8 symmetric copies.
+    :param own: Represents the bitboard of the player to move
+    :param other: Represents the bitboard of the player who moved last
+    :return: Key as an int
+    """
+
+    return min(table[own] << 9 | table[other] for table in SYMMETRY_TABLES or symmetry_tables())
+
+
+class TranspositionTable:
+    """
+    Creates a TranspositionTable Object. This class is responsible for storing searched positions by canonical key and
+    counting probes and hits.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty table and its counters.
+        """
+
+        self.entries = {}
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        """
+        Removes every entry and resets the counters.
+        :return: NONE
+        """
+
+        self.entries.clear()
+        self.probes = 0
+        self.hits = 0
+
+    def hit_rate(self):
+        """
+        Calculates the share of probes that found an entry.
+        :return: Hit rate from 0.0 to 1.0
+        """
+
+        return self.hits / self.probes if self.probes else 0.0
+
+
+TABLE = TranspositionTable()
+
+
+class Engine:
+    """
+    Creates an Engine Object. This class is responsible for picking moves for a player at a given difficulty level.
+    """
+
+    def __init__(self, difficulty="hard", seed=None, table=TABLE, tablebase=None):
+        """
+        Initializes the engine's difficulty, random number generator and transposition table.
+        :param difficulty: Represents the difficulty level, "easy", "medium" or "hard"
+        :param seed: Represents the random seed used for non-best moves and to break ties between best moves
+        :param table: Represents the TranspositionTable to use, shared by every engine by default
+        :param tablebase: Represents a tablebase.Tablebase to read best moves from instead of searching, or None
+        """
+
+        if difficulty not in DIFFICULTY:
+            raise ValueError("unknown difficulty: " + str(difficulty))
+        self.difficulty = difficulty
+        self.rng = random.Random(seed)
+        self.table = table
+        self.tablebase = tablebase
+        self.nodes = 0
+
+    def negamax(self, own, other, alpha, beta):
+        """
+        Searches a position to the end of the game.
+        :param own: Represents the bitboard of the player to move
+        :param other: Represents the bitboard of the player who moved last
+        :param alpha: Represents the lowest score the player to move is already assured of
+        :param beta: Represents the highest score the opponent will allow
+        :return: Score for the player to move. Positive scores win, faster wins score higher, 0 is a tie
+        """
+
+        self.nodes += 1
+        taken = own | other
+        if bitboard.WIN_TABLE[other]:
+            return taken.bit_count() - 10
+        if taken == bitboard.FULL:
+            return 0
+
+        table = self.table
+        key = canonical(own, other)
+        table.probes += 1
+        entry = table.entries.get(key)
+        if entry is not None:
+            table.hits += 1
+            value, flag = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        original_alpha = alpha
+        best = -10
+        for index in MOVE_ORDER:
+            bit = 1 << index
+            if taken & bit:
+                continue
+            value = -self.negamax(other, own | bit, -beta, -alpha)
+            if value > best:
+                best = value
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        table.entries[key] = (best, flag)
+        return best
+
+    def scores(self, board, player):
+        """
+        Scores every open position on the board for the player to move.
+        :param board: Represents the current game board as a BitBoard
+        :param player: Represents the player character to move, "X" or "O"
+        :return: Dictionary mapping every open bit index to its score
+        """
+
+        own, other = (board.x, board.o) if player == "X" else (board.o, board.x)
+        return {index: -self.negamax(other, own | 1 << index, -10, 10) for index in board.open_cells()}
+
+    def best_moves(self, board, player):
+        """
+        Finds every move that scores as well as the best move.
+        :param board: Represents the current game board as a BitBoard
+        :param player: Represents the player character to move, "X" or "O"
+        :return: List of bit indexes, empty for boards other than the classic 3x3 game
+        """
+
+        # the search only knows the classic 3x3 game
+        if not bitboard.is_classic(board):
+            return []
+
+        if self.tablebase is not None:
+            moves = self.tablebase.best_moves(board)
+            if moves:
+                return moves
+
+        scores = self.scores(board, player)
+        best = max(scores.values())
+        return [index for index, score in scores.items() if score == best]
+
+    def choose_move(self, board, player):
+        """
+        Picks the engine's move. Depending on the difficulty level, the move is either one of the best moves or a
+        random open position. Boards other than the classic 3x3 game always get a random open position.
+        :param board: Represents the current game board as a BitBoard
+        :param player: Represents the player character to move, "X" or "O"
+        :return: Bit index of the move
+        """
+
+        if self.rng.random() < DIFFICULTY[self.difficulty] and bitboard.is_classic(board):
+            return self.rng.choice(self.best_moves(board, player))
+        return self.rng.choice(board.open_cells())
@@ -0,0 +1,163 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://docs.python.org/3/reference/datamodel.html#slots
+(2) Computer Networking: A Top Down Approach 8th edition, (Jim Kurose, Keith Ross)
+
+The game itself, without a connection: the board, the round count and the rules for placing a character and finding a
+winner. The command line server and client add the messages they exchange on top of it in server.py and client.py,
+and async_server.py holds one per session. Importing this module opens nothing, so any number of games can be created
+in one process, e.g. by a benchmark.
+
+Moves received from the other side are checked against the board before they are placed, a move that is malformed,
+taken, out of range or out of sequence is never applied.
+
+A game given a history.GameHistory records every move placed through it and writes the game's record when the board
+is cleared for the next game, or when save_history() is called.
+"""
+
+import bitboard
+import protocol
+
+
+class Game:
+    """
+    Creates a Game Object. This class is responsible for initializing and creating a tic-tac-toe game board and
+    tracking how many rounds have been played throughout the course of the game.
+    """
+
+    __slots__ = ("size", "board", "round_count", "engine", "history")
+
+    def __init__(self, size=(bitboard.SIZE, bitboard.SIZE, bitboard.SIZE), engine=None):
+        """
+        Initializes and creates a tic-tac-toe board and creates a variable for tracking the number of rounds played
+        throughout the course of the game.
+        :param size: Represents the board size, as a tuple of (height, width, k in a row)
+        :param engine: Represents an engine.Engine that plays one side's moves, or None
+        """
+
+        self.size = size
+        self.history = None         # history.GameHistory recording the moves, or None
+        self.create_board()
+        self.round_count = 0
+        self.engine = engine
+
+    def create_board(self):
+        """
+        Creates an empty game board of the size agreed by both sides (3x3 by default), stored as one int per player
+        with one bit per position. The record of the game played on the old board is written first.
+        :return: NONE
+        """
+
+        self.save_history()
+        self.board = bitboard.make_board(*self.size)
+
+    def save_history(self):
+        """
+        Writes the record of the game played so far, if the game is recorded and a move has been made, and starts
+        recording a new game.
+        :return: NONE
+        """
+
+        if self.history is not None:
+            self.history.save(self.board)
+
+    @property
+    def game_board(self):
+        """
+        Renders the current game board as a list of three rows of one character strings, used for printing
+        :return: List of lists representing the game board
+        """
+
+        return self.board.rows()
+
+    def print_board(self):
+        """
+        Prints the current game board to the command prompt or terminal
+        :return: NONE
+        """
+
+        for row in self.game_board:
+            print(row, "\n")
+
+    def moves(self):
+        """
+        Counts the characters on the board, the sequence number of the last move.
+        :return: Number of characters placed
+        """
+
+        return self.board.x.bit_count() + self.board.o.bit_count()
+
+    def check_valid_move(self, coordinates, player):
+        """
+        Tests the received coordinates for validity. Coordinates are converted into a position on the game board,
+        which must be in range and open. If True, game board is updated with player's character. Else method returns
+        False.
+        :param coordinates: Represents the desired coordinates on the game board by the player.
+        :param player:  Represents the character to be placed
+        :return: If coordinates are valid, returns True. Else, Returns False
+        """
+
+        return self.check_valid_index(self.board.cell_index(coordinates), player)
+
+    def check_valid_index(self, index, player):
+        """
+        Tests a position for validity, it must be on the board and open. If True, game board is updated with player's
+        character. Else method returns False.
+        :param index: Represents the bit index of the position, or None for malformed coordinates
+        :param player:  Represents the character to be placed
+        :return: If the position is valid, returns True. Else, Returns False
+        """
+
+        board = self.board
+        if index is None or index >= board.height * board.width or not board.is_open(index):
+            return False
+        self.place(index, player)
+        return True
+
+    def place(self, index, player):
+        """
+        Places a player's character at a position already known to be open, and records the move.
+        :param index: Represents the bit index of the position
+        :param player:  Represents the character to be placed
+        :return: NONE
+        """
+
+        self.board.place(index, player)
+        if self.history is not None:
+            self.history.add(index)
+
+    def placed_index(self, payload):
+        """
+        Reads the position of a move received in a PLACE frame. The move's sequence number must follow the board's.
+        :param payload: Represents the PLACE payload
+        :return: Bit index of the position, or None if the move is out of sequence
+        """
+
+        sequence, index = protocol.decode_place(payload)
+        board = self.board
+        if sequence != protocol.place_sequence(board.x.bit_count() + board.o.bit_count() + 1):
+            return None
+        return index
+
+    def sync_frame(self):
+        """
+        Encodes the board into a SYNC frame.
+        :return: The encoded frame as bytes
+        """
+
+        return protocol.encode_sync(self.moves(), bitboard.pack(self.board))
+
+    def win_check(self, board, player):
+        """
+        Checks if a user has won the game by placing three of their characters in a row on the game board.
+        The player's positions are looked up against the 8 precomputed winning rows, columns and diagonals.
+        :param board: Represents the current game board as a BitBoard
+        :param player: Represents the player's character
+        :return: If the player holds a winning line, returns True. Else, returns False
+        """
+
+        return board.has_won(player)
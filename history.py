@@ -0,0 +1,401 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://docs.python.org/3/library/struct.html
+(2) https://docs.python.org/3/library/mmap.html
+(3) https://docs.python.org/3/howto/functional.html#generators
+
+Game records and the analysis of them. Every finished or abandoned game is appended to a record file as one variable
+size record, so the file holds every game a server has played. A record is a 10 byte header followed by the moves in
+the order they were played and the time taken by each:
+
+    header        height, width, k and outcome (1 byte each), the number of moves (2 bytes) and the start of the
+                  game in Unix seconds (4 bytes)
+    moves         the bit index of every move, 1 byte each on boards of up to 256 positions, else 2 bytes
+    times         milliseconds from the previous move (from the start of the game for the first move), 2 bytes each,
+                  capped at MAX_TIME
+
+All numbers are little-endian. A classic 3x3 game takes at most 37 bytes. The file starts with a 6 byte header, magic
+and version. Records are collected in memory and appended 64 KiB at a time, or by the server once a second, and the
+file is not synced: a crash loses the games still in memory rather than costing the game loop a disk write per game.
+
+read_records() is a generator reading a file of any size in fixed size chunks, or through mmap, and yielding one
+record at a time, so memory use does not grow with the file. Analysis adds records up into opening frequencies, win
+rates by first move, game lengths and move times, all held in tables of a fixed size.
+"""
+
+import argparse
+import array
+import collections
+import json
+import mmap
+import os
+import struct
+import time
+
+FILE_MAGIC = b"TTTH"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sH")         # magic, version
+RECORD = struct.Struct("<BBBBHI")           # height, width, k, outcome, moves, start of the game in Unix seconds
+
+# outcomes of a game
+TIE = 0
+X_WON = 1
+O_WON = 2
+UNFINISHED = 3          # a player quit or did not resume in time
+OUTCOMES = ("tie", "x_won", "o_won", "unfinished")
+
+MAX_TIME = 0xFFFF       # longest move time a record holds, in milliseconds
+NARROW_CELLS = 256      # largest board whose moves take 1 byte each
+FLUSH_SIZE = 65536      # bytes of records collected before they are appended to the file
+FLUSH_INTERVAL = 1.0    # seconds between appending whatever has been collected, see RecordWriter.flush()
+CHUNK_SIZE = 1 << 20    # bytes read from a record file at once
+
+_ARRAYS = {}            # number of values -> struct.Struct of that many little-endian 2 byte values
+
+
+def halfwords(count):
+    """
+    Finds the struct reading a number of 2 byte values, created on first use.
+    :param count: Represents the number of values
+    :return: The struct.Struct
+    """
+
+    unpacker = _ARRAYS.get(count)
+    if unpacker is None:
+        unpacker = _ARRAYS[count] = struct.Struct("<" + str(count) + "H")
+    return unpacker
+
+
+def outcome(board):
+    """
+    Finds the outcome of a game from its final board.
+    :param board: Represents the board the game ended on
+    :return: X_WON, O_WON, TIE for a full board without a winner, else UNFINISHED
+    """
+
+    if board.has_won("X"):
+        return X_WON
+    if board.has_won("O"):
+        return O_WON
+    return TIE if board.is_full() else UNFINISHED
+
+
+def encode_record(size, result, started, moves, times):
+    """
+    Builds the record of one game.
+    :param size: Represents the board size as a tuple of (height, width, k)
+    :param result: Represents the outcome of the game, one of OUTCOMES' indexes
+    :param started: Represents the start of the game in Unix seconds
+    :param moves: Represents the bit index of every move in the order they were played
+    :param times: Represents the milliseconds taken by every move, at most MAX_TIME each
+    :return: The encoded record as bytes
+    """
+
+    height, width, k = size
+    count = len(moves)
+    header = RECORD.pack(height, width, k, result, count, int(started))
+    if height * width <= NARROW_CELLS:
+        return header + bytes(moves) + halfwords(count).pack(*times)
+    return header + halfwords(count).pack(*moves) + halfwords(count).pack(*times)
+
+
+class RecordWriter:
+    """
+    Creates a RecordWriter Object. This class is responsible for collecting encoded records and appending them to a
+    record file in blocks.
+    """
+
+    __slots__ = ("path", "buffer", "file", "records")
+
+    def __init__(self, path):
+        """
+        Initializes an empty buffer. The file is created, or opened for appending, by the first flush.
+        :param path: Represents the path of the record file
+        """
+
+        self.path = path
+        self.buffer = bytearray()
+        self.file = None
+        self.records = 0
+
+    def write(self, record):
+        """
+        Adds a record, the buffer is appended to the file once it holds FLUSH_SIZE bytes.
+        :param record: Represents the record as returned by encode_record()
+        :return: NONE
+        """
+
+        self.buffer += record
+        self.records += 1
+        if len(self.buffer) >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Appends every buffered record to the file in one write.
+        :return: NONE
+        """
+
+        if self.file is None:
+            self.file = open(self.path, "ab", buffering=0)
+            if not self.file.tell():
+                self.file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION))
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+
+    def close(self):
+        """
+        Appends the buffered records and closes the file.
+        :return: NONE
+        """
+
+        self.flush()
+        self.file.close()
+
+
+class GameHistory:
+    """
+    Creates a GameHistory Object. This class is responsible for remembering the moves of the game in progress and the
+    time taken by each, and writing them as a record once the game ends.
+    """
+
+    __slots__ = ("writer", "moves", "times", "started", "last")
+
+    def __init__(self, writer):
+        """
+        Initializes an empty history starting now.
+        :param writer: Represents the RecordWriter the game's record is written to
+        """
+
+        self.writer = writer
+        self.moves = []
+        self.times = []
+        self.started = time.time()
+        self.last = time.monotonic()
+
+    def add(self, index):
+        """
+        Remembers a move and the time taken since the previous move.
+        :param index: Represents the bit index of the move
+        :return: NONE
+        """
+
+        now = time.monotonic()
+        self.moves.append(index)
+        self.times.append(min(MAX_TIME, int((now - self.last) * 1000)))
+        self.last = now
+
+    def save(self, board):
+        """
+        Writes the record of the game played on a board if any move was made, and starts a new history.
+        :param board: Represents the board of the game
+        :return: NONE
+        """
+
+        if self.moves:
+            self.writer.write(encode_record((board.height, board.width, board.k), outcome(board), self.started,
+                                            self.moves, self.times))
+            self.moves = []
+            self.times = []
+        self.started = time.time()
+        self.last = time.monotonic()
+
+
+def parse_records(data, offset):
+    """
+    Reads the records held in a block of data, up to the first incomplete record.
+    :param data: Represents the block, bytes or an mmap
+    :param offset: Represents the offset of the first record in the block
+    :return: Generator yielding a tuple of (height, width, k, outcome, start in Unix seconds, moves, times) per record,
+    with the moves as bytes or a tuple of ints and the times as a tuple of ints. Returns the offset it stopped at.
+    """
+
+    unpack = RECORD.unpack_from
+    header = RECORD.size
+    end = len(data)
+    while offset + header <= end:
+        height, width, k, result, count, started = unpack(data, offset)
+        start = offset + header
+        if height * width <= NARROW_CELLS:
+            stop = start + 3 * count
+            if stop > end:
+                break
+            moves = data[start:start + count]
+            times = halfwords(count).unpack_from(data, start + count)
+        else:
+            stop = start + 4 * count
+            if stop > end:
+                break
+            moves = halfwords(count).unpack_from(data, start)
+            times = halfwords(count).unpack_from(data, start + 2 * count)
+        yield height, width, k, result, started, moves, times
+        offset = stop
+    return offset
+
+
+def read_records(path, chunk_size=CHUNK_SIZE, use_mmap=False):
+    """
+    Reads every record of a record file, one at a time. The file is read chunk_size bytes at a time, or mapped into
+    memory with use_mmap, so only the chunk being read is held whatever the size of the file. A record cut short at
+    the end of the file, e.g. by a crash while it was appended, is skipped.
+    :param path: Represents the path of the record file
+    :param chunk_size: Represents the number of bytes read at once
+    :param use_mmap: If True, the file is mapped into memory instead of being read in chunks
+    :return: Generator yielding a tuple per record, see parse_records()
+    """
+
+    with open(path, "rb") as file:
+        magic, version = FILE_HEADER.unpack(file.read(FILE_HEADER.size))
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError(path + " is not a version " + str(FILE_VERSION) + " record file")
+        if use_mmap:
+            if os.fstat(file.fileno()).st_size > FILE_HEADER.size:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    yield from parse_records(mapped, FILE_HEADER.size)
+            return
+
+        left = b""
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            data = left + chunk if left else chunk
+            offset = yield from parse_records(data, 0)
+            left = data[offset:]
+
+
+class Analysis:
+    """
+    Creates an Analysis Object. This class is responsible for adding up statistics over game records: outcomes, game
+    lengths, opening frequencies, win rates by first move and the distribution of move times. Every table has a fixed
+    size, or one entry per board size and opening, so memory use does not grow with the number of records.
+    """
+
+    __slots__ = ("opening_length", "games", "moves", "outcomes", "openings", "first_moves", "move_times")
+
+    def __init__(self, opening_length=2):
+        """
+        Initializes empty statistics.
+        :param opening_length: Represents the number of moves counted as a game's opening
+        """
+
+        self.opening_length = opening_length
+        self.games = 0
+        self.moves = 0
+        self.outcomes = [0] * len(OUTCOMES)
+        self.openings = collections.Counter()       # (height, width, k, opening moves) -> games
+        self.first_moves = {}                       # (height, width, k, first move) -> games by outcome
+        self.move_times = array.array("Q", bytes(8 * (MAX_TIME + 1)))     # milliseconds -> moves
+
+    def add(self, record):
+        """
+        Adds one record to the statistics.
+        :param record: Represents a record as yielded by read_records()
+        :return: NONE
+        """
+
+        height, width, k, result, started, moves, times = record
+        self.games += 1
+        self.moves += len(moves)
+        self.outcomes[result] += 1
+        if moves:
+            self.openings[height, width, k, moves[:self.opening_length]] += 1
+            key = (height, width, k, moves[0])
+            counts = self.first_moves.get(key)
+            if counts is None:
+                counts = self.first_moves[key] = [0] * len(OUTCOMES)
+            counts[result] += 1
+        move_times = self.move_times
+        for milliseconds in times:
+            move_times[milliseconds] += 1
+
+    def time_percentile(self, fraction):
+        """
+        Finds a percentile of the move times.
+        :param fraction: Represents the percentile as a fraction, e.g. 0.99
+        :return: Move time in milliseconds, or None if no move has been added
+        """
+
+        if not self.moves:
+            return None
+        rank = fraction * self.moves
+        seen = 0
+        for milliseconds, count in enumerate(self.move_times):
+            seen += count
+            if count and seen >= rank:
+                return milliseconds
+        return MAX_TIME
+
+    def report(self, top=10):
+        """
+        Summarizes the statistics.
+        :param top: Represents the number of most frequent openings listed
+        :return: Dictionary of statistics, ready for json.dumps()
+        """
+
+        def name(height, width, k):
+            return str(height) + "x" + str(width) + "," + str(k)
+
+        def coordinates(width, moves):
+            return " ".join(str(index // width) + "," + str(index % width) for index in moves)
+
+        first_moves = {}
+        for (height, width, k, index), counts in sorted(self.first_moves.items()):
+            games = sum(counts)
+            rates = {"games": games}
+            for result, count in zip(OUTCOMES, counts):
+                rates[result] = count / games
+            first_moves.setdefault(name(height, width, k), {})[coordinates(width, (index,))] = rates
+        total_time = sum(milliseconds * count for milliseconds, count in enumerate(self.move_times) if count)
+        return {"games": self.games, "moves": self.moves,
+                "average_length": self.moves / self.games if self.games else None,
+                "outcomes": dict(zip(OUTCOMES, self.outcomes)),
+                "openings": [{"board": name(height, width, k), "moves": coordinates(width, moves), "games": games}
+                             for (height, width, k, moves), games in self.openings.most_common(top)],
+                "first_moves": first_moves,
+                "move_time_ms": {"mean": total_time / self.moves if self.moves else None,
+                                 "p50": self.time_percentile(0.50), "p90": self.time_percentile(0.90),
+                                 "p99": self.time_percentile(0.99), "max": self.time_percentile(1.0)}}
+
+
+def analyze(path, opening_length=2, chunk_size=CHUNK_SIZE, use_mmap=False):
+    """
+    Reads a record file from start to end and adds up its statistics.
+    :param path: Represents the path of the record file
+    :param opening_length: Represents the number of moves counted as a game's opening
+    :param chunk_size: Represents the number of bytes read at once
+    :param use_mmap: If True, the file is mapped into memory instead of being read in chunks
+    :return: The Analysis
+    """
+
+    analysis = Analysis(opening_length)
+    add = analysis.add
+    for record in read_records(path, chunk_size, use_mmap):
+        add(record)
+    return analysis
+
+
+def main():
+    """
+    Parses the command line, analyzes a record file and prints the statistics as JSON.
+    :return: NONE
+    """
+
+    parser = argparse.ArgumentParser(description="Statistics over a file of game records")
+    parser.add_argument("path", help="record file written by async_server.py --record")
+    parser.add_argument("--opening", type=int, default=2, help="number of moves counted as a game's opening")
+    parser.add_argument("--top", type=int, default=10, help="number of most frequent openings listed")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="bytes read at once")
+    parser.add_argument("--mmap", action="store_true", help="map the file into memory instead of reading chunks")
+    args = parser.parse_args()
+
+    print(json.dumps(analyze(args.path, args.opening, args.chunk_size, args.mmap).report(args.top), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://docs.python.org/3/library/heapq.html
+(2) https://docs.python.org/3/library/collections.html#collections.OrderedDict
+(3) https://en.wikipedia.org/wiki/Elo_rating_system
+
+Matchmaking lobby. Players waiting for an opponent are kept in FIFO queues, one for every board size and rating
+bucket. A new player is paired with the longest waiting player in its own bucket or the nearest neighbouring bucket
+within the rating window, so pairing looks at a fixed number of queues no matter how many players are waiting. A
+bucket lying inside the window answers with the head of its queue. The outermost buckets searched are only partly
+inside it, so every player is also queued by exact rating, and for such a bucket only its ratings inside the window
+are read: never more than bucket_width queues, or the bucket's tickets when it holds fewer. A player that leaves is
+removed from its queues at once, queues are ordered dicts, so no queue holds players that are no longer waiting.
+Players still waiting after the longest allowed wait are handed back to be paired with the engine, found through a
+heap ordered by deadline. Enqueue is O(log n) for the heap push, leaving the lobby is O(1).
+"""
+
+import collections
+import heapq
+import itertools
+import time
+
+DEFAULT_RATING = 1500
+
+
+class Ticket:
+    """
+    Creates a Ticket Object. Holds one player's place in the lobby: the player, the board size and rating it asked
+    for and when it joined.
+    """
+
+    __slots__ = ("player", "size", "rating", "bucket", "enqueued", "sequence", "active")
+
+    def __init__(self, player, size, rating=DEFAULT_RATING):
+        """
+        Initializes the ticket. The ticket is not waiting until it is passed to Lobby.enqueue()
+        :param player: Represents the player waiting, e.g. a GameSession
+        :param size: Represents the board size as a tuple of (height, width, k)
+        :param rating: Represents the player's rating, an int
+        """
+
+        self.player = player
+        self.size = size
+        self.rating = rating
+        self.bucket = None
+        self.enqueued = None
+        self.sequence = None        # order the ticket was queued in, older tickets have lower numbers
+        self.active = False
+
+
+class Lobby:
+    """
+    Creates a Lobby Object. This class is responsible for pairing waiting players by board size and rating, handing
+    out players that waited too long and keeping queue-wait statistics.
+    """
+
+    def __init__(self, window=200, bucket_width=50, max_wait=10.0, samples=10000, clock=time.monotonic):
+        """
+        Initializes an empty lobby.
+        :param window: Represents the largest rating difference between two paired players
+        :param bucket_width: Represents the rating range covered by one queue
+        :param max_wait: Represents the number of seconds a player waits for an opponent before expiring
+        :param samples: Represents the number of recent queue waits kept for the wait percentiles
+        :param clock: Represents the function returning the current time in seconds
+        """
+
+        self.window = window
+        self.bucket_width = bucket_width
+        self.max_wait = max_wait
+        self.clock = clock
+        self.buckets = {}           # (size, bucket) -> OrderedDict of Tickets, oldest first
+        self.ratings = {}           # (size, rating) -> OrderedDict of Tickets, oldest first
+        self.deadlines = []         # heap of (deadline, sequence, Ticket)
+        self.sequence = itertools.count()
+        self.waiting = 0
+        self.waits = collections.deque(maxlen=samples)      # seconds waited by recently paired or expired players
+        self.enqueued = 0
+        self.paired = 0
+        self.expired = 0
+        self.cancelled = 0
+
+        # buckets searched for an opponent, nearest first, up to the furthest bucket holding a rating within the window
+        reach = -(-window // bucket_width)
+        self.offsets = [0] + [sign * step for step in range(1, reach + 1) for sign in (-1, 1)]
+
+    def _pop(self, size, bucket, rating):
+        """
+        Removes the longest waiting ticket within the rating window from a bucket. Only the ratings of the bucket
+        inside the window are read, a bucket lying inside it answers with its head.
+        :param size: Represents the board size of the queue
+        :param bucket: Represents the rating bucket of the queue
+        :param rating: Represents the rating of the player looking for an opponent
+        :return: The Ticket, or None
+        """
+
+        queue = self.buckets.get((size, bucket))
+        if queue is None:
+            return None
+        low = bucket * self.bucket_width
+        high = low + self.bucket_width - 1
+        if low >= rating - self.window and high <= rating + self.window:
+            ticket = next(iter(queue))
+        else:
+            low = max(low, rating - self.window)
+            high = min(high, rating + self.window)
+            ticket = None
+            if len(queue) <= high - low:        # fewer tickets than ratings to look up, the oldest in range wins
+                for waiting in queue:
+                    if low <= waiting.rating <= high:
+                        ticket = waiting
+                        break
+            else:
+                for key in range(low, high + 1):
+                    same = self.ratings.get((size, key))
+                    if same is not None:
+                        head = next(iter(same))
+                        if ticket is None or head.sequence < ticket.sequence:
+                            ticket = head
+            if ticket is None:
+                return None
+        self._dequeue(ticket)
+        return ticket
+
+    def _dequeue(self, ticket):
+        """
+        Removes a waiting ticket from its bucket and rating queues, dropping queues left empty.
+        :param ticket: Represents the Ticket
+        :return: NONE
+        """
+
+        for queues, key in ((self.buckets, (ticket.size, ticket.bucket)), (self.ratings, (ticket.size, ticket.rating))):
+            queue = queues[key]
+            del queue[ticket]
+            if not queue:
+                del queues[key]
+
+    def _leave(self, ticket, now):
+        """
+        Marks a ticket as no longer waiting and records how long it waited.
+        :param ticket: Represents the Ticket
+        :param now: Represents the current time
+        :return: NONE
+        """
+
+        ticket.active = False
+        self.waiting -= 1
+        self.waits.append(now - ticket.enqueued)
+
+    def enqueue(self, ticket):
+        """
+        Pairs a player with a waiting opponent, or queues the player if there is none.
+        :param ticket: Represents the new player's Ticket
+        :return: The opponent's Ticket, or None if the player was queued
+        """
+
+        now = self.clock()
+        self.enqueued += 1
+        ticket.enqueued = now
+        ticket.bucket = ticket.rating // self.bucket_width
+        for offset in self.offsets:
+            opponent = self._pop(ticket.size, ticket.bucket + offset, ticket.rating)
+            if opponent is not None:
+                self._leave(opponent, now)
+                self.waits.append(0.0)
+                self.paired += 2
+                return opponent
+
+        ticket.active = True
+        ticket.sequence = next(self.sequence)
+        self.waiting += 1
+        for queues, key in ((self.buckets, (ticket.size, ticket.bucket)), (self.ratings, (ticket.size, ticket.rating))):
+            queue = queues.get(key)
+            if queue is None:
+                queue = queues[key] = collections.OrderedDict()
+            queue[ticket] = None
+        heapq.heappush(self.deadlines, (now + self.max_wait, ticket.sequence, ticket))
+        return None
+
+    def remove(self, ticket):
+        """
+        Takes a player out of the lobby, e.g. when its connection drops. The ticket leaves its queues at once, only its
+        entry in the deadline heap is dropped lazily.
+        :param ticket: Represents the player's Ticket
+        :return: NONE
+        """
+
+        if ticket.active:
+            self._dequeue(ticket)
+            ticket.active = False
+            self.waiting -= 1
+            self.cancelled += 1
+
+    def expire(self):
+        """
+        Takes every player that has waited longer than the longest allowed wait out of the lobby.
+        :return: List of expired Tickets, longest waiting first
+        """
+
+        now = self.clock()
+        expired = []
+        while self.deadlines and self.deadlines[0][0] <= now:
+            ticket = heapq.heappop(self.deadlines)[2]
+            if ticket.active:
+                self._dequeue(ticket)
+                self._leave(ticket, now)
+                self.expired += 1
+                expired.append(ticket)
+        return expired
+
+    def stats(self):
+        """
+        Summarizes the lobby's counters and the queue wait of recently paired or expired players.
+        :return: Dictionary of statistics, waits in milliseconds
+        """
+
+        waits = sorted(self.waits)
+
+        def percentile(fraction):
+            if not waits:
+                return None
+            return waits[min(len(waits) - 1, int(fraction * len(waits)))] * 1000
+
+        return {
+            "waiting": self.waiting,
+            "enqueued": self.enqueued,
+            "paired": self.paired,
+            "expired": self.expired,
+            "cancelled": self.cancelled,
+            "wait_p50_ms": percentile(0.50),
+            "wait_p99_ms": percentile(0.99),
+            "wait_max_ms": waits[-1] * 1000 if waits else None,
+        }
@@ -0,0 +1,239 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://prometheus.io/docs/instrumenting/exposition_formats/
+(2) http://hdrhistogram.org/
+(3) https://docs.python.org/3/library/array.html
+
+Metrics of the server, exposed as text in the Prometheus exposition format. Counters and gauges are not stored here:
+the server keeps plain int attributes, which cost one addition to update, and the registry reads them through a
+function when it is scraped. Latencies are recorded into Histograms whose buckets are allocated once, in the layout of
+an HDR histogram: every power of two of nanoseconds is split into SUB_BUCKETS linear buckets, so each value is counted
+within 1/SUB_BUCKETS of its true size from nanoseconds to minutes, and recording a value is a bit_length(), a shift
+and an array increment, with no allocation.
+
+serve() answers "GET /metrics" on a local port, e.g. for Prometheus or curl. Importing this module does not import
+asyncio, a process only pays for it once it serves its metrics.
+"""
+
+import array
+
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS     # linear buckets per power of two
+MAX_BITS = 40                   # longest value recorded is 2 ** 40 ns, about 18 minutes, longer values are clamped
+BUCKETS = (MAX_BITS - SUB_BITS + 1) * SUB_BUCKETS
+EXPOSED = range(10, 35)         # powers of two of nanoseconds exposed as "le" bounds, about 1 us to 17 s
+
+
+def bucket_index(value):
+    """
+    Finds the bucket of a value.
+    :param value: Represents the value in nanoseconds, a non-negative int
+    :return: Index of the bucket
+    """
+
+    shift = value.bit_length() - SUB_BITS - 1
+    if shift <= 0:
+        return value
+    return (shift + 1 << SUB_BITS) + (value >> shift) - SUB_BUCKETS
+
+
+def bucket_bounds(index):
+    """
+    Finds the range of values counted by a bucket.
+    :param index: Represents the index of the bucket
+    :return: Tuple of (lowest value, one past the highest value) in nanoseconds
+    """
+
+    if index < 2 * SUB_BUCKETS:
+        return index, index + 1
+    shift = (index >> SUB_BITS) - 1
+    low = (index - (shift + 1 << SUB_BITS) + SUB_BUCKETS) << shift
+    return low, low + (1 << shift)
+
+
+class Histogram:
+    """
+    Creates a Histogram Object. This class is responsible for counting latencies in pre-allocated buckets and
+    reporting them as Prometheus buckets or as percentiles.
+    """
+
+    __slots__ = ("name", "help", "counts", "total")
+
+    def __init__(self, name, help):
+        """
+        Initializes an empty histogram.
+        :param name: Represents the metric's name, without the unit, e.g. "move"
+        :param help: Represents the metric's description
+        """
+
+        self.name = name
+        self.help = help
+        self.counts = array.array("Q", bytes(8 * BUCKETS))
+        self.total = 0              # sum of every value recorded, in nanoseconds
+
+    def record(self, nanoseconds):
+        """
+        Counts one value.
+        :param nanoseconds: Represents the value, e.g. the difference of two time.perf_counter_ns() readings
+        :return: NONE
+        """
+
+        shift = nanoseconds.bit_length() - SUB_BITS - 1
+        if shift <= 0:
+            self.counts[nanoseconds if nanoseconds > 0 else 0] += 1
+        elif shift < MAX_BITS - SUB_BITS:
+            self.counts[(shift + 1 << SUB_BITS) + (nanoseconds >> shift) - SUB_BUCKETS] += 1
+        else:
+            self.counts[BUCKETS - 1] += 1
+        self.total += nanoseconds       # the number of values is only added up when read
+
+    def record_many(self, nanoseconds, count):
+        """
+        Counts the same value a number of times, e.g. the share of each move in a batch evaluated in one pass.
+        :param nanoseconds: Represents the value
+        :param count: Represents the number of times it is counted
+        :return: NONE
+        """
+
+        self.counts[min(bucket_index(nanoseconds if nanoseconds > 0 else 0), BUCKETS - 1)] += count
+        self.total += nanoseconds * count
+
+    def percentile(self, fraction):
+        """
+        Estimates a percentile from the buckets.
+        :param fraction: Represents the percentile as a fraction, e.g. 0.99
+        :return: Midpoint of the bucket holding the percentile, in seconds, or None if nothing has been recorded
+        """
+
+        recorded = sum(self.counts)
+        if not recorded:
+            return None
+        rank = fraction * recorded
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                low, high = bucket_bounds(index)
+                return (low + high) / 2 / 1e9
+        return None
+
+    def expose(self, lines):
+        """
+        Appends the histogram in the Prometheus exposition format, with a bucket for every power of two in EXPOSED.
+        :param lines: Represents the list of lines to append to
+        :return: NONE
+        """
+
+        name = self.name + "_seconds"
+        lines.append("# HELP " + name + " " + self.help)
+        lines.append("# TYPE " + name + " histogram")
+        counts = self.counts
+        seen = 0
+        index = 0
+        for power in EXPOSED:
+            bound = bucket_index(1 << power)        # first bucket past the bound
+            seen += sum(counts[index:bound])
+            index = bound
+            lines.append(name + '_bucket{le="' + repr((1 << power) / 1e9) + '"} ' + str(seen))
+        seen += sum(counts[index:])
+        lines.append(name + '_bucket{le="+Inf"} ' + str(seen))
+        lines.append(name + "_sum " + repr(self.total / 1e9))
+        lines.append(name + "_count " + str(seen))
+
+
+class Registry:
+    """
+    Creates a Registry Object. Holds every metric of a process in the order they are exposed.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty registry.
+        """
+
+        self.metrics = []           # (kind, name, help, read function) for counters and gauges, Histograms as is
+
+    def counter(self, name, help, read):
+        """
+        Adds a counter, a value that only ever grows.
+        :param name: Represents the metric's name, ending in "_total"
+        :param help: Represents the metric's description
+        :param read: Represents the function returning the current value
+        :return: NONE
+        """
+
+        self.metrics.append(("counter", name, help, read))
+
+    def gauge(self, name, help, read):
+        """
+        Adds a gauge, a value that goes up and down.
+        :param name: Represents the metric's name
+        :param help: Represents the metric's description
+        :param read: Represents the function returning the current value
+        :return: NONE
+        """
+
+        self.metrics.append(("gauge", name, help, read))
+
+    def histogram(self, name, help):
+        """
+        Adds a latency histogram.
+        :param name: Represents the metric's name, without the unit
+        :param help: Represents the metric's description
+        :return: The Histogram
+        """
+
+        histogram = Histogram(name, help)
+        self.metrics.append(histogram)
+        return histogram
+
+    def render(self):
+        """
+        Reads every metric.
+        :return: Text in the Prometheus exposition format
+        """
+
+        lines = []
+        for metric in self.metrics:
+            if isinstance(metric, Histogram):
+                metric.expose(lines)
+                continue
+            kind, name, help, read = metric
+            lines.append("# HELP " + name + " " + help)
+            lines.append("# TYPE " + name + " " + kind)
+            lines.append(name + " " + str(read()))
+        return "\n".join(lines) + "\n"
+
+
+async def serve(registry, host="127.0.0.1", port=9221):
+    """
+    Starts answering HTTP requests for /metrics with the registry's metrics.
+    :param registry: Represents the Registry
+    :param host: Represents the host address to listen on, local only by default
+    :param port: Represents the port number to listen on
+    :return: The asyncio Server
+    """
+
+    import asyncio
+
+    async def respond(reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            path = request.split(b" ", 2)[1:2]
+            if path == [b"/metrics"]:
+                status, body = "200 OK", registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(("HTTP/1.1 " + status + "\r\nContent-Type: text/plain; version=0.0.4\r\nContent-Length: "
+                          + str(len(body)) + "\r\nConnection: close\r\n\r\n").encode() + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(respond, host, port)
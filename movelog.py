@@ -0,0 +1,413 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://www.postgresql.org/docs/current/wal-intro.html
+(2) https://docs.python.org/3/library/os.html#os.fsync
+(3) https://docs.python.org/3/library/asyncio-eventloop.html#executing-code-in-thread-or-process-pools
+
+Append-only move log with crash recovery. Every accepted move is appended to a write-ahead log as a fixed size 8 byte
+record. Records are buffered in memory and written with a single fsync for everything appended during the commit
+interval (group commit), so the log never costs an fsync per move. Writes run on a single background thread so the
+event loop is never blocked on the disk.
+
+Every snapshot interval the state of every live game is written to a snapshot file and the log moves on to a new
+segment; segments the snapshot covers are deleted. A restarted server loads the snapshot and replays the log segments
+written after it.
+
+Session ids are reserved in the log RESERVE_BLOCK at a time, so a restarted server never hands out an id that was
+handed out before the restart, even one whose session was never logged (e.g. a match between two clients). The next
+block is reserved once half of the current one has been handed out, long before its first id is needed, and a session
+token handed out before a restart can only ever name the game it was handed out for.
+
+Layout of the log directory:
+    secret              key used to sign session tokens, so tokens handed out before a restart stay valid
+    snapshot.bin        latest snapshot
+    wal.<segment>       log segments, replayed in order
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import secrets
+import struct
+
+# log record types
+NEW_GAME = 1        # small = k, value = height << 8 | width
+MOVE = 2            # small = player (0 "X", 1 "O"), value = bit index
+CLOSE = 3           # session has ended, it is not recovered
+RESERVE = 4         # session id = last id of a block of reserved session ids
+
+RESERVE_BLOCK = 1024    # session ids reserved at a time
+
+RECORD = struct.Struct("<BBHI")     # type, small, value, session id
+
+SNAPSHOT_MAGIC = b"TTTS"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHIII")      # magic, version, first segment to replay, next session id, games
+SNAPSHOT_GAME = struct.Struct("<IBBBHH")        # session id, height, width, k, round count, bytes per bitboard
+
+PLAYERS = ("X", "O")
+
+
+class GameRecord:
+    """
+    Creates a GameRecord Object. Holds the recovered state of one game: its board size, both players' bitboards and
+    the round count kept by TicTacToe.
+    """
+
+    __slots__ = ("size", "x", "o", "round_count")
+
+    def __init__(self, size, x=0, o=0, round_count=0):
+        """
+        Initializes the game state.
+        :param size: Represents the board size as a tuple of (height, width, k)
+        :param x: Represents the positions held by "X"
+        :param o: Represents the positions held by "O"
+        :param round_count: Represents TicTacToe.round_count
+        """
+
+        self.size = size
+        self.x = x
+        self.o = o
+        self.round_count = round_count
+
+
+class MoveLog:
+    """
+    Creates a MoveLog Object. This class is responsible for appending game events to the log, committing them in
+    groups, writing snapshots and recovering every game from the snapshot and log after a restart.
+    """
+
+    def __init__(self, directory, commit_interval=0.005, max_batch=64 * 1024, snapshot_interval=60.0):
+        """
+        Initializes the log settings. Nothing is read or written until open() is called.
+        :param directory: Represents the directory holding the snapshot and log segments
+        :param commit_interval: Represents the longest time in seconds a record waits before it is written and synced
+        :param max_batch: Represents the number of buffered bytes that triggers a commit right away
+        :param snapshot_interval: Represents the number of seconds between snapshots
+        """
+
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.snapshot_interval = snapshot_interval
+        self.buffer = bytearray()
+        self.segment = 0
+        self.file = None
+        self.loop = None
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)      # keeps writes in order
+        self.commit_handle = None
+        self.snapshot_handle = None
+        self.in_flight = None       # future of the write currently running
+        self.snapshot_source = None
+        self.records = 0
+        self.commits = 0
+        self.reserved = 0           # first session id not reserved in the log
+
+    def _path(self, name):
+        """
+        Builds the path of a file in the log directory.
+        :param name: Represents the file name
+        :return: Path as a string
+        """
+
+        return os.path.join(self.directory, name)
+
+    def _segments(self):
+        """
+        Lists the segment numbers present in the log directory.
+        :return: Sorted list of ints
+        """
+
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith("wal.") and name[4:].isdigit():
+                segments.append(int(name[4:]))
+        return sorted(segments)
+
+    def open(self):
+        """
+        Recovers every game from the latest snapshot and the log segments written after it, then opens a new segment
+        for appending and reserves the first block of session ids in it.
+        :return: Tuple of (dictionary mapping session id to GameRecord, next free session id)
+        """
+
+        os.makedirs(self.directory, exist_ok=True)
+        games, first_segment, next_session_id = self.load_snapshot()
+        for segment in self._segments():
+            if segment >= first_segment:
+                next_session_id = max(next_session_id, self.replay(segment, games))
+
+        # never append to a segment that may end in a torn record
+        self.segment = max(self._segments() + [first_segment - 1]) + 1
+        self.file = open(self._path("wal." + str(self.segment)), "ab")
+
+        # written before any id is handed out, the event loop is not running yet
+        self.reserved = next_session_id + RESERVE_BLOCK
+        self._write(RECORD.pack(RESERVE, 0, 0, self.reserved - 1))
+        return games, next_session_id
+
+    def load_secret(self):
+        """
+        Reads the key used to sign session tokens, creating it the first time the log directory is used.
+        :return: Key as bytes
+        """
+
+        path = self._path("secret")
+        try:
+            with open(path, "rb") as secret_file:
+                return secret_file.read()
+        except FileNotFoundError:
+            pass
+        secret = secrets.token_bytes(32)
+        with open(path, "wb") as secret_file:
+            secret_file.write(secret)
+            secret_file.flush()
+            os.fsync(secret_file.fileno())
+        return secret
+
+    def load_snapshot(self):
+        """
+        Reads the snapshot file, if there is one.
+        :return: Tuple of (dictionary mapping session id to GameRecord, first segment to replay, next session id)
+        """
+
+        try:
+            with open(self._path("snapshot.bin"), "rb") as snapshot:
+                data = snapshot.read()
+        except FileNotFoundError:
+            return {}, 0, 0
+
+        magic, version, first_segment, next_session_id, count = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("unsupported snapshot in " + self.directory)
+        games = {}
+        offset = SNAPSHOT_HEADER.size
+        for i in range(count):
+            session_id, height, width, k, round_count, length = SNAPSHOT_GAME.unpack_from(data, offset)
+            offset += SNAPSHOT_GAME.size
+            x = int.from_bytes(data[offset:offset + length], "little")
+            o = int.from_bytes(data[offset + length:offset + 2 * length], "little")
+            offset += 2 * length
+            games[session_id] = GameRecord((height, width, k), x, o, round_count)
+        return games, first_segment, next_session_id
+
+    def replay(self, segment, games):
+        """
+        Applies every complete record of a log segment to the recovered games. A partial record at the end of the
+        segment, left by a crash in the middle of a write, is ignored.
+        :param segment: Represents the segment number
+        :param games: Represents the dictionary of recovered games, updated in place
+        :return: The session id after the highest one seen in the segment
+        """
+
+        with open(self._path("wal." + str(segment)), "rb") as log_file:
+            data = log_file.read()
+        next_session_id = 0
+        complete = len(data) - len(data) % RECORD.size
+        for record_type, small, value, session_id in RECORD.iter_unpack(data[:complete]):
+            next_session_id = max(next_session_id, session_id + 1)
+            if record_type == NEW_GAME:
+                games[session_id] = GameRecord((value >> 8, value & 0xFF, small))
+            elif record_type == MOVE:
+                game = games.get(session_id)
+                if game is None:
+                    continue
+                if small == 0:
+                    game.x |= 1 << value
+                    game.round_count += 2
+                else:
+                    game.o |= 1 << value
+            elif record_type == CLOSE:
+                games.pop(session_id, None)
+        return next_session_id
+
+    def append(self, record_type, session_id, small=0, value=0):
+        """
+        Buffers a record and makes sure a commit is scheduled.
+        :param record_type: Represents the record type, NEW_GAME, MOVE, CLOSE or RESERVE
+        :param session_id: Represents the session the record belongs to
+        :param small: Represents the record's 1 byte field
+        :param value: Represents the record's 2 byte field
+        :return: NONE
+        """
+
+        self.buffer += RECORD.pack(record_type, small, value, session_id)
+        self.records += 1
+        if len(self.buffer) >= self.max_batch:
+            self.commit()
+        elif self.commit_handle is None and self.loop is not None:
+            self.commit_handle = self.loop.call_later(self.commit_interval, self.commit)
+
+    def new_game(self, session_id, size):
+        """
+        Records the start of a game, or of a rematch in the same session.
+        :param session_id: Represents the session id
+        :param size: Represents the board size as a tuple of (height, width, k)
+        :return: NONE
+        """
+
+        height, width, k = size
+        self.append(NEW_GAME, session_id, k, height << 8 | width)
+
+    def move(self, session_id, player, index):
+        """
+        Records an accepted move.
+        :param session_id: Represents the session id
+        :param player: Represents the player character, "X" or "O"
+        :param index: Represents the bit index of the move
+        :return: NONE
+        """
+
+        self.append(MOVE, session_id, PLAYERS.index(player), index)
+
+    def close_game(self, session_id):
+        """
+        Records that a session has ended and should not be recovered.
+        :param session_id: Represents the session id
+        :return: NONE
+        """
+
+        self.append(CLOSE, session_id)
+
+    def issue(self, session_id):
+        """
+        Records that a session id has been handed out, reserving the next block of ids once half of the current block
+        has been handed out.
+        :param session_id: Represents the session id
+        :return: NONE
+        """
+
+        if session_id + RESERVE_BLOCK // 2 >= self.reserved:
+            self.reserved += RESERVE_BLOCK
+            self.append(RESERVE, self.reserved - 1)
+
+    def start(self, snapshot_source):
+        """
+        Starts group commits and periodic snapshots on the running event loop.
+        :param snapshot_source: Represents a callable returning (next session id, iterable of (session id, GameRecord))
+        :return: NONE
+        """
+
+        self.loop = asyncio.get_running_loop()
+        self.snapshot_source = snapshot_source
+        self.snapshot_handle = self.loop.call_later(self.snapshot_interval, self.snapshot)
+
+    def commit(self):
+        """
+        Hands every buffered record to the writer thread, to be written and synced in one go. Only one commit runs at
+        a time; records appended meanwhile are committed together once it finishes.
+        :return: NONE
+        """
+
+        if self.commit_handle is not None:
+            self.commit_handle.cancel()
+            self.commit_handle = None
+        if not self.buffer or self.in_flight is not None:
+            return
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        self.in_flight = self.loop.run_in_executor(self.executor, self._write, data)
+        self.in_flight.add_done_callback(self._committed)
+
+    def _write(self, data):
+        """
+        Writes and syncs a batch of records, runs on the writer thread.
+        :param data: Represents the encoded records
+        :return: NONE
+        """
+
+        self.file.write(data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _committed(self, future):
+        """
+        Called on the event loop once a commit has finished. Starts the next commit if records are waiting.
+        :param future: Represents the finished write
+        :return: NONE
+        """
+
+        self.in_flight = None
+        self.commits += 1
+        future.result()
+        if self.buffer and self.commit_handle is None:
+            self.commit_handle = self.loop.call_later(self.commit_interval, self.commit)
+
+    def snapshot(self):
+        """
+        Captures the state of every live game, moves the log on to a new segment and writes the snapshot on the writer
+        thread. Runs every snapshot interval.
+        :return: NONE
+        """
+
+        next_session_id, games = self.snapshot_source()
+        next_session_id = max(next_session_id, self.reserved)      # the segments holding the reservations are deleted
+        data = bytearray(SNAPSHOT_HEADER.size)
+        count = 0
+        for session_id, game in games:
+            height, width, k = game.size
+            length = (height * width + 7) // 8
+            data += SNAPSHOT_GAME.pack(session_id, height, width, k, game.round_count, length)
+            data += game.x.to_bytes(length, "little") + game.o.to_bytes(length, "little")
+            count += 1
+
+        # everything buffered so far belongs to the segment the snapshot covers
+        if self.buffer:
+            self.executor.submit(self._write, bytes(self.buffer))
+            self.buffer.clear()
+        self.segment += 1
+        SNAPSHOT_HEADER.pack_into(data, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.segment, next_session_id, count)
+        self.executor.submit(self._rotate, bytes(data), self.segment)
+        self.snapshot_handle = self.loop.call_later(self.snapshot_interval, self.snapshot)
+
+    def _rotate(self, data, segment):
+        """
+        Opens the new log segment, writes the snapshot atomically and deletes the segments it covers. Runs on the
+        writer thread, after every write already queued for the old segment.
+        :param data: Represents the encoded snapshot
+        :param segment: Represents the first segment not covered by the snapshot
+        :return: NONE
+        """
+
+        self.file.close()
+        self.file = open(self._path("wal." + str(segment)), "ab")
+
+        temporary = self._path("snapshot.tmp")
+        with open(temporary, "wb") as snapshot:
+            snapshot.write(data)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary, self._path("snapshot.bin"))
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+        for old in self._segments():
+            if old < segment:
+                os.remove(self._path("wal." + str(old)))
+
+    async def close(self):
+        """
+        Commits every buffered record and closes the log.
+        :return: NONE
+        """
+
+        if self.snapshot_handle is not None:
+            self.snapshot_handle.cancel()
+        if self.commit_handle is not None:
+            self.commit_handle.cancel()
+            self.commit_handle = None
+        if self.in_flight is not None:
+            await self.in_flight
+        if self.buffer:
+            data = bytes(self.buffer)
+            self.buffer.clear()
+            await self.loop.run_in_executor(self.executor, self._write, data)
+        await self.loop.run_in_executor(self.executor, self.file.close)
+        self.executor.shutdown()
@@ -0,0 +1,220 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://docs.python.org/3/library/asyncio-protocol.html#flow-control-callbacks
+(2) https://man7.org/linux/man-pages/man7/tcp.7.html
+
+Bounded outbound queue of one connection. Frames are only written to the transport while it takes them in full, the
+rest wait in the queue, so the transport never holds more than the frame it is sending. The queue is measured in bytes
+against two watermarks: a peer whose queue grows past the high watermark is over the limit until it falls back under
+the low watermark, and while over the limit the connection's policy applies:
+
+    throttle      stop reading from the peer, so it cannot ask for more until it has read what it was sent
+    drop          discard every new frame, the peer has to reconnect and resume to get back in sync
+    disconnect    close the connection at once
+
+Whatever the policy, a queue that reaches twice the high watermark or a peer that has not taken a write for the stall
+timeout is disconnected, so the memory held for a peer that never reads stays bounded. Frames sent with a key
+supersede the frame still queued with the same key, e.g. a spectator only needs the newest board. Chat is never
+written as it arrives: it is held in a queue of its own, capped in bytes, and written in one go once the game frames
+written meanwhile have gone out, so a chat flood never sits in the transport or the kernel ahead of a move.
+"""
+
+import collections
+
+POLICIES = ("throttle", "drop", "disconnect")
+
+
+class Outbox:
+    """
+    Creates an Outbox Object. This class is responsible for queueing the frames written to one connection while the
+    peer is not reading, coalescing superseded frames and applying the connection's policy once the peer falls too
+    far behind.
+    """
+
+    __slots__ = ("transport", "stats", "high", "low", "policy", "stall", "frames", "keyed", "chat", "chat_limit",
+                 "chat_queued", "queued", "writable", "paused_at", "over")
+
+    def __init__(self, transport, stats, high=65536, low=16384, policy="throttle", stall=10.0, chat=4096):
+        """
+        Initializes an empty queue.
+        :param transport: Represents the transport of the connection, its protocol calls pause() and resume()
+        :param stats: Represents the object whose bytes_sent, frames_coalesced, frames_dropped and slow_disconnects
+        counters are updated, e.g. the GameServer
+        :param high: Represents the number of queued bytes past which the peer is over the limit
+        :param low: Represents the number of queued bytes under which the peer is no longer over the limit
+        :param policy: Represents the policy applied while the peer is over the limit, one of POLICIES
+        :param stall: Represents the number of seconds the peer may go without taking a write before it is
+        disconnected
+        :param chat: Represents the number of bytes of chat held back, the oldest is dropped beyond that
+        """
+
+        self.transport = transport
+        self.stats = stats
+        self.high = high
+        self.low = low
+        self.policy = policy
+        self.stall = stall
+        self.frames = None          # deque of [frame, key, size] entries, the frame is None once superseded
+        self.keyed = None           # key -> entry of the queued frame with that key
+        self.chat = None            # deque of chat frames held back
+        self.chat_limit = chat
+        self.chat_queued = 0        # bytes of chat in the chat queue
+        self.queued = 0             # bytes of game frames in the queue
+        self.writable = True        # False while the transport holds unsent data
+        self.paused_at = 0.0        # when the transport last stopped taking writes
+        self.over = False           # True from passing the high watermark until falling under the low watermark
+
+    def send(self, frame, key=None):
+        """
+        Writes a frame, or queues it behind the frames the peer has not taken yet.
+        :param frame: Represents the encoded frame
+        :param key: Represents the key of a frame that supersedes any queued frame with the same key, or None
+        :return: NONE
+        """
+
+        if self.writable and not self.frames:
+            self.stats.bytes_sent += len(frame)
+            self.transport.write(frame)
+            return
+        if self.transport.is_closing():
+            return
+        if self.over and self.policy == "drop":
+            self.stats.frames_dropped += 1
+            return
+        if self.frames is None:     # most connections never queue, the queue is only created when needed
+            self.frames = collections.deque()
+            self.keyed = {}
+        entry = self.keyed.get(key) if key is not None else None
+        if entry is not None:
+            self.stats.frames_coalesced += 1
+            if entry is self.frames[-1]:        # nothing queued since, the new frame takes its place
+                self.queued += len(frame) - entry[2]
+                entry[0] = frame
+                entry[2] = len(frame)
+                self.check()
+                return
+            entry[0] = None         # keeps its place and its size until it reaches the front, then it is skipped
+        entry = [frame, key, len(frame)]
+        self.frames.append(entry)
+        self.queued += entry[2]
+        if key is not None:
+            self.keyed[key] = entry
+        self.check()
+
+    def check(self):
+        """
+        Applies the policy if the queue has grown past the high watermark.
+        :return: NONE
+        """
+
+        if self.queued > self.high:
+            self.limit()
+
+    def send_chat(self, frame):
+        """
+        Queues a chat frame, written by flush_chat() or resume(). Game frames written before either runs overtake it.
+        :param frame: Represents the encoded CHAT frame
+        :return: True if the chat queue was empty, flush_chat() has to be scheduled, else False
+        """
+
+        if self.transport.is_closing():
+            return False
+        if self.chat is None:
+            self.chat = collections.deque()
+        empty = not self.chat
+        self.chat.append(frame)
+        self.chat_queued += len(frame)
+        while self.chat_queued > self.chat_limit and len(self.chat) > 1:
+            self.chat_queued -= len(self.chat.popleft())
+            self.stats.frames_dropped += 1
+        return empty
+
+    def flush_chat(self):
+        """
+        Writes the queued chat in one write, unless game frames are waiting to be sent. resume() writes the chat once
+        they have gone out.
+        :return: NONE
+        """
+
+        if self.chat and self.writable and not self.frames:
+            data = b"".join(self.chat)
+            self.chat.clear()
+            self.chat_queued = 0
+            self.stats.bytes_sent += len(data)
+            self.transport.write(data)
+
+    def limit(self):
+        """
+        Applies the policy to a peer that is over the limit.
+        :return: NONE
+        """
+
+        if self.queued >= 2 * self.high or self.policy == "disconnect":
+            self.disconnect()
+            return
+        if not self.over:
+            self.over = True
+            if self.policy == "throttle":
+                self.transport.pause_reading()
+
+    def disconnect(self):
+        """
+        Drops a peer that does not read, without waiting for the queue to drain.
+        :return: NONE
+        """
+
+        if not self.transport.is_closing():
+            self.stats.slow_disconnects += 1
+        self.frames = self.keyed = self.chat = None
+        self.queued = self.chat_queued = 0
+        self.transport.abort()
+
+    def stalled(self, now):
+        """
+        Disconnects the peer if it has not taken a write for the stall timeout.
+        :param now: Represents the current time, on the clock passed to pause()
+        :return: True if the peer was disconnected, else False
+        """
+
+        if self.writable or now - self.paused_at < self.stall:
+            return False
+        self.disconnect()
+        return True
+
+    def pause(self, now):
+        """
+        Called once the transport holds unsent data, frames are queued until resume().
+        :param now: Represents the current time
+        :return: NONE
+        """
+
+        self.writable = False
+        self.paused_at = now
+
+    def resume(self):
+        """
+        Called once the transport has sent everything. Writes queued frames until the transport pauses again, then
+        the chat, and lifts the policy once the queue is under the low watermark.
+        :return: NONE
+        """
+
+        self.writable = True
+        frames = self.frames
+        while frames and self.writable:
+            frame, key, size = frames.popleft()
+            self.queued -= size
+            if frame is None:
+                continue
+            if key is not None:
+                del self.keyed[key]
+            self.stats.bytes_sent += size
+            self.transport.write(frame)
+        self.flush_chat()
+        if self.over and self.queued <= self.low:
+            self.over = False
+            if self.policy == "throttle" and not self.transport.is_closing():
+                self.transport.resume_reading()
@@ -0,0 +1,319 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://docs.python.org/3/library/struct.html
+(2) https://docs.python.org/3/library/socket.html#socket.socket.recv_into
+(3) https://docs.python.org/3/library/asyncio-protocol.html#buffered-streaming-protocols
+
+Wire protocol shared by the client and the servers. Every message is sent as a frame made up of a 3 byte header
+(1 byte opcode, 2 byte big-endian payload length) followed by the payload. Frames let the receiver split a TCP byte
+stream back into the messages that were sent, no matter how the segments were merged or split on the way.
+
+Most payloads are text. The moves of a game can also be sent as binary PLACE frames, on boards of up to BINARY_CELLS
+positions. A PLACE frame has no header and is 2 bytes long: the first byte is the move's sequence number (mod 128)
+with the COMPACT bit set, which no opcode has, and the second is the position's bit index. The sequence number is the
+number of characters on the board once the move is placed, so a move that does not follow the receiver's own board,
+e.g. a duplicate, is noticed without reading the board. Dropping the sequence number would make a move 1 byte long,
+but a move could then only be checked against the receiver's board, and a receiver that has fallen behind by a whole
+move would place it anyway. A receiver that falls out of step sends an empty SYNC and the server, which holds the
+authoritative board, answers with a SYNC holding its board: the sequence number (mod 256) and every position packed as
+a base-3 digit, 2 bytes for the 3x3 board (see bitboard.pack()).
+"""
+
+import struct
+
+HEADER = struct.Struct("!BH")       # opcode, payload length
+MAX_PAYLOAD = 0xFFFF
+
+# opcodes
+INVITE = 1          # client invites the server to play ("?")
+ACCEPT = 2          # invitation or rematch accepted ("y")
+DECLINE = 3         # invitation or rematch declined ("n")
+MOVE = 4            # payload holds the coordinates of a move (e.g.: "0,2")
+QUIT = 5            # sender has closed its socket ("/q")
+REMATCH = 6         # client asks the server for another game
+HINT = 7            # client asks for a hint, the server answers with the coordinates of a best move
+RESUME = 8          # client resumes a game with its session token, the server answers with the board and turn
+JOIN = 9            # client joins the lobby to be paired with another player ("height,width,k;rating")
+PING = 10           # heartbeat, the receiver answers with a PONG
+PONG = 11           # answer to a PING
+CHAT = 12           # free text chat, relayed by the server to the other player as "role;text"
+WATCH = 13          # client watches a game by its id, the server answers with "height,width,k;cells;turn" on every move
+PLACE = 14          # binary move: sequence number and bit index of the position, sent without a header
+SYNC = 15           # binary board: sequence number and the packed board, an empty SYNC asks the server for its board
+
+BINARY = frozenset((PLACE, SYNC))       # opcodes whose payload is not text
+BINARY_CELLS = 255                      # largest board whose moves fit in a PLACE frame
+COMPACT = 0x80                          # set in the first byte of a PLACE frame, every opcode is below it
+PLACE_SIZE = 2                          # bytes in a PLACE frame
+SEQUENCE_MASK = 0x7F                    # sequence numbers of PLACE frames are sent mod 128
+
+OPCODE_NAMES = {
+    INVITE: "INVITE",
+    ACCEPT: "ACCEPT",
+    DECLINE: "DECLINE",
+    MOVE: "MOVE",
+    QUIT: "QUIT",
+    REMATCH: "REMATCH",
+    HINT: "HINT",
+    RESUME: "RESUME",
+    JOIN: "JOIN",
+    PING: "PING",
+    PONG: "PONG",
+    CHAT: "CHAT",
+    WATCH: "WATCH",
+    PLACE: "PLACE",
+    SYNC: "SYNC",
+}
+
+
+class ProtocolError(Exception):
+    """
+    Raised when a peer sends data that can not be decoded into frames.
+    """
+
+
+def encode_frame(opcode, payload=b""):
+    """
+    Builds a frame from an opcode and a payload.
+    :param opcode: Represents the type of message being sent
+    :param payload: Represents the message body as bytes
+    :return: The encoded frame as bytes
+    """
+
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError("payload too large: " + str(len(payload)) + " bytes")
+    return HEADER.pack(opcode, len(payload)) + payload
+
+
+def send_frame(sock, opcode, payload=b""):
+    """
+    Encodes a frame and writes all of it to a blocking socket.
+    :param sock: Represents the connected socket
+    :param opcode: Represents the type of message being sent
+    :param payload: Represents the message body as bytes
+    :return: NONE
+    """
+
+    sock.sendall(encode_frame(opcode, payload))
+
+
+def encode_place(sequence, index, width):
+    """
+    Builds a PLACE frame. A position whose bit index does not fit in a byte is sent as a MOVE frame with its
+    coordinates instead.
+    :param sequence: Represents the number of characters on the board once the move is placed
+    :param index: Represents the bit index of the position
+    :param width: Represents the number of columns of the board
+    :return: The encoded frame as bytes
+    """
+
+    if index > 0xFF:
+        return encode_frame(MOVE, (str(index // width) + "," + str(index % width)).encode())
+    return bytes((COMPACT | sequence & SEQUENCE_MASK, index))
+
+
+def decode_place(payload):
+    """
+    Reads the payload of a PLACE frame, as returned by FrameDecoder.next_frame()
+    :param payload: Represents the payload as bytes
+    :return: Tuple of (sequence number mod 128, bit index)
+    """
+
+    if len(payload) != PLACE_SIZE:
+        raise ProtocolError("PLACE payload must be 2 bytes, got " + str(len(payload)))
+    return payload[0], payload[1]
+
+
+def place_sequence(moves):
+    """
+    Finds the sequence number a PLACE frame carries for a move.
+    :param moves: Represents the number of characters on the board once the move is placed
+    :return: Sequence number as sent in a PLACE frame
+    """
+
+    return moves & SEQUENCE_MASK
+
+
+def encode_sync(sequence, packed):
+    """
+    Builds a SYNC frame holding a board.
+    :param sequence: Represents the number of characters on the board
+    :param packed: Represents the board packed by bitboard.pack()
+    :return: The encoded frame as bytes
+    """
+
+    return encode_frame(SYNC, bytes((sequence & 0xFF,)) + packed)
+
+
+class FrameDecoder:
+    """
+    Creates a FrameDecoder Object. This class is responsible for turning a stream of received bytes back into frames.
+    Bytes are received straight into a reusable bytearray so a single recv_into() call can return several frames
+    without allocating a new buffer for every read. A read that fills the buffer doubles it, up to a limit, so a peer
+    sending a lot of data is read in few large reads instead of many small ones.
+    """
+
+    __slots__ = ("buffer", "view", "start", "end", "limit", "free")
+
+    def __init__(self, size=4096, limit=65536):
+        """
+        Initializes the receive buffer and the read/write positions within it.
+        :param size: Represents the initial size of the receive buffer in bytes
+        :param limit: Represents the size in bytes beyond which the buffer only grows to fit a single frame
+        """
+
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0      # position of the first unread byte
+        self.end = 0        # position one past the last received byte
+        self.limit = limit
+        self.free = HEADER.size     # free bytes offered to the next read
+
+    def _make_room(self, needed):
+        """
+        Makes sure at least "needed" bytes are free at the end of the buffer. Unread bytes are moved to the front of
+        the buffer first and the buffer is only replaced when a single frame does not fit.
+        :param needed: Represents the number of free bytes required
+        :return: NONE
+        """
+
+        if len(self.buffer) - self.end >= needed:
+            return
+        pending = self.end - self.start
+        if pending + needed > len(self.buffer):
+            buffer = bytearray(max(len(self.buffer) * 2, pending + needed))
+            buffer[:pending] = self.view[self.start:self.end]
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+        else:
+            self.buffer[:pending] = self.buffer[self.start:self.end]
+        self.start = 0
+        self.end = pending
+
+    def recv_into(self, sock):
+        """
+        Receives as many bytes as are available from a socket into the free end of the buffer.
+        :param sock: Represents the connected socket
+        :return: Number of bytes received, 0 once the peer has closed its socket
+        """
+
+        self._make_room(self.free)
+        received = sock.recv_into(self.view[self.end:])
+        self.buffer_updated(received)
+        return received
+
+    def get_buffer(self, sizehint):
+        """
+        Returns the free end of the buffer for asyncio.BufferedProtocol.get_buffer()
+        :param sizehint: Represents the suggested minimum size of the returned buffer
+        :return: A writable memoryview of the free end of the buffer
+        """
+
+        self._make_room(max(sizehint, self.free))
+        return self.view[self.end:]
+
+    def buffer_updated(self, nbytes):
+        """
+        Records that nbytes were written into the buffer returned by get_buffer()
+        :param nbytes: Represents the number of bytes written
+        :return: NONE
+        """
+
+        self.end += nbytes
+        if self.end == len(self.buffer) and len(self.buffer) < self.limit:     # the read filled the buffer, double it
+            self.free = len(self.buffer) + 1
+
+    def feed(self, data):
+        """
+        Copies already received bytes into the buffer.
+        :param data: Represents the received bytes
+        :return: NONE
+        """
+
+        self._make_room(len(data))
+        self.buffer[self.end:self.end + len(data)] = data
+        self.end += len(data)
+
+    def next_frame(self):
+        """
+        Removes the next complete frame from the buffer.
+        :return: Tuple of (opcode, payload bytes) if a whole frame has been received, else None
+        """
+
+        available = self.end - self.start
+        if available < PLACE_SIZE:
+            return None
+        first = self.buffer[self.start]
+        if first & COMPACT:        # a PLACE frame, the payload is the sequence number and the bit index
+            payload = bytes((first & SEQUENCE_MASK, self.buffer[self.start + 1]))
+            self.start += PLACE_SIZE
+            if self.start == self.end:
+                self.start = self.end = 0
+            return PLACE, payload
+        if available < HEADER.size:
+            return None
+        opcode, length = HEADER.unpack_from(self.buffer, self.start)
+        if opcode not in OPCODE_NAMES:
+            raise ProtocolError("unknown opcode: " + str(opcode))
+        frame_end = self.start + HEADER.size + length
+        if frame_end > self.end:
+            self._make_room(frame_end - self.end)
+            return None
+        payload = bytes(self.view[self.start + HEADER.size:frame_end])
+        self.start = frame_end
+        if self.start == self.end:      # buffer drained, reuse it from the front
+            self.start = self.end = 0
+        return opcode, payload
+
+    def skip_frames(self, opcode):
+        """
+        Drops the complete frames of one type at the front of the buffer without copying their payloads, e.g. chat
+        from a client over its rate limit.
+        :param opcode: Represents the opcode of the frames to drop
+        :return: Number of frames dropped
+        """
+
+        buffer = self.buffer
+        start = self.start
+        skipped = 0
+        while self.end - start >= HEADER.size and buffer[start] == opcode:
+            frame_end = start + HEADER.size + (buffer[start + 1] << 8 | buffer[start + 2])
+            if frame_end > self.end:
+                break
+            start = frame_end
+            skipped += 1
+        self.start = start
+        if start == self.end:
+            self.start = self.end = 0
+        return skipped
+
+    def frames(self):
+        """
+        Yields every complete frame currently held in the buffer.
+        :return: Generator of (opcode, payload bytes) tuples
+        """
+
+        frame = self.next_frame()
+        while frame is not None:
+            yield frame
+            frame = self.next_frame()
+
+
+def read_frame(sock, decoder):
+    """
+    Blocks until a complete frame has been received from a socket.
+    :param sock: Represents the connected socket
+    :param decoder: Represents the FrameDecoder holding bytes already received from the socket
+    :return: Tuple of (opcode, payload bytes), or None once the peer has closed its socket
+    """
+
+    frame = decoder.next_frame()
+    while frame is None:
+        if not decoder.recv_into(sock):
+            return None
+        frame = decoder.next_frame()
+    return frame
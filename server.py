@@ -10,61 +10,87 @@ Sources:
 
 """
 
-import socket
+import argparse
 
+import bitboard
+import game
+import protocol
+import transport
 
-class TicTacToe:
-    def __init__(self):
+
+class TicTacToe(game.Game):
+    """
+    Creates a TicTacToe Object. This class is responsible for playing the server's side of a game against the client
+    on the other end of a connection. Includes various methods for carrying out game play.
+    """
+
+    __slots__ = ("connection", "binary")
+
+    def __init__(self, connection, engine=None):
         """
-        Creates a TicTacToe Object. This class is responsible for initializing and creating a tic-tac-toe game board
-        and tracking how many rounds have been played throughout the course of the game. Includes various methods for
-        carryingout game play.
+        Initializes the game and creates a variable for tracking the number of rounds played throughout the course of
+        the game.
+        :param connection: Represents the transport.Connection to the client
+        :param engine: Represents an engine.Engine that plays the server's moves, or None to prompt the server
         """
 
-        self.game_board = []
-        self.create_board()
-        self.round_count = 0
+        super().__init__(engine=engine)
+        self.connection = connection
+        self.binary = False     # True once the client sends its moves as PLACE frames, its moves are sent back that way
 
-    def create_board(self):
+    def check_receive(self):
         """
-        Creates an empty 3x3 tic-tac-toe game board and appends each row of the board to self.game_board
-        :return: NONE
+        Checks if the server has received a response from the client. Waits for a complete frame, the frame's payload
+        is decoded and returned along with its opcode, the payload of a binary frame is returned as it is. A closed
+        connection is reported as a QUIT frame.
+        :return: Tuple of (opcode, decoded payload as a string, or bytes for PLACE and SYNC)
         """
 
-        for i in range(3):
-            row = []
-            for j in range(3):
-                row.append("-")
-            self.game_board.append(row)
+        frame = self.connection.receive()
+        if frame is None:
+            return protocol.QUIT, ""
+        opcode, payload = frame
+        return opcode, payload if opcode in protocol.BINARY else payload.decode()
 
-    def print_board(self):
+    def send_message(self, opcode, message=""):
         """
-        Prints the current game board to the command prompt or terminal
+        Receives a server created message. The message is encoded into a frame and all of it is sent to the client
+        :param opcode: Represents the type of message, one of the opcodes from protocol.py
+        :param message: Represents the message created by the server
         :return: NONE
         """
 
-        for i in range(3):
-            print(self.game_board[i], "\n")
+        self.connection.send(opcode, message.encode())
 
-    def check_receive(self):
+    def send_move(self, index):
         """
-        Checks if the server has received a response from the client. Received messages are decoded and returned.
-        :return: Decoded message as a string
+        Sends the server's move, which has been placed on the board, to the client. A client that sends its moves as
+        PLACE frames gets a PLACE frame, else a MOVE frame with the coordinates.
+        :param index: Represents the bit index of the move
+        :return: NONE
         """
 
-        recv_message = conn_socket.recv(2221)
-        decoded_message = recv_message.decode()
-        return decoded_message
+        if self.binary:
+            self.connection.write(protocol.encode_place(self.moves(), index, self.board.width))
+        else:
+            self.send_message(protocol.MOVE, self.board.coordinates(index))
 
-    def send_message(self, message):
+    def received_index(self, opcode, message):
         """
-        Receives a server created message. The message is encoded and sent to the client
-        :param message: Represents the message created by the server
-        :return: NONE
+        Reads the position of a move received from the client. A PLACE frame switches the server's moves to PLACE
+        frames too, unless the board has more than protocol.BINARY_CELLS positions.
+        :param opcode: Represents the type of message, MOVE or PLACE
+        :param message: Represents the coordinates of a MOVE or the payload of a PLACE
+        :return: Bit index of the position, or None if the move is malformed, out of sequence or a PLACE on a board
+        too large for PLACE frames
         """
 
-        encoded_message = message.encode()
-        conn_socket.send(encoded_message)
+        if opcode == protocol.MOVE:
+            return self.board.cell_index(message)
+        if self.board.height * self.board.width > protocol.BINARY_CELLS:
+            return None
+        self.binary = True
+        return self.placed_index(message)
 
     def get_coordinates(self):
         """
@@ -74,132 +100,80 @@ class TicTacToe:
         :return: User input returned in the form of a string, else return False
         """
 
+        # engine mode, the engine picks the move instead of the server
+        if self.engine is not None:
+            coordinates = self.board.coordinates(self.engine.choose_move(self.board, "O"))
+            print(coordinates)
+            return coordinates
+
         coordinates = input()
         if coordinates == "/q":
-            self.send_message(coordinates)
+            self.send_message(protocol.QUIT)
             return False
         return coordinates
 
-    def check_valid_move(self, coordinates, player):
+    def get_answer(self):
         """
-        Tests the received coordinates for validity. Attempts to split coordinates, x and y coordinates
-        are checked if they fall in range of the game board, and game board is checked to see if the coordinates
-        correspond to an open position. If True, game board is updated with player's character. Else method returns
-        False.
-        :param coordinates: Represents the desired coordinates on the game board by the player.
-        :param player:  Represents the character to be placed
-        :return: If coordinates are valid, returns True. Else, Returns False
+        Prompts the server for an answer to a game invitation or rematch request. In engine mode the invitation is
+        always accepted.
+        :return: User input returned in the form of a string
         """
 
-        # attempts to split user input at "," if error thrown, returns False
-        try:
-            coord_split = coordinates.split(",")
-            int(coord_split[0])
-            int(coord_split[1])
-        except ValueError:
-            return False
-        except IndexError:
-            return False
-        else:
-            # splits "coordinates" variable into two variables
-            coord_split = coordinates.split(",")
-            x_coord = int(coord_split[0])
-            y_coord = int(coord_split[1])
-            if x_coord <= 2 and y_coord <= 2:
-                if self.game_board[x_coord][y_coord] == "-":        # checks if x,y coordinates are in range
-                    self.game_board[x_coord][y_coord] = player      # checks if game board spot is occupied
-                    return True
-
-        return False
-
+        if self.engine is not None:
+            print("y")
+            return "y"
+        return input()
 
-    def place_char(self, coordinates, player):
+    def send_hint(self):
         """
-        Splits user input into x,y coordinates and places the player's character at the desired coordinates on the
-        game board.
-        :param coordinates: Represents the input coordinates from a player
-        :param player:  Represents a player character
+        Answers a client's hint request with the coordinates of a best move for "X". Hints are only available in
+        engine mode, otherwise an empty hint is sent.
         :return: NONE
         """
 
-        coord_split = coordinates.split(",")
-        x_coord = int(coord_split[0])
-        y_coord = int(coord_split[1])
-        self.game_board[x_coord][y_coord] = player
-
-    def win_check(self, board, player):
-        """
-        Checks if a user has won the game by placing three of their characters in a row on the game board.
-        Checks are made for each row, column and diagonal of the current game board.
-        If the variable "char_count" is equal to 3, the player has won the game.
-        :param board: Represents the current game board
-        :param player: Represents the player's character
-        :return: If variable "char_count" is equal to 3, returns True. Else, returns False
-        """
-
-        char_count = 0      # variable to track player character counts from the current game board
-        # checks each row
-        for i in range(3):
-            for j in range(3):
-                if board[i][j] == player:
-                    char_count += 1
-            if char_count == 3:
-                return True
-            char_count = 0
-
-        # checks each column
-        for i in range(3):
-            for j in range(3):
-                if board[j][i] == player:
-                    char_count += 1
-            if char_count == 3:
-                return True
-            char_count = 0
-
-        # checks diagonal top-left to bottom-right
-        for i in range(3):
-            if board[i][i] == player:
-                char_count += 1
-        if char_count == 3:
-            return True
-        char_count = 0
-
-        # check diagonal right to left
-        for i in range(2, -1):
-            if board[i][i] == player:
-                char_count += 1
-        if char_count == 3:
-            return True
-
-        return False
+        if self.engine is None:
+            self.send_message(protocol.HINT)
+            return
+        moves = self.engine.best_moves(self.board, "X")
+        self.send_message(protocol.HINT, self.board.coordinates(moves[0]) if moves else "")
 
     def initiate_game(self):
         """
         Receives a request from the client. Initial request either invites the server to play tic-tac-toe, or
         prompts server to close its current socket. Server responds by either accepting or denying game invitation.
-        :return: If client message is "?" and server response is "y", returns True.
-                 If client message is "/q" or server response is "/q" or "n", returns False
+        :return: If client message is INVITE and server response is "y", returns True.
+                 If client message is QUIT or server response is "/q" or "n", returns False
         """
 
-        decoded_message = self.check_receive()
-        # client sent game invitation
-        if decoded_message == "?":
-            print(decoded_message)
+        opcode, decoded_message = self.check_receive()
+        # client sent game invitation, along with the board size it would like to play on
+        if opcode == protocol.INVITE:
+            size = bitboard.parse_size(decoded_message)
+            if size is None:
+                self.send_message(protocol.DECLINE)
+                return False
+            print("?")
+            print("Board: " + str(size[0]) + "x" + str(size[1]) + ", " + str(size[2]) + " in a row wins")
             print("Type '/q' to rage quit at any time")
 
             # loops until server gives valid response
             while True:
                 print("Type 'y' to play or 'n' to decline")
-                snd_message = input()
+                snd_message = self.get_answer()
 
                 # server accepts game invitation
                 if snd_message == "y":
-                    self.send_message(snd_message)
+                    self.size = size
+                    self.create_board()
+                    self.send_message(protocol.ACCEPT, decoded_message)
                     return True
 
                 # server denies game invitation
-                elif snd_message == "n" or snd_message == "/q":
-                    self.send_message(snd_message)
+                elif snd_message == "n":
+                    self.send_message(protocol.DECLINE)
+                    break
+                elif snd_message == "/q":
+                    self.send_message(protocol.QUIT)
                     break
 
         return False
@@ -217,22 +191,40 @@ class TicTacToe:
 
         # loop runs until client or server close their socket
         while True:
-            recv_message = self.check_receive()
-            # checks message received by the client
-            if recv_message:
-
-                # client has closed its socket
-                if recv_message == "/q":
+            opcode, recv_message = self.check_receive()
+
+            # client has closed its socket
+            if opcode == protocol.QUIT:
+                return False
+
+            # client asked for a hint
+            if opcode == protocol.HINT:
+                self.send_hint()
+                continue
+
+            # client's board is out of step, the server's board is sent back
+            if opcode == protocol.SYNC:
+                self.connection.write(self.sync_frame())
+                continue
+
+            # checks move received by the client against the server's board, a client sending PLACE frames is sent
+            # the board to continue from when its move can not be played, the game ends for any other client
+            if opcode == protocol.MOVE or opcode == protocol.PLACE:
+                if not self.check_valid_index(self.received_index(opcode, recv_message), "X"):
+                    if self.binary:
+                        self.connection.write(self.sync_frame())
+                        continue
+                    print("Client sent an invalid move")
+                    self.send_message(protocol.QUIT)
                     return False
-                self.place_char(recv_message, "X")
 
                 # check if client has won the game
-                if self.win_check(self.game_board, "X"):
+                if self.win_check(self.board, "X"):
                     winner = "Client"
                     return self.declare_winner(winner)
 
                 self.round_count += 2
-                if self.round_count > 9:        # checks if we have reached a tie game
+                if self.board.is_full():        # checks if we have reached a tie game
                     return self.declare_winner("TIE")
                 self.print_board()
                 print("Your turn")
@@ -246,14 +238,16 @@ class TicTacToe:
                         return False
 
                     # checks if server input is valid and if server has won the game
-                    if self.check_valid_move(coordinates, "O"):
-                        if self.win_check(self.game_board, "O"):
+                    index = self.board.cell_index(coordinates)
+                    if self.check_valid_index(index, "O"):
+                        self.send_move(index)
+                        if self.win_check(self.board, "O"):
                             winner = "Server"
-                            self.send_message(coordinates)
                             return self.declare_winner(winner)
+                        if self.board.is_full():        # boards with an even number of positions fill on this move
+                            return self.declare_winner("TIE")
 
                         # server input was valid, game still in progress
-                        self.send_message(coordinates)
                         break
 
                     # server input is not valid
@@ -274,14 +268,16 @@ class TicTacToe:
         else:
             print(winner + " has won the game")
 
-        if winner == "Server":
-            recv_message = self.check_receive()
-            print(recv_message)
+        # waits for the client's rematch request
+        opcode, recv_message = self.check_receive()
+        if opcode != protocol.REMATCH:
+            return False
+        print(recv_message)
 
         # loops until server enters a valid response
         while True:
             print("Type 'y' to play again or 'n' to quit")
-            snd_message = input()
+            snd_message = self.get_answer()
             if snd_message == "y":
                 play_again = True
                 break
@@ -290,38 +286,58 @@ class TicTacToe:
                 break
 
         # send message to client and reset the game board and counters
-        self.send_message(snd_message)
-        self.game_board = []
+        if play_again:
+            self.send_message(protocol.ACCEPT)
+        else:
+            self.send_message(protocol.DECLINE)
         self.create_board()
         self.round_count = 0
         return play_again
 
 
-with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as receiver_socket:
+def main():
     """
-    Creates a server side socket and assigns an IP address and port number to the server socket. The socket then
-    begins listening for incoming connections. Once a connection is made, the server accepts the request from the 
-    client. Calls methods from the "TicTacToe" class.
+    Parses the command line, waits for a client to connect and plays games against it until either side quits.
+    :return: NONE
     """
 
-    game = TicTacToe()
-    replay = False
-    host = "127.0.0.1"  # host address
-    port = 2221  # port number
-    receiver_socket.bind((host, port))  # binds the socket to the address
-    receiver_socket.listen(1)  # enables server to accept connections
-    print("Waiting for message...")
-
-    # accepts a connection, conn_socket = new socket object used to send and receive data on the connection
-    # addr = address bound to socket on other end of connection
-    conn_socket, addr = receiver_socket.accept()
-    print("Server listening on: localhost on port:", port, "\n" "Connected by:", host, addr)
-
-    # loop is True until either the client has closed its socket or the server wishes to close its socket
-    while True:
-        if not replay:
-            if not game.initiate_game():    # accepts or denies game invitation from client
+    parser = argparse.ArgumentParser(description="Two player tic-tac-toe server")
+    parser.add_argument("--engine", choices=["easy", "medium", "hard"],
+                        help="let the built-in engine play the server's moves at this difficulty level")
+    parser.add_argument("--tablebase", help="read the engine's moves from this tablebase file (see tablebase.py)")
+    parser.add_argument("--unix", metavar="PATH", help="listen on this Unix socket instead of the TCP port")
+    args = parser.parse_args()
+
+    player = None
+    if args.engine:
+        from engine import Engine
+        from tablebase import Tablebase
+        player = Engine(args.engine, tablebase=Tablebase(args.tablebase) if args.tablebase else None)
+
+    with transport.listen_unix(args.unix) if args.unix else transport.listen() as receiver_socket:
+        print("Waiting for message...")
+
+        # accepts a connection, connection = new Connection used to send and receive data on the connection
+        # addr = address bound to socket on other end of connection
+        connection, addr = transport.accept(receiver_socket)
+        if args.unix:
+            print("Server listening on:", args.unix)
+        else:
+            print("Server listening on: localhost on port:", transport.PORT, "\n" "Connected by:", transport.HOST, addr)
+
+    with connection:
+        game = TicTacToe(connection, player)
+        replay = False
+
+        # loop is True until either the client has closed its socket or the server wishes to close its socket
+        while True:
+            if not replay:
+                if not game.initiate_game():    # accepts or denies game invitation from client
+                    break
+            if not game.play_game():            # begins game play
                 break
-        if not game.play_game():            # begins game play
-            break
-        replay = True
+            replay = True
+
+
+if __name__ == "__main__":
+    main()
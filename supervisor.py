@@ -0,0 +1,358 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://lwn.net/Articles/542629/
+(2) https://docs.python.org/3/library/multiprocessing.html
+(3) https://docs.python.org/3/library/asyncio-eventloop.html#unix-signals
+(4) https://docs.python.org/3/library/socket.html#socket.send_fds
+
+Multi-process server. A single event loop only ever uses one core, so the supervisor forks one worker process per
+core, each running its own GameServer and event loop. Every worker binds the same port with SO_REUSEPORT and the
+kernel spreads new connections between them. A game can only be resumed by the worker holding it, so a worker that
+receives a RESUME for another worker's game hands the connection's socket to the supervisor over a Unix socket pair,
+with the bytes it already read, and the supervisor passes both on to the worker holding the game. No other connection
+is passed through the supervisor.
+
+Workers push their counters to the supervisor over a pipe every WORKER_STATS seconds, and the supervisor prints the
+totals. On SIGHUP the workers are replaced one at a time: the old worker stops accepting connections and finishes its
+games in progress while the other workers take its share of new connections. SIGINT or SIGTERM stops every worker.
+SIGUSR1 is passed on to every worker, which starts a profile (see admin.py).
+"""
+
+import asyncio
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import socket
+import time
+
+WORKER_STATS = 1.0      # seconds between the counters pushed by each worker
+HANDOFF_SIZE = 1 << 17  # largest handed off message: the worker index and the bytes read from the connection
+# statistics that only ever grow, kept when a worker exits
+COUNTERS = ("connections", "games", "moves", "chat_relayed", "chat_dropped", "frames_coalesced", "frames_dropped",
+            "slow_disconnects", "moves_rejected", "bytes_received", "bytes_sent")
+
+
+async def serve_worker(server, index, pipe, drain_timeout):
+    """
+    Runs a worker's GameServer until the supervisor sends SIGTERM, then drains it.
+    :param server: Represents the worker's GameServer
+    :param index: Represents the worker's index
+    :param pipe: Represents the sending end of the pipe to the supervisor
+    :param drain_timeout: Represents the number of seconds to wait for the games in progress after SIGTERM
+    :return: NONE
+    """
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+    await server.start()
+    pipe.send(("ready", index, server.stats()))
+
+    def report():
+        pipe.send(("stats", index, server.stats()))
+        loop.call_later(WORKER_STATS, report)
+
+    loop.call_later(WORKER_STATS, report)
+    await stop.wait()
+    await server.drain(drain_timeout)
+    pipe.send(("stats", index, server.stats()))
+
+
+def run_worker(make_server, index, pipe, handoff, drain_timeout):
+    """
+    Entry point of a worker process.
+    :param make_server: Represents the function creating the worker's GameServer from its index and handoff socket
+    :param index: Represents the worker's index
+    :param pipe: Represents the sending end of the pipe to the supervisor
+    :param handoff: Represents the worker's end of the socket pair connections are handed over
+    :param drain_timeout: Represents the number of seconds to wait for the games in progress after SIGTERM
+    :return: NONE
+    """
+
+    # a Ctrl-C in the terminal reaches every process, the supervisor decides how the workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)       # replaced by the event loop's handler once serving
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)       # starts a profile once serving
+    asyncio.run(serve_worker(make_server(index, handoff), index, pipe, drain_timeout))
+    pipe.close()
+    handoff.close()
+
+
+class Worker:
+    """
+    Creates a Worker Object. Holds the supervisor's view of one worker process: the process, the receiving end of
+    its pipe, the supervisor's end of its handoff socket pair and its most recent statistics.
+    """
+
+    def __init__(self, index, process, pipe, handoff):
+        """
+        Initializes the worker.
+        :param index: Represents the worker's index
+        :param process: Represents the worker's multiprocessing.Process
+        :param pipe: Represents the receiving end of the worker's pipe
+        :param handoff: Represents the supervisor's end of the worker's handoff socket pair
+        """
+
+        self.index = index
+        self.process = process
+        self.pipe = pipe
+        self.handoff = handoff
+        self.ready = False
+        self.stats = {}
+
+
+class Supervisor:
+    """
+    Creates a Supervisor Object. This class is responsible for starting one worker process per core, replacing them
+    one at a time on a rolling restart and aggregating their statistics.
+    """
+
+    def __init__(self, make_server, workers, stats_interval=0.0, drain_timeout=30.0, serial=False):
+        """
+        Initializes the supervisor, no worker is started until run() is called.
+        :param make_server: Represents the function creating a worker's GameServer from the worker's index and its end
+        of the handoff socket pair
+        :param workers: Represents the number of worker processes
+        :param stats_interval: Represents the number of seconds between printed worker statistics, 0 for none
+        :param drain_timeout: Represents the number of seconds a replaced worker waits for its games in progress
+        :param serial: If True, a replacement worker is only started once the worker it replaces has exited
+        """
+
+        self.make_server = make_server
+        self.size = workers
+        self.stats_interval = stats_interval
+        self.drain_timeout = drain_timeout
+        self.serial = serial
+        self.context = multiprocessing.get_context("fork")
+        self.workers = {}           # index -> Worker currently serving that index
+        self.draining = []          # replaced Workers that have not exited yet
+        self.retired = dict.fromkeys(COUNTERS, 0)       # counters of workers that have exited
+        self.restarts = 0
+        self.restart_requested = False
+        self.stopping = False
+
+    def spawn(self, index):
+        """
+        Forks a worker process.
+        :param index: Represents the worker's index
+        :return: The Worker
+        """
+
+        receiver, sender = self.context.Pipe(duplex=False)
+        handoff, worker_handoff = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        process = self.context.Process(target=run_worker, name="worker-" + str(index),
+                                       args=(self.make_server, index, sender, worker_handoff, self.drain_timeout))
+        process.start()
+        sender.close()      # the supervisor only receives, the pipe reports EOF once the worker has exited
+        worker_handoff.close()
+        handoff.setblocking(False)
+        worker = Worker(index, process, receiver, handoff)
+        self.workers[index] = worker
+        return worker
+
+    def poll(self, timeout):
+        """
+        Receives the messages sent by every worker and reaps the workers that have exited.
+        :param timeout: Represents the number of seconds to wait for a message
+        :return: NONE
+        """
+
+        workers = {worker.pipe: worker for worker in list(self.workers.values()) + self.draining}
+        handoffs = {worker.handoff: worker for worker in workers.values()}
+        for pipe in multiprocessing.connection.wait(list(workers) + list(handoffs), timeout):
+            if pipe in handoffs:
+                self.forward(handoffs[pipe])
+                continue
+            worker = workers[pipe]
+            try:
+                kind, index, stats = pipe.recv()
+            except (EOFError, OSError):
+                self.reap(worker)
+                continue
+            worker.stats = stats
+            if kind == "ready":
+                worker.ready = True
+
+    def forward(self, worker):
+        """
+        Passes every connection handed off by a worker on to the worker its first two bytes name, with the bytes the
+        first worker read from it. A connection whose worker is not running is closed, the client connects again.
+        :param worker: Represents the Worker that handed the connections off
+        :return: NONE
+        """
+
+        while True:
+            try:
+                message, fds, flags, address = socket.recv_fds(worker.handoff, HANDOFF_SIZE, 1)
+            except OSError:         # nothing left to read
+                return
+            holder = self.workers.get(int.from_bytes(message[:2], "big"))
+            try:
+                if holder is not None:
+                    socket.send_fds(holder.handoff, [message[2:]], fds)
+            except OSError:         # the worker is not reading, e.g. it is exiting
+                pass
+            finally:
+                for fd in fds:      # the socket was duplicated into the message, the supervisor's copy is closed
+                    os.close(fd)
+
+    def reap(self, worker):
+        """
+        Cleans up after a worker that has exited, keeping its counters in the totals.
+        :param worker: Represents the Worker
+        :return: NONE
+        """
+
+        worker.pipe.close()
+        worker.handoff.close()
+        worker.process.join()
+        for name in COUNTERS:
+            self.retired[name] += worker.stats.get(name, 0)
+        if worker in self.draining:
+            self.draining.remove(worker)
+        elif self.workers.get(worker.index) is worker:
+            del self.workers[worker.index]
+            if self.stopping:
+                return
+            print("Worker", worker.index, "exited with status", worker.process.exitcode, flush=True)
+            if worker.ready:        # crashed while serving, it is replaced at once
+                self.spawn(worker.index)
+            else:                   # could not start, e.g. the port is taken, a replacement would fail too
+                self.stopping = True
+
+    def wait_ready(self, worker):
+        """
+        Waits until a new worker is accepting connections.
+        :param worker: Represents the Worker
+        :return: True if the worker is ready, False if it exited first
+        """
+
+        while not worker.ready:
+            if self.workers.get(worker.index) is not worker or self.stopping:
+                return False
+            self.poll(0.1)
+        return True
+
+    def wait_exit(self, worker):
+        """
+        Waits until a replaced worker has exited.
+        :param worker: Represents the Worker
+        :return: NONE
+        """
+
+        while worker in self.draining:
+            self.poll(0.1)
+
+    def rolling_restart(self):
+        """
+        Replaces every worker, one at a time. The replacement is started and accepting connections before the old
+        worker is told to drain, unless the supervisor is serial.
+        :return: NONE
+        """
+
+        print("Rolling restart of", len(self.workers), "workers", flush=True)
+        for index in sorted(self.workers):
+            old = self.workers.pop(index)
+            self.draining.append(old)
+            if self.serial:
+                old.process.terminate()
+                self.wait_exit(old)
+                self.wait_ready(self.spawn(index))
+            else:
+                self.wait_ready(self.spawn(index))
+                old.process.terminate()
+            if self.stopping:
+                return
+        self.restarts += 1
+
+    def aggregate(self):
+        """
+        Adds up the statistics of every worker.
+        :return: Dictionary of statistics
+        """
+
+        totals = dict(self.retired)
+        for worker in list(self.workers.values()) + self.draining:
+            for name, value in worker.stats.items():
+                if name in COUNTERS:
+                    totals[name] += value
+                else:
+                    totals[name] = totals.get(name, 0) + value
+        totals["workers"] = len(self.workers)
+        totals["draining"] = len(self.draining)
+        totals["restarts"] = self.restarts
+        return totals
+
+    def request_restart(self, signum, frame):
+        """
+        SIGHUP handler, the rolling restart is started by the supervisor's loop.
+        :param signum: Represents the signal number
+        :param frame: Represents the interrupted stack frame
+        :return: NONE
+        """
+
+        self.restart_requested = True
+
+    def forward_profile(self, signum, frame):
+        """
+        SIGUSR1 handler, every worker starts a profile.
+        :param signum: Represents the signal number
+        :param frame: Represents the interrupted stack frame
+        :return: NONE
+        """
+
+        for worker in self.workers.values():
+            if worker.process.pid is not None:
+                os.kill(worker.process.pid, signal.SIGUSR1)
+
+    def request_stop(self, signum, frame):
+        """
+        SIGINT and SIGTERM handler, the workers are stopped by the supervisor's loop.
+        :param signum: Represents the signal number
+        :param frame: Represents the interrupted stack frame
+        :return: NONE
+        """
+
+        self.stopping = True
+
+    def run(self):
+        """
+        Starts every worker and supervises them until SIGINT or SIGTERM.
+        :return: NONE
+        """
+
+        signal.signal(signal.SIGHUP, self.request_restart)
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGUSR1, self.forward_profile)
+        for index in range(self.size):
+            self.spawn(index)
+        for worker in list(self.workers.values()):
+            self.wait_ready(worker)
+        print("Supervisor started", self.size, "workers", flush=True)
+
+        next_report = time.monotonic() + self.stats_interval
+        while not self.stopping:
+            self.poll(0.25)
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            if self.stats_interval and time.monotonic() >= next_report:
+                next_report += self.stats_interval
+                print("workers", json.dumps(self.aggregate()), flush=True)
+
+        # stop every worker, in-progress games are dropped after the drain timeout
+        for worker in list(self.workers.values()) + self.draining:
+            worker.process.terminate()
+        self.draining.extend(self.workers.values())
+        self.workers.clear()
+        while self.draining:
+            self.poll(0.25)
+        print("workers", json.dumps(self.aggregate()), flush=True)
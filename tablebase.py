@@ -0,0 +1,176 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://docs.python.org/3/library/mmap.html
+(2) https://en.wikipedia.org/wiki/Endgame_tablebase
+
+Precomputed tablebase of every reachable tic-tac-toe position. The file holds a 16 byte header followed by one 2 byte
+entry for every base-3 board index (3 ** 9 entries, about 39 KB). Bits 0-8 of an entry flag every best move and bits
+9-10 hold the game value for the player to move. Unreachable positions are stored as 0.
+
+The file is opened with mmap, so every worker process on the host shares one page-cached copy and a lookup is a single
+indexed read.
+
+Generate the file from the repository root:
+    python tablebase.py --output tablebase.bin
+"""
+
+import argparse
+import mmap
+import struct
+
+import bitboard
+import engine
+
+MAGIC = b"TTTB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI6x")      # magic, version, entry size, entry count
+ENTRY = struct.Struct("<H")
+ENTRIES = 3 ** (bitboard.SIZE * bitboard.SIZE)
+
+# game values for the player to move
+UNREACHABLE = 0
+WIN = 1
+DRAW = 2
+LOSS = 3
+TERMINAL = 0        # best move flags of a position that is already won or tied
+
+# FLAG_MOVES[flags] lists the bit indexes flagged in a 9-bit best move entry
+FLAG_MOVES = tuple(tuple(index for index in range(9) if flags >> index & 1) for flags in range(bitboard.FULL + 1))
+
+# BASE3[bits] is the base-3 value of a bitboard with a 1 in every digit where a bit is set
+BASE3 = tuple(sum(3 ** index for index in range(9) if bits >> index & 1) for bits in range(bitboard.FULL + 1))
+
+
+def position_index(board):
+    """
+    Computes the perfect base-3 hash of a board, each position is a digit: 0 open, 1 "X", 2 "O"
+    :param board: Represents the game board as a BitBoard
+    :return: Index from 0 to 3 ** 9 - 1
+    """
+
+    return BASE3[board.x] + 2 * BASE3[board.o]
+
+
+def player_to_move(board):
+    """
+    Works out whose turn it is, "X" always moves first.
+    :param board: Represents the game board as a BitBoard
+    :return: "X" or "O"
+    """
+
+    return "X" if board.x.bit_count() == board.o.bit_count() else "O"
+
+
+def generate(path):
+    """
+    Walks every position reachable from an empty board, solves it with the engine and writes the tablebase file.
+    Games stop once TicTacToe.win_check() finds a winner or the board is full.
+    :param path: Represents the path of the file to write
+    :return: Number of reachable positions written
+    """
+
+    searcher = engine.Engine("hard", table=engine.TranspositionTable())
+    entries = [0] * ENTRIES
+    stack = [bitboard.BitBoard()]
+    reachable = 0
+    while stack:
+        board = stack.pop()
+        index = position_index(board)
+        if entries[index]:
+            continue
+        reachable += 1
+        if board.has_won("X") or board.has_won("O"):
+            entries[index] = LOSS << 9 | TERMINAL      # the player who moved last has won
+            continue
+        if board.is_full():
+            entries[index] = DRAW << 9 | TERMINAL
+            continue
+
+        player = player_to_move(board)
+        scores = searcher.scores(board, player)
+        best = max(scores.values())
+        flags = 0
+        for move, score in scores.items():
+            if score == best:
+                flags |= 1 << move
+            child = bitboard.BitBoard(board.x, board.o)
+            child.place(move, player)
+            stack.append(child)
+        value = WIN if best > 0 else DRAW if best == 0 else LOSS
+        entries[index] = value << 9 | flags
+
+    with open(path, "wb") as output:
+        output.write(HEADER.pack(MAGIC, VERSION, ENTRY.size, ENTRIES))
+        output.write(struct.pack("<" + str(ENTRIES) + "H", *entries))
+    return reachable
+
+
+class Tablebase:
+    """
+    Creates a Tablebase Object. This class is responsible for mapping a tablebase file into memory and looking up the
+    best moves and game value of a position.
+    """
+
+    def __init__(self, path):
+        """
+        Maps the tablebase file read-only and checks its header.
+        :param path: Represents the path of the tablebase file
+        """
+
+        with open(path, "rb") as tablebase_file:
+            self.map = mmap.mmap(tablebase_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, entry_size, entries = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or entry_size != ENTRY.size or entries != ENTRIES:
+            self.map.close()
+            raise ValueError(path + " is not a version " + str(VERSION) + " tablebase")
+        self.entries = memoryview(self.map)[HEADER.size:].cast("H")     # entries are little-endian, as is the host
+
+    def close(self):
+        """
+        Unmaps the tablebase file.
+        :return: NONE
+        """
+
+        self.entries.release()
+        self.map.close()
+
+    def lookup(self, board):
+        """
+        Reads the entry of a position.
+        :param board: Represents the game board as a BitBoard
+        :return: Tuple of (game value for the player to move, best move flags)
+        """
+
+        entry = self.entries[position_index(board)]
+        return entry >> 9, entry & bitboard.FULL
+
+    def best_moves(self, board):
+        """
+        Lists every best move of a position. The player to move is implied by the board.
+        :param board: Represents the game board as a BitBoard
+        :return: Tuple of bit indexes, empty if the game is over or the position can not be reached
+        """
+
+        return FLAG_MOVES[self.entries[position_index(board)] & bitboard.FULL]
+
+
+def main():
+    """
+    Parses the command line, generates the tablebase file and prints the number of positions written.
+    :return: NONE
+    """
+
+    parser = argparse.ArgumentParser(description="Generate the tic-tac-toe tablebase")
+    parser.add_argument("--output", default="tablebase.bin")
+    args = parser.parse_args()
+
+    reachable = generate(args.output)
+    print("Wrote", reachable, "positions to", args.output)
+
+
+if __name__ == "__main__":
+    main()
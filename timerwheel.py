@@ -0,0 +1,183 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) Hashed and Hierarchical Timing Wheels, (George Varghese, Tony Lauck)
+(2) https://lwn.net/Articles/646950/
+
+Hierarchical timer wheel. Time is counted in ticks. Level 0 holds one bucket for each of the next 256 ticks, level 1
+one bucket for each of the next 256 spans of 256 ticks, and so on. Scheduling a timer drops it into one bucket and
+cancelling removes it from that bucket, both O(1) with no heap to keep in order. Whenever a higher level bucket comes
+due, its timers are moved down into the finer levels, so each timer is moved at most once per level. Rescheduling
+an armed timer to a later tick only updates the tick, the timer is moved on when the bucket it waits in comes due.
+
+The wheel does not run on its own, advance() is called once per tick by its owner (e.g. from loop.call_later), so an
+event loop serving 100k sessions keeps a single scheduled callback no matter how many timers are armed.
+"""
+
+BITS = 8
+SLOTS = 1 << BITS       # buckets per level
+MASK = SLOTS - 1
+LEVELS = 4
+
+
+class Timer:
+    """
+    Creates a Timer Object. Holds the callback of one scheduled timer and the bucket it waits in.
+    """
+
+    __slots__ = ("expires", "callback", "args", "bucket")
+
+    def __init__(self, expires, callback, args):
+        """
+        Initializes the timer.
+        :param expires: Represents the tick the timer fires on
+        :param callback: Represents the function called when the timer fires
+        :param args: Represents the arguments passed to the callback
+        """
+
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self.bucket = None
+
+    def cancel(self):
+        """
+        Removes the timer from its bucket, if it has not fired yet.
+        :return: NONE
+        """
+
+        if self.bucket is not None:
+            del self.bucket[self]
+            self.bucket = None
+
+
+class TimerWheel:
+    """
+    Creates a TimerWheel Object. This class is responsible for scheduling, cancelling and firing timers with a
+    resolution of one tick.
+    """
+
+    def __init__(self, tick=0.1, start=0.0):
+        """
+        Initializes an empty wheel.
+        :param tick: Represents the length of one tick in seconds
+        :param start: Represents the time of tick 0, on the same clock later passed to advance()
+        """
+
+        self.tick = tick
+        self.start = start
+        self.current = 0        # last tick processed
+        self.horizon = (1 << BITS * LEVELS) - 1     # furthest a timer can be scheduled, in ticks
+        self.wheels = [[{} for i in range(SLOTS)] for level in range(LEVELS)]      # buckets are dicts used as sets
+
+    def schedule(self, delay, callback, *args):
+        """
+        Arms a timer.
+        :param delay: Represents the number of seconds until the timer fires, rounded up to a whole tick
+        :param callback: Represents the function called when the timer fires
+        :param args: Represents the arguments passed to the callback
+        :return: The Timer, which can be cancelled or rescheduled
+        """
+
+        # ticks() and _insert() written out, arming is the wheel's most frequent operation
+        ticks = -int(-delay // self.tick)
+        current = self.current
+        expires = current + (ticks if 0 < ticks < self.horizon else self.ticks(delay))
+        timer = Timer(expires, callback, args)
+        level = ((expires ^ current | 1).bit_length() - 1) // BITS
+        if level >= LEVELS:
+            level = LEVELS - 1
+        bucket = self.wheels[level][expires >> BITS * level & MASK]
+        bucket[timer] = None
+        timer.bucket = bucket
+        return timer
+
+    def reschedule(self, timer, delay):
+        """
+        Arms a timer again, whether it is armed, cancelled or has fired, without allocating a new one. An armed timer
+        that only moves later, e.g. a deadline pushed back after every move, stays in its bucket with its new tick and
+        is moved on once the bucket comes due, so the common case is a single assignment.
+        :param timer: Represents the Timer returned by schedule()
+        :param delay: Represents the number of seconds until the timer fires, rounded up to a whole tick
+        :return: NONE
+        """
+
+        ticks = -int(-delay // self.tick)
+        expires = self.current + (ticks if 0 < ticks < self.horizon else self.ticks(delay))
+        if timer.bucket is not None:
+            if expires >= timer.expires:
+                timer.expires = expires
+                return
+            del timer.bucket[timer]
+        timer.expires = expires
+        self._insert(timer)
+
+    def ticks(self, delay):
+        """
+        Converts a delay to ticks.
+        :param delay: Represents the delay in seconds
+        :return: Number of ticks, rounded up, at least 1 and at most the horizon
+        """
+
+        ticks = -int(-delay // self.tick)
+        if ticks < 1:
+            return 1
+        return ticks if ticks < self.horizon else self.horizon
+
+    def _insert(self, timer):
+        """
+        Drops a timer into the finest level whose current span holds its tick. The highest bit in which the tick
+        differs from the current tick gives the level.
+        :param timer: Represents the Timer
+        :return: NONE
+        """
+
+        expires = timer.expires
+        level = ((expires ^ self.current | 1).bit_length() - 1) // BITS
+        if level >= LEVELS:
+            level = LEVELS - 1
+        bucket = self.wheels[level][expires >> BITS * level & MASK]
+        bucket[timer] = None
+        timer.bucket = bucket
+
+    def advance(self, now):
+        """
+        Processes every tick up to the given time, firing the timers that came due.
+        :param now: Represents the current time
+        :return: Number of timers fired
+        """
+
+        target = int((now - self.start) / self.tick)
+        fired = 0
+        while self.current < target:
+            self.current += 1
+            current = self.current
+
+            # move the timers of every higher level bucket that came due down the wheel, coarsest first
+            level = 1
+            while level < LEVELS and current & (1 << BITS * level) - 1 == 0:
+                level += 1
+            for cascade in range(level - 1, 0, -1):
+                slots = self.wheels[cascade]
+                index = current >> BITS * cascade & MASK
+                bucket = slots[index]
+                slots[index] = {}
+                for timer in bucket:
+                    self._insert(timer)
+
+            slots = self.wheels[0]
+            bucket = slots[current & MASK]
+            slots[current & MASK] = {}
+            for timer in list(bucket):
+                if timer.bucket is not bucket:      # skip timers cancelled or rescheduled by an earlier callback
+                    continue
+                if timer.expires > current:         # rescheduled to a later tick while it waited here
+                    self._insert(timer)
+                    continue
+                timer.bucket = None
+                timer.callback(*timer.args)
+                fired += 1
+        return fired
@@ -0,0 +1,420 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://docs.python.org/3/library/concurrent.futures.html#processpoolexecutor
+(2) https://en.wikipedia.org/wiki/Round-robin_tournament
+(3) https://en.wikipedia.org/wiki/Swiss-system_tournament
+(4) https://en.wikipedia.org/wiki/Elo_rating_system
+(5) https://en.wikipedia.org/wiki/Bradley%E2%80%93Terry_model
+
+Offline tournament between strategy players, for comparing engine strategies and putting the game rules under load
+without a server. Every game is played in-process on a game.Game, each move is checked with check_valid_index() and
+a player making an illegal move forfeits the game. Players are picked by name from STRATEGIES or given as
+"module:Class", any class with the engine's choose_move(board, player) method.
+
+A tournament is a number of rounds. In each round the entrants are paired, every pair of entrants in a round-robin and
+entrants with the same number of match points in a Swiss tournament, and every pairing plays a match of a fixed number
+of games with the entrants taking turns at moving first. Matches are split into chunks of games and the chunks are
+played across a ProcessPoolExecutor. Only the pairing, the seed and the game counts are sent to a worker and the
+result of a whole chunk is sent back, so the cost of a game stays in the worker however many games are played.
+
+Ratings are on the Elo scale, fitted to the results of all games at once (a Bradley-Terry fit) rather than updated
+one game at a time, so they do not depend on the order in which the chunks finish. Each pair of entrants is given one
+drawn game before the fit, so an entrant that never loses still gets a finite rating.
+"""
+
+import argparse
+import concurrent.futures
+import importlib
+import math
+import os
+import random
+import time
+
+import bitboard
+import engine
+from game import Game
+from lobby import DEFAULT_RATING
+
+
+class RandomPlayer:
+    """
+    Creates a RandomPlayer Object. This class is responsible for playing a random open position.
+    """
+
+    __slots__ = ("rng",)
+
+    def __init__(self, seed=None):
+        """
+        Initializes the player's random number generator.
+        :param seed: Represents the random seed
+        """
+
+        self.rng = random.Random(seed)
+
+    def choose_move(self, board, player):
+        """
+        Picks a random open position.
+        :param board: Represents the current game board
+        :param player: Represents the player character to move, "X" or "O"
+        :return: Bit index of the move
+        """
+
+        return self.rng.choice(board.open_cells())
+
+
+class GreedyPlayer(RandomPlayer):
+    """
+    Creates a GreedyPlayer Object. This class is responsible for playing a winning position if there is one, else
+    blocking the opponent's winning position, else a random open position. It looks one move ahead.
+    """
+
+    __slots__ = ()
+
+    def choose_move(self, board, player):
+        """
+        Picks a winning move, a blocking move or a random open position, in that order.
+        :param board: Represents the current game board
+        :param player: Represents the player character to move, "X" or "O"
+        :return: Bit index of the move
+        """
+
+        cells = board.open_cells()
+        other = "O" if player == "X" else "X"
+        for mover in (player, other):
+            for index in cells:
+                if wins_at(board, index, mover):
+                    return index
+        return self.rng.choice(cells)
+
+
+class MinimaxPlayer(engine.Engine):
+    """
+    Creates a MinimaxPlayer Object. This class is responsible for playing one of the best moves found by the engine's
+    search at the "hard" level. A tournament reaches the same few thousand positions over and over, so the best moves
+    of every searched position are kept in BEST_MOVES, shared by every MinimaxPlayer in the process.
+    """
+
+    def best_moves(self, board, player):
+        """
+        Finds every move that scores as well as the best move, searching each position only once.
+        :param board: Represents the current game board as a BitBoard
+        :param player: Represents the player character to move, "X" or "O"
+        :return: List of bit indexes, empty for boards other than the classic 3x3 game
+        """
+
+        key = (board.x, board.o, player)
+        moves = BEST_MOVES.get(key)
+        if moves is None:
+            moves = BEST_MOVES[key] = super().best_moves(board, player)
+        return moves
+
+
+BEST_MOVES = {}         # (X positions, O positions, player to move) -> best moves, filled by MinimaxPlayer
+
+# strategies by name, each made by calling it with a seed
+STRATEGIES = {
+    "random": RandomPlayer,
+    "greedy": GreedyPlayer,
+    "minimax": MinimaxPlayer,
+}
+
+
+def wins_at(board, index, player):
+    """
+    Checks if placing the player's character at an open position would win the game, without changing the board.
+    :param board: Represents the current game board
+    :param index: Represents the bit index of the open position
+    :param player: Represents the player character
+    :return: True if the move wins, else False
+    """
+
+    if bitboard.is_classic(board):
+        return bitboard.WIN_TABLE[(board.x if player == "X" else board.o) | 1 << index]
+    trial = bitboard.GridBoard(board.height, board.width, board.k, board.x, board.o)
+    trial.place(index, player)
+    return trial.has_won(player)
+
+
+def make_player(strategy, seed):
+    """
+    Creates a player from its strategy name.
+    :param strategy: Represents a name from STRATEGIES, or "module:Class" for a class found elsewhere
+    :param seed: Represents the random seed handed to the player
+    :return: The player
+    """
+
+    if strategy in STRATEGIES:
+        return STRATEGIES[strategy](seed=seed)
+    module, _, name = strategy.partition(":")
+    if not name:
+        raise ValueError("unknown strategy: " + strategy)
+    return getattr(importlib.import_module(module), name)(seed=seed)
+
+
+def play_game(game, players):
+    """
+    Plays one game to the end, "X" moving first.
+    :param game: Represents the Game, its board is cleared first
+    :param players: Represents a dictionary mapping "X" and "O" to their players
+    :return: Tuple of (winner "X" or "O", or "-" for a tie, number of moves played)
+    """
+
+    game.create_board()
+    player = "X"
+    moves = 0
+    while True:
+        other = "O" if player == "X" else "X"
+        if not game.check_valid_index(players[player].choose_move(game.board, player), player):
+            return other, moves         # illegal move, the game is forfeited
+        moves += 1
+        if game.win_check(game.board, player):
+            return player, moves
+        if game.board.is_full():
+            return "-", moves
+        player = other
+
+
+def play_match(first, second, games, seed, size):
+    """
+    Plays a chunk of a match, the entry point of a worker process. The first player moves first in even games, the
+    second player in odd games.
+    :param first: Represents the strategy of the first player
+    :param second: Represents the strategy of the second player
+    :param games: Represents the number of games played
+    :param seed: Represents the random seed of the chunk, the two players get seed and seed + 1
+    :param size: Represents the board size as a tuple of (height, width, k)
+    :return: Tuple of (games won by the first player, games won by the second player, ties, moves played)
+    """
+
+    players = (make_player(first, seed), make_player(second, seed + 1))
+    game = Game(size)
+    won = [0, 0]
+    ties = moves = 0
+    for number in range(games):
+        x = number % 2
+        winner, played = play_game(game, {"X": players[x], "O": players[1 - x]})
+        moves += played
+        if winner == "-":
+            ties += 1
+        else:
+            won[x if winner == "X" else 1 - x] += 1
+    return won[0], won[1], ties, moves
+
+
+class Tournament:
+    """
+    Creates a Tournament Object. This class is responsible for pairing the entrants round by round, playing their
+    matches across worker processes and keeping the standings.
+    """
+
+    def __init__(self, strategies, games=1000, size=(3, 3, 3), seed=0, chunk=1000):
+        """
+        Initializes the entrants and empty standings.
+        :param strategies: Represents one strategy per entrant, an entrant's name gets a number when a strategy is
+        entered more than once
+        :param games: Represents the number of games in every match
+        :param size: Represents the board size as a tuple of (height, width, k)
+        :param seed: Represents the random seed of the tournament, every chunk of games gets its own seed from it
+        :param chunk: Represents the largest number of games handed to a worker at once
+        """
+
+        self.strategies = list(strategies)
+        self.names = []
+        for strategy in self.strategies:
+            count = sum(name.partition("#")[0] == strategy for name in self.names)
+            self.names.append(strategy + ("#" + str(count + 1) if count else ""))
+        self.games = games
+        self.size = size
+        self.seed = seed
+        self.chunk = chunk
+        entrants = len(self.strategies)
+        self.results = [[[0, 0] for j in range(entrants)] for i in range(entrants)]    # [i][j]: score, games of i v j
+        self.wins = [0] * entrants
+        self.losses = [0] * entrants
+        self.ties = [0] * entrants
+        self.points = [0.0] * entrants          # match points: 1 for a match won or a bye, 0.5 for a drawn match
+        self.byes = set()
+        self.games_played = 0
+        self.moves_played = 0
+        self.seconds = 0.0
+
+    def round_robin_pairings(self):
+        """
+        Pairs every entrant with every other entrant.
+        :return: List of (entrant, entrant) index pairs
+        """
+
+        entrants = len(self.strategies)
+        return [(i, j) for i in range(entrants) for j in range(i + 1, entrants)]
+
+    def swiss_pairings(self):
+        """
+        Pairs the entrants by match points, then rating, each with the next entrant down it has not played yet if
+        there is one. With an odd number of entrants the lowest entrant without a bye sits the round out and gets a
+        match point.
+        :return: List of (entrant, entrant) index pairs
+        """
+
+        ratings = self.ratings()
+        order = sorted(range(len(self.strategies)), key=lambda i: (-self.points[i], -ratings[i]))
+        if len(order) % 2:
+            bye = next((i for i in reversed(order) if i not in self.byes), order[-1])
+            order.remove(bye)
+            self.byes.add(bye)
+            self.points[bye] += 1
+        pairings = []
+        while order:
+            first = order.pop(0)
+            second = next((i for i in order if not self.results[first][i][1]), order[0])
+            order.remove(second)
+            pairings.append((first, second))
+        return pairings
+
+    def play_round(self, executor, pairings):
+        """
+        Plays the match of every pairing, split into chunks across the executor's workers, and adds the results to
+        the standings.
+        :param executor: Represents the concurrent.futures executor playing the chunks
+        :param pairings: Represents the (entrant, entrant) index pairs of the round
+        :return: NONE
+        """
+
+        tasks = []
+        for first, second in pairings:
+            for start in range(0, self.games, self.chunk):
+                tasks.append((first, second, min(self.chunk, self.games - start), self.seed))
+                self.seed += 2
+        futures = [executor.submit(play_match, self.strategies[first], self.strategies[second], games, seed,
+                                   self.size) for first, second, games, seed in tasks]
+        scores = {}
+        for (first, second, games, seed), future in zip(tasks, futures):
+            won, lost, tied, moves = future.result()
+            self.record(first, second, won, lost, tied)
+            self.moves_played += moves
+            score = scores.setdefault((first, second), [0, 0])
+            score[0] += won
+            score[1] += lost
+
+        # match points go to whichever entrant won more games of the match
+        for (first, second), (won, lost) in scores.items():
+            if won == lost:
+                self.points[first] += 0.5
+                self.points[second] += 0.5
+            else:
+                self.points[first if won > lost else second] += 1
+
+    def record(self, first, second, won, lost, tied):
+        """
+        Adds the results of a chunk of games to the standings.
+        :param first: Represents the index of the first entrant
+        :param second: Represents the index of the second entrant
+        :param won: Represents the number of games won by the first entrant
+        :param lost: Represents the number of games won by the second entrant
+        :param tied: Represents the number of tie games
+        :return: NONE
+        """
+
+        games = won + lost + tied
+        for own, other, score in ((first, second, won + tied / 2), (second, first, lost + tied / 2)):
+            self.results[own][other][0] += score
+            self.results[own][other][1] += games
+        self.wins[first] += won
+        self.losses[first] += lost
+        self.wins[second] += lost
+        self.losses[second] += won
+        self.ties[first] += tied
+        self.ties[second] += tied
+        self.games_played += games
+
+    def run(self, rounds=1, system="round-robin", workers=None):
+        """
+        Plays the tournament.
+        :param rounds: Represents the number of rounds
+        :param system: Represents how entrants are paired, "round-robin" or "swiss"
+        :param workers: Represents the number of worker processes, os.cpu_count() if None
+        :return: NONE
+        """
+
+        start = time.perf_counter()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            for number in range(rounds):
+                pairings = self.swiss_pairings() if system == "swiss" else self.round_robin_pairings()
+                self.play_round(executor, pairings)
+        self.seconds += time.perf_counter() - start
+
+    def ratings(self, iterations=1000):
+        """
+        Fits Elo ratings to every game played so far, with ties counted as half a win for each side. The entrants'
+        average rating is DEFAULT_RATING.
+        :param iterations: Represents the largest number of fitting passes, the fit usually settles much sooner
+        :return: List of ratings, one per entrant
+        """
+
+        entrants = len(self.strategies)
+        if entrants < 2:
+            return [DEFAULT_RATING] * entrants
+        score = [[self.results[i][j][0] + (0.5 if i != j else 0) for j in range(entrants)] for i in range(entrants)]
+        games = [[self.results[i][j][1] + (1 if i != j else 0) for j in range(entrants)] for i in range(entrants)]
+        totals = [sum(row) for row in score]
+        strength = [1.0] * entrants
+        for iteration in range(iterations):
+            updated = [totals[i] / sum(games[i][j] / (strength[i] + strength[j]) for j in range(entrants) if j != i)
+                       for i in range(entrants)]
+            scale = math.exp(sum(math.log(value) for value in updated) / entrants)
+            updated = [value / scale for value in updated]
+            settled = max(abs(new - old) / old for new, old in zip(updated, strength)) < 1e-9
+            strength = updated
+            if settled:
+                break
+        return [DEFAULT_RATING + 400 * math.log10(value) for value in strength]
+
+    def standings(self):
+        """
+        Builds the standings, best rating first.
+        :return: List of dictionaries, one per entrant
+        """
+
+        ratings = self.ratings()
+        rows = [{"name": self.names[i], "rating": round(ratings[i]), "points": self.points[i],
+                 "games": self.wins[i] + self.losses[i] + self.ties[i], "wins": self.wins[i],
+                 "losses": self.losses[i], "ties": self.ties[i]} for i in range(len(self.strategies))]
+        return sorted(rows, key=lambda row: -row["rating"])
+
+
+def main():
+    """
+    Parses the command line, plays the tournament and prints the standings and the games played per second.
+    :return: NONE
+    """
+
+    parser = argparse.ArgumentParser(description="Tournament between tic-tac-toe strategies")
+    parser.add_argument("--players", nargs="+", default=list(STRATEGIES),
+                        help="strategy of every entrant: " + ", ".join(STRATEGIES) + " or module:Class")
+    parser.add_argument("--system", choices=["round-robin", "swiss"], default="round-robin")
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--games", type=int, default=1000, help="games in every match")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk", type=int, default=1000, help="games handed to a worker at once")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=3, help="board height")
+    parser.add_argument("--columns", type=int, default=3, help="board width")
+    parser.add_argument("--k", type=int, default=3, help="number of characters in a row needed to win")
+    args = parser.parse_args()
+
+    tournament = Tournament(args.players, args.games, (args.rows, args.columns, args.k), args.seed, args.chunk)
+    tournament.run(args.rounds, args.system, args.workers)
+
+    print("entrant       rating  points     games      wins    losses      ties")
+    for row in tournament.standings():
+        print(f"{row['name']:<12}{row['rating']:>8}{row['points']:>8.1f}{row['games']:>10}{row['wins']:>10}"
+              f"{row['losses']:>10}{row['ties']:>10}")
+    print(f"{tournament.games_played:,} games, {tournament.moves_played:,} moves in {tournament.seconds:.2f}s:",
+          f"{tournament.games_played / tournament.seconds:,.0f} games/sec on {args.workers} workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# Author: Clinton Lohr
+# Date: 05/31/2022
+
+
+"""
+Sources:
+(1) https://docs.python.org/3/library/socket.html
+(2) https://docs.python.org/3.4/howto/sockets.html
+(3) https://man7.org/linux/man-pages/man7/tcp.7.html
+(4) https://man7.org/linux/man-pages/man7/unix.7.html
+
+Blocking transport of the command line server and client. A Connection carries frames over one connected socket and
+holds the receive buffer of that socket. The game is handed its Connection when it is created instead of reaching for
+a socket of its own, and nothing is opened until one of the functions below is called. Three kinds of socket are
+supported:
+
+    TCP           connect() and listen(), with TCP_NODELAY set so a frame is sent as soon as it is written instead of
+                  waiting for the peer to acknowledge the last one (Nagle's algorithm)
+    Unix          connect_unix() and listen_unix(), for a client on the same host, skipping the TCP/IP stack
+    pair          pair(), both ends of a socket.socketpair() for a client in the same process, or in a process forked
+                  after the pair was created
+
+asyncio sets TCP_NODELAY on the TCP connections of async_server.py and bot_client.py itself, which take a Unix socket
+path or an already connected socket in the same way.
+"""
+
+import os
+import socket
+import stat
+
+import protocol
+
+HOST = "127.0.0.1"      # host address
+PORT = 2221             # port number
+
+
+class Connection:
+    """
+    Creates a Connection Object. This class is responsible for sending frames to and receiving frames from the peer
+    on the other end of one connected socket.
+    """
+
+    __slots__ = ("sock", "decoder")
+
+    def __init__(self, sock):
+        """
+        Initializes the connection and its receive buffer, shared by every game played on the connection.
+        :param sock: Represents the connected socket, TCP_NODELAY is set on a TCP socket
+        """
+
+        set_nodelay(sock)
+        self.sock = sock
+        self.decoder = protocol.FrameDecoder()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def fileno(self):
+        """
+        Returns the file descriptor of the socket, so a Connection can be registered with a selector.
+        :return: File descriptor as an int
+        """
+
+        return self.sock.fileno()
+
+    def send(self, opcode, payload=b""):
+        """
+        Encodes a frame and writes all of it to the peer.
+        :param opcode: Represents the type of message being sent
+        :param payload: Represents the message body as bytes
+        :return: NONE
+        """
+
+        protocol.send_frame(self.sock, opcode, payload)
+
+    def write(self, frame):
+        """
+        Writes all of a frame that has already been encoded, e.g. by protocol.encode_place(), to the peer.
+        :param frame: Represents the encoded frame as bytes
+        :return: NONE
+        """
+
+        self.sock.sendall(frame)
+
+    def receive(self):
+        """
+        Blocks until a complete frame has been received from the peer.
+        :return: Tuple of (opcode, payload bytes), or None once the peer has closed its socket
+        """
+
+        return protocol.read_frame(self.sock, self.decoder)
+
+    def next_frame(self):
+        """
+        Removes the next complete frame from the receive buffer without waiting for the peer.
+        :return: Tuple of (opcode, payload bytes) if a whole frame has been received, else None
+        """
+
+        return self.decoder.next_frame()
+
+    def recv_into(self):
+        """
+        Receives as many bytes as are available from the peer into the receive buffer.
+        :return: Number of bytes received, 0 once the peer has closed its socket
+        """
+
+        return self.decoder.recv_into(self.sock)
+
+    def close(self):
+        """
+        Closes the socket.
+        :return: NONE
+        """
+
+        self.sock.close()
+
+
+def set_nodelay(sock):
+    """
+    Turns off Nagle's algorithm on a TCP socket, so small frames such as moves are not held back. Other sockets are
+    left as they are.
+    :param sock: Represents the socket
+    :return: NONE
+    """
+
+    if sock.family in (socket.AF_INET, socket.AF_INET6) and sock.type == socket.SOCK_STREAM:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def connect(host=HOST, port=PORT):
+    """
+    Establishes a TCP connection to a server, initiating the three-way handshake.
+    :param host: Represents the host address of the server
+    :param port: Represents the port number of the server
+    :return: The Connection
+    """
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.connect((host, port))
+    except OSError:
+        sock.close()
+        raise
+    return Connection(sock)
+
+
+def connect_unix(path):
+    """
+    Establishes a connection to a server listening on a Unix socket.
+    :param path: Represents the path of the server's socket
+    :return: The Connection
+    """
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    return Connection(sock)
+
+
+def listen(host=HOST, port=PORT, backlog=1):
+    """
+    Creates a TCP server side socket, binds it to an address and starts listening for incoming connections. The
+    address can be bound again right after a previous server on it has exited.
+    :param host: Represents the host address to listen on
+    :param port: Represents the port number to listen on
+    :param backlog: Represents the number of connections waiting to be accepted
+    :return: The listening socket
+    """
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host, port))
+        listener.listen(backlog)
+    except OSError:
+        listener.close()
+        raise
+    return listener
+
+
+def listen_unix(path, backlog=1):
+    """
+    Creates a Unix server side socket at a path and starts listening for incoming connections. A socket left at the
+    path by a previous server is replaced, any other file is not.
+    :param path: Represents the path of the socket
+    :param backlog: Represents the number of connections waiting to be accepted
+    :return: The listening socket
+    """
+
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+    except FileNotFoundError:
+        pass
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        listener.bind(path)
+        listener.listen(backlog)
+    except OSError:
+        listener.close()
+        raise
+    return listener
+
+
+def accept(listener):
+    """
+    Waits for a client to connect to a listening socket.
+    :param listener: Represents the socket returned by listen() or listen_unix()
+    :return: Tuple of (Connection, address bound to the socket on the other end of the connection)
+    """
+
+    sock, address = listener.accept()
+    return Connection(sock), address
+
+
+def pair():
+    """
+    Creates two connected Connections, without a listening socket or an address.
+    :return: Tuple of (Connection, Connection)
+    """
+
+    first, second = socket.socketpair()
+    return Connection(first), Connection(second)